@@ -0,0 +1,96 @@
+"""Compare the original result charts with the downsampled WebGL ones.
+
+Run with:
+
+    python benchmarks/bench_charts.py --rows 10000 100000 1000000
+
+Each size simulates a transaction log over business days, then builds the cash,
+pie and bar figures the way the app originally did (SVG scatter with every date,
+aggregations recomputed per chart) and with the charts module. The payload is
+the size of the figure JSON sent to the browser, the time covers aggregation,
+figure construction and serialization. Browser render time is not measured
+here, it grows with the number of points and SVG nodes in the payload.
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+from python_project_raphael_corchia import charts
+
+
+def transaction_log(rows, n_tickers=50, per_day=20, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("1990-01-01", periods=-(-rows // per_day))
+    return pd.DataFrame(
+        {
+            "Date": np.repeat(dates, per_day)[:rows],
+            "Ticker": rng.choice([f"T{i:03d}" for i in range(n_tickers)], rows),
+            "Action": rng.choice(["BUY", "SELL"], rows),
+            "Cash": 1e6 + np.cumsum(rng.normal(0, 1e3, rows)),
+        }
+    )
+
+
+def original_figures(df):
+    # The figures as built by the app before the charts module
+    ticker_counts = df["Ticker"].value_counts().reset_index()
+    ticker_counts.columns = ["Ticker", "Count"]
+    pie = px.pie(ticker_counts, values="Count", names="Ticker", hole=0.4)
+    counts = df.groupby(["Ticker", "Action"]).size().reset_index(name="Count")
+    bar = px.bar(counts, x="Ticker", y="Count", color="Action", barmode="group")
+    cash = df.sort_values("Date").groupby("Date")["Cash"].last().reset_index()
+    line = go.Figure()
+    line.add_trace(
+        go.Scatter(
+            x=cash["Date"],
+            y=cash["Cash"],
+            mode="lines+markers",
+            line=dict(color="blue"),
+            marker=dict(size=8),
+        )
+    )
+    return [pie, bar, line]
+
+
+def new_figures(df):
+    counts = charts.transaction_counts(df)
+    dates, cash = charts.cash_by_date(df)
+    return [
+        charts.ticker_pie(counts),
+        charts.action_bar(counts),
+        charts.cash_figure(dates, cash),
+    ]
+
+
+def measure(build, df, repeat=3):
+    # Best of `repeat` runs, the first plotly call pays for its imports
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        payload = sum(len(fig.to_json()) for fig in build(df))
+        timings.append(time.perf_counter() - start)
+    return payload, min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    args = parser.parse_args()
+    for rows in args.rows:
+        df = transaction_log(rows)
+        old_size, old_time = measure(original_figures, df)
+        new_size, new_time = measure(new_figures, df)
+        print(
+            f"rows={rows:8d}  original {old_size / 1e3:9.1f}kB {old_time:7.3f}s  "
+            f"charts {new_size / 1e3:8.1f}kB {new_time:7.3f}s  "
+            f"payload x{old_size / new_size:6.1f}  time x{old_time / new_time:5.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
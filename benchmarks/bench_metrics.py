@@ -0,0 +1,67 @@
+"""Time the metrics engine on a long backtest over a large universe.
+
+Run with:
+
+    python benchmarks/bench_metrics.py --years 10 --tickers 1000
+
+Simulates daily prices and a monthly rebalanced transaction log trading every
+ticker, then times the rebuild of positions and NAV and each metric.
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from python_project_raphael_corchia.metrics import performance
+
+
+def simulate(years, n_tickers, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2010-01-01", periods=252 * years)
+    prices = 100 * np.exp(
+        np.cumsum(rng.normal(2e-4, 0.02, (len(dates), n_tickers)), axis=0)
+    )
+    tickers = np.array([f"T{i:04d}" for i in range(n_tickers)], dtype=object)
+    # Every ticker traded at each month end, alternating buys and sells
+    month_ends = np.flatnonzero(dates.month[1:] != dates.month[:-1])
+    rows = np.repeat(month_ends, n_tickers)
+    columns = np.tile(np.arange(n_tickers), len(month_ends))
+    buy = (rows // 20 + columns) % 3 != 0
+    log = pd.DataFrame(
+        {
+            "Date": dates[rows],
+            "Action": np.where(buy, "BUY", "SELL"),
+            "Ticker": tickers[columns],
+            "Quantity": np.where(buy, 20, 10),
+            "Price": prices[rows, columns],
+        }
+    )
+    return log, dates.to_numpy(), prices, tickers
+
+
+def timed(label, func):
+    start = time.perf_counter()
+    result = func()
+    print(f"{label:18s} {1e3 * (time.perf_counter() - start):8.1f}ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--tickers", type=int, default=1000)
+    args = parser.parse_args()
+    log, dates, prices, tickers = simulate(args.years, args.tickers)
+    print(f"{len(dates)} dates x {len(tickers)} tickers, {len(log)} transactions")
+    perf = timed("positions and NAV", lambda: performance(log, dates, prices, tickers))
+    timed("rolling Sharpe", perf.rolling_sharpe)
+    timed("drawdown", lambda: perf.drawdown)
+    timed("turnover", lambda: perf.turnover)
+    timed("P&L by ticker", perf.pnl_by_ticker)
+    timed("summary", perf.summary)
+
+
+if __name__ == "__main__":
+    main()
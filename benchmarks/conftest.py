@@ -0,0 +1,34 @@
+"""Synthetic, offline inputs of the benchmark suite.
+
+Run the suite with:
+
+    pytest benchmarks --benchmark-autosave
+    pytest benchmarks --benchmark-compare --benchmark-compare-fail=mean:20%
+
+The second command fails when a benchmark got 20% slower than the last saved
+run, e.g. after an upgrade of pybacktestchain or scipy.
+"""
+
+import numpy as np
+import pandas as pd
+from synthetic import synthetic_prices, workdir  # noqa: F401
+
+
+def synthetic_log(n_rows, n_tickers=50, per_day=20, seed=0):
+    """Transaction log with the columns and types of the broker log."""
+    from python_project_raphael_corchia.transactions import typed_log
+
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("1990-01-01", periods=-(-n_rows // per_day))
+    return typed_log(
+        pd.DataFrame(
+            {
+                "Date": np.repeat(dates, per_day)[:n_rows],
+                "Action": rng.choice(["BUY", "SELL"], n_rows),
+                "Ticker": rng.choice([f"T{i:03d}" for i in range(n_tickers)], n_rows),
+                "Quantity": rng.integers(1, 1000, n_rows),
+                "Price": rng.uniform(10, 500, n_rows),
+                "Cash": 1e6 + np.cumsum(rng.normal(0, 1e3, n_rows)),
+            }
+        )
+    )
@@ -0,0 +1,234 @@
+"""Baselines of the backtest pipeline, see conftest.py to run them."""
+
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+from conftest import synthetic_log, synthetic_prices
+from pybacktestchain.blockchain import Blockchain, load_blockchain
+from pybacktestchain.data_module import DataModule
+
+from python_project_raphael_corchia import charts, kernels
+from python_project_raphael_corchia.analytics import (
+    transaction_summary_by_period,
+    transaction_summary_by_ticker,
+)
+from python_project_raphael_corchia.blockchain import ChainMonitor, ChainStore
+from python_project_raphael_corchia.engine import (
+    CustomBacktest,
+    CustomFirstTwoMoments,
+)
+from python_project_raphael_corchia.data_store import first_two_moments
+from python_project_raphael_corchia.estimators import StatisticalFactorCovariance
+from python_project_raphael_corchia.risk import ArrayStopLoss
+from python_project_raphael_corchia.solver import _projected_gradient, solve_box_qp
+from python_project_raphael_corchia.transactions import TypedBroker
+from python_project_raphael_corchia.walkforward import WalkForward, rolling_folds
+
+UNIVERSE = CustomBacktest.universe
+
+
+## Portfolio optimization ##
+@pytest.mark.parametrize("n_tickers", [10, 50, 100, 500])
+def test_compute_portfolio(benchmark, n_tickers):
+    tickers = [f"T{i:03d}" for i in range(n_tickers)]
+    info = CustomFirstTwoMoments(
+        s=timedelta(days=360),
+        data_module=DataModule(synthetic_prices(tickers)),
+        adj_close_column="Adj Close",
+        warm_start=False,
+    )
+    t = datetime(2019, 6, 28)
+    information_set = info.compute_information(t)
+    portfolio = benchmark(info.compute_portfolio, t, information_set)
+    assert sum(portfolio.values()) == pytest.approx(1.0)
+
+
+@pytest.mark.parametrize("n_tickers", [10, 100])
+def test_compute_information(benchmark, n_tickers):
+    tickers = [f"T{i:03d}" for i in range(n_tickers)]
+    info = CustomFirstTwoMoments(
+        s=timedelta(days=360),
+        data_module=DataModule(synthetic_prices(tickers)),
+        adj_close_column="Adj Close",
+    )
+    benchmark(info.compute_information, datetime(2019, 6, 28))
+
+
+## Large universe with a factor covariance model ##
+@pytest.mark.parametrize("n_tickers", [1000, 5000])
+def test_factor_model_portfolio(benchmark, n_tickers):
+    # One year window, a market factor and idiosyncratic noise
+    rng = np.random.default_rng(0)
+    market = rng.normal(5e-4, 0.01, (250, 1)) * rng.uniform(0.5, 1.5, n_tickers)
+    returns = market + rng.normal(0, 0.02, (250, n_tickers))
+    prices = 100 * np.exp(np.cumsum(returns, axis=0))
+    tickers = np.array([f"T{i:04d}" for i in range(n_tickers)], dtype=object)
+    estimator = StatisticalFactorCovariance()
+    lower, upper = np.zeros(n_tickers), np.full(n_tickers, 0.01)
+
+    def rebalance():
+        info = first_two_moments(prices, tickers, None, estimator)
+        return solve_box_qp(
+            info["expected_return"], info["covariance_matrix"], 1.0, lower, upper
+        )
+
+    res = benchmark.pedantic(rebalance, rounds=3, iterations=1)
+    assert res.success
+
+
+## Compiled kernels against their NumPy fallbacks ##
+@pytest.mark.parametrize("enabled", [True, False])
+def test_projected_gradient(benchmark, monkeypatch, enabled):
+    monkeypatch.setattr(kernels, "ENABLED", enabled)
+    rng = np.random.default_rng(0)
+    returns = rng.normal(5e-4, 0.02, (250, 50))
+    mu, Sigma = returns.mean(axis=0), np.cov(returns, rowvar=False)
+    lower, upper = np.zeros(50), np.full(50, 0.05)
+    benchmark(_projected_gradient, mu, Sigma, 1.0, lower, upper, None, 1e-10, 500)
+
+
+@pytest.mark.parametrize("enabled", [True, False])
+def test_stop_loss(benchmark, monkeypatch, enabled):
+    monkeypatch.setattr(kernels, "ENABLED", enabled)
+    tickers = [f"T{i:03d}" for i in range(500)]
+    broker = TypedBroker(1e9, verbose=False)
+    t = pd.Timestamp("2019-06-28")
+    for ticker in tickers:
+        broker.buy(ticker, 10, 100.0, t)
+    # Nothing triggers, every date checks all the positions
+    prices = dict.fromkeys(tickers, 95.0)
+    benchmark(ArrayStopLoss(threshold=0.1).trigger_stop_loss, t, {}, prices, broker)
+
+
+## Full backtest ##
+@pytest.mark.parametrize("batch", [False, True])
+def test_run_backtest(benchmark, workdir, batch):
+    data = synthetic_prices(UNIVERSE)
+
+    def run():
+        backtest = CustomBacktest(
+            initial_date=datetime(2019, 1, 1),
+            final_date=datetime(2020, 1, 1),
+            information_class=CustomFirstTwoMoments,
+            data=data,
+            batch=batch,
+            max_workers=1,
+            store_results=False,
+            verbose=False,
+        )
+        backtest.run_backtest()
+        return backtest
+
+    backtest = benchmark.pedantic(run, rounds=3, iterations=1)
+    assert len(backtest.broker.transactions) > 0
+
+
+## Walk-forward evaluation ##
+@pytest.mark.parametrize("shared", [True, False])
+def test_walk_forward(benchmark, workdir, shared):
+    # Half-year folds moving by six weeks, walked together or one by one
+    data = synthetic_prices(UNIVERSE)
+    folds = rolling_folds(
+        datetime(2019, 1, 1), datetime(2020, 1, 1), timedelta(180), timedelta(42)
+    )
+    kwargs = dict(information_class=CustomFirstTwoMoments, data=data, max_workers=1)
+
+    def run():
+        if shared:
+            return WalkForward(folds, **kwargs).run()
+        return pd.concat([WalkForward([fold], **kwargs).run() for fold in folds])
+
+    result = benchmark.pedantic(run, rounds=3, iterations=1)
+    assert len(result) == len(folds)
+
+
+## Aggregations of the results page ##
+@pytest.fixture(scope="module")
+def transaction_log():
+    return synthetic_log(100_000)
+
+
+def test_summary_by_ticker(benchmark, transaction_log):
+    benchmark(transaction_summary_by_ticker, transaction_log)
+
+
+@pytest.mark.parametrize("freq", ["M", "Q"])
+def test_summary_by_period(benchmark, transaction_log, freq):
+    benchmark(transaction_summary_by_period, transaction_log, freq)
+
+
+def test_chart_inputs(benchmark, transaction_log):
+    def aggregate():
+        return charts.transaction_counts(transaction_log), charts.cash_by_date(
+            transaction_log
+        )
+
+    benchmark(aggregate)
+
+
+## Blockchain ##
+@pytest.fixture
+def chain(workdir):
+    os.makedirs("blockchain")
+    chain = Blockchain("bench")
+    log = synthetic_log(200).to_string()
+    for i in range(200):
+        chain.add_block(f"backtest{i}", log)
+    return chain
+
+
+def test_load_blockchain(benchmark, chain):
+    loaded = benchmark(load_blockchain, "bench")
+    assert len(loaded.chain) == 201
+
+
+def test_validate_blockchain(benchmark, chain):
+    assert benchmark(chain.is_valid)
+
+
+def test_monitor_verify_appended_block(benchmark, chain):
+    monitor = ChainMonitor()
+    monitor.verify(chain)
+
+    def append_and_verify():
+        chain.add_block("new", "data")
+        return monitor.verify(chain)
+
+    assert benchmark.pedantic(append_and_verify, rounds=5, iterations=1)
+
+
+@pytest.fixture
+def store(workdir):
+    # Same history as `chain`, one run per backtest
+    store = ChainStore("blockchain/bench")
+    log = synthetic_log(200).to_string()
+    for i in range(200):
+        store.append(f"backtest{i}", f"backtest{i}", log)
+    return store
+
+
+def test_store_open_index(benchmark, store):
+    # Opening a store reads the index, not the blocks
+    opened = benchmark(lambda: ChainStore("blockchain/bench").namespaces())
+    assert len(opened) == 200
+
+
+def test_store_load_run(benchmark, store):
+    loaded = benchmark(ChainStore("blockchain/bench").load, "backtest100")
+    assert loaded.is_valid()
+
+
+def test_store_append(benchmark, store):
+    log = synthetic_log(200).to_string()
+    benchmark.pedantic(
+        store.append, args=("backtest100", "backtest100", log), rounds=20
+    )
+
+
+def test_add_block_legacy(benchmark, chain):
+    # Upstream: the whole chain is pickled again for each block
+    log = synthetic_log(200).to_string()
+    benchmark.pedantic(chain.add_block, args=("new", log), rounds=20)
@@ -0,0 +1,3 @@
+from python_project_raphael_corchia.cli import main
+
+main()
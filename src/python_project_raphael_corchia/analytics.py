@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+
+# Labels of the period columns, as displayed in the interface
+PERIOD_NAMES = {"M": "Month", "Q": "Quarter"}
+
+
+def transaction_columns(df_portfolio_mvmt):
+    """Signed quantities and BUY notional of each transaction, computed once.
+
+    Args:
+        df_portfolio_mvmt (pd.DataFrame): The broker transaction log.
+
+    Returns:
+        pd.DataFrame: Total_Buy, Total_Sell, Net_Quantity and Total_Investment
+        columns aligned with the log, ready to be summed by any key.
+    """
+    action = df_portfolio_mvmt["Action"].to_numpy()
+    quantity = pd.to_numeric(df_portfolio_mvmt["Quantity"]).to_numpy()
+    if quantity.dtype.kind == "i":
+        # Quantities of the typed log are int32, their sums could overflow
+        quantity = quantity.astype(np.int64)
+    price = pd.to_numeric(df_portfolio_mvmt["Price"]).to_numpy(dtype=float)
+    buy = action == "BUY"
+    sell = action == "SELL"
+    zero = np.zeros_like(quantity)
+    total_buy = np.where(buy, quantity, zero)
+    total_sell = np.where(sell, quantity, zero)
+    return pd.DataFrame(
+        {
+            "Total_Buy": total_buy,
+            "Total_Sell": total_sell,
+            "Net_Quantity": total_buy - total_sell,
+            "Total_Investment": np.where(buy, price * quantity, 0.0),
+        },
+        index=df_portfolio_mvmt.index,
+    )
+
+
+def transaction_summary_by_ticker(df_portfolio_mvmt):
+    """BUY/SELL quantities, net quantity and BUY investment per ticker."""
+    columns = transaction_columns(df_portfolio_mvmt)
+    summary = columns.groupby(
+        df_portfolio_mvmt["Ticker"].to_numpy(), sort=True, observed=True
+    ).sum()
+    summary.index.name = "Ticker"
+    return summary.reset_index()
+
+
+def period_labels(dates, freq):
+    """Period of each date as a string, e.g. "2019-01" or "2019Q1"."""
+    periods = pd.to_datetime(dates).dt.to_period(freq)
+    # Format each distinct period once instead of every row
+    codes, uniques = pd.factorize(periods, sort=True)
+    return pd.Categorical.from_codes(codes, uniques.astype(str))
+
+
+def transaction_summary_by_period(df_portfolio_mvmt, freq="M"):
+    """BUY investment and BUY/SELL quantities per month ("M") or quarter ("Q")."""
+    name = PERIOD_NAMES.get(freq, freq)
+    columns = transaction_columns(df_portfolio_mvmt)[
+        ["Total_Investment", "Total_Buy", "Total_Sell"]
+    ]
+    grouped = columns.groupby(
+        period_labels(df_portfolio_mvmt["Date"], freq), observed=True
+    ).sum()
+    grouped.index = grouped.index.astype(str)
+    grouped.index.name = name
+    return grouped.rename(
+        columns={
+            "Total_Buy": "Total_Quantity_Buy",
+            "Total_Sell": "Total_Quantity_Sell",
+        }
+    ).reset_index()
@@ -0,0 +1,450 @@
+import itertools
+import json
+import mmap
+import os
+import pickle
+import struct
+import threading
+from contextlib import contextmanager
+
+import pandas as pd
+from pybacktestchain.blockchain import Block, Blockchain
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows, threads are still locked
+    fcntl = None
+
+# Columns of the block table displayed in the interface
+BLOCK_COLUMNS = ["Block", "Backtest", "Timestamp", "Hash", "Previous Hash"]
+# Columns of the table of the runs stored in a ChainStore
+RUN_COLUMNS = ["Run", "Blocks", "Backtest", "Timestamp"]
+# A new segment file is started once the current one reaches this size
+SEGMENT_BYTES = 64 * 1024**2
+# Length of the payload, in front of every record of a segment
+_RECORD_HEADER = struct.Struct("<I")
+
+
+## Loading and verification of the stored blockchains ##
+class ChainMonitor:
+    """Keep the loaded chains and the part of them already verified.
+
+    A chain is only unpickled again when its file changes (or, for the chain
+    of a run in a ChainStore, when blocks were appended), and `verify` only
+    re-hashes the blocks appended after the last verified block. The verified
+    prefix is trusted as long as the chain still ends it with the same hash.
+
+    Example:
+        monitor = ChainMonitor()
+        chain = monitor.load("backtest")
+        monitor.verify(chain)
+    """
+
+    def __init__(self, directory="blockchain"):
+        self.directory = directory
+        self._loaded = {}
+        self._verified = {}
+        self._stores = {}
+        self._lock = threading.Lock()
+
+    def store(self, name):
+        """ChainStore of a chain name, opened once."""
+        with self._lock:
+            if name not in self._stores:
+                self._stores[name] = ChainStore(os.path.join(self.directory, name))
+            return self._stores[name]
+
+    def load(self, name, namespace=None):
+        """Chain stored under `name`, reloaded only if its file changed.
+
+        With a namespace, the chain of that run in the ChainStore of `name`,
+        reloaded only when blocks were appended to it.
+        """
+        if namespace is not None:
+            return self._load_namespace(name, namespace)
+        path = os.path.join(self.directory, f"{name}.pkl")
+        stat = os.stat(path)
+        version = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            if name in self._loaded and self._loaded[name][0] == version:
+                return self._loaded[name][1]
+        with open(path, "rb") as f:
+            chain = pickle.load(f)
+        with self._lock:
+            self._loaded[name] = (version, chain)
+        return chain
+
+    def _load_namespace(self, name, namespace):
+        store = self.store(name)
+        version = store.height(namespace)
+        key = (name, namespace)
+        with self._lock:
+            if key in self._loaded and self._loaded[key][0] == version:
+                return self._loaded[key][1]
+        chain = store.load(namespace)
+        # Verified prefixes are kept per run
+        chain.name = f"{name}/{namespace}"
+        with self._lock:
+            self._loaded[key] = (version, chain)
+        return chain
+
+    def verified_height(self, chain):
+        """Number of leading blocks of the chain already verified."""
+        with self._lock:
+            height, last_hash = self._verified.get(chain.name, (1, None))
+        blocks = chain.chain
+        if height > len(blocks) or (
+            last_hash is not None and blocks[height - 1].hash != last_hash
+        ):
+            # Not the chain that was verified, start again after the genesis block
+            return 1
+        return height
+
+    def verify(self, chain):
+        """Same result as Blockchain.is_valid, re-hashing only the new blocks."""
+        blocks = chain.chain
+        height = self.verified_height(chain)
+        for i in range(height, len(blocks)):
+            block, previous = blocks[i], blocks[i - 1]
+            if block.hash != block.calculate_hash:
+                return False
+            if block.previous_hash != previous.hash:
+                return False
+        with self._lock:
+            self._verified[chain.name] = (len(blocks), blocks[-1].hash)
+        return True
+
+
+## Block table built page by page ##
+def iter_blocks(chain, start=0):
+    """Yield one row per block from `start`, without formatting the whole chain."""
+    for i in range(start, len(chain.chain)):
+        block = chain.chain[i]
+        yield {
+            "Block": i,
+            "Backtest": block.name_backtest,
+            "Timestamp": pd.Timestamp(block.timestamp, unit="s"),
+            "Hash": block.hash,
+            "Previous Hash": block.previous_hash,
+        }
+
+
+def block_page(chain, page, page_size=50):
+    """Rows of the blocks of one page (numbered from 0) as a DataFrame."""
+    rows = itertools.islice(iter_blocks(chain, page * page_size), page_size)
+    return pd.DataFrame(list(rows), columns=BLOCK_COLUMNS)
+
+
+## Append-only segmented storage of many chains ##
+class ChainStore:
+    """Blocks of many chains appended to shared, memory-mapped segment files.
+
+    Every namespace (one per backtest run in CustomBacktest) is a hash chain
+    of its own starting with a genesis block, as an upstream Blockchain.
+    Blocks are appended to segment files that are never rewritten, except by
+    `compact`, and `index.jsonl` records the position, hashes and backtest of
+    every block. A chain or a block is therefore read without reading the
+    other ones, and only the index is read when the store is opened.
+
+    Example:
+        store = ChainStore("blockchain/backtest")
+        store.append("run-1", "run-1", log.to_string())
+        store.load("run-1").is_valid()
+        store.find("run-1").data
+    """
+
+    def __init__(self, directory, segment_bytes=SEGMENT_BYTES):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        # Reentrant: writers refresh the index while holding it
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self._entries = []
+        self._namespaces = {}
+        self._backtests = {}
+        self._index_read = (None, 0)  # Inode and bytes of the index already read
+        self._maps = {}
+
+    def __getstate__(self):
+        # Memory maps and locks are not sent to other processes
+        return {"directory": self.directory, "segment_bytes": self.segment_bytes}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    ######## Index ########
+    def refresh(self):
+        """Read the index lines appended since the last call, by any writer."""
+        with self._lock:
+            self._refresh()
+
+    def _refresh(self):
+        path = self._path("index.jsonl")
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            self._reset()
+            return
+        inode, offset = self._index_read
+        if inode != stat.st_ino or stat.st_size < offset:
+            # The index was replaced by a compaction
+            self._reset()
+            offset = 0
+        if stat.st_size == offset:
+            return
+        with open(path, "rb") as f:
+            f.seek(offset)
+            new = f.read()
+        # A line being written by another process is read next time
+        complete = new[: new.rfind(b"\n") + 1]
+        if complete:
+            # One json document for all the new lines
+            for entry in json.loads(b"[" + complete[:-1].replace(b"\n", b",") + b"]"):
+                self._add_entry(entry)
+        self._index_read = (stat.st_ino, offset + len(complete))
+
+    def _add_entry(self, entry):
+        position = len(self._entries)
+        self._entries.append(entry)
+        self._namespaces.setdefault(entry["namespace"], []).append(position)
+        self._backtests[entry["backtest"]] = position
+
+    def namespaces(self):
+        self.refresh()
+        return list(self._namespaces)
+
+    def height(self, namespace):
+        """Number of blocks of a chain, genesis included, 0 if it is empty."""
+        self.refresh()
+        return len(self._namespaces.get(namespace, ()))
+
+    def runs(self):
+        """One row per namespace with its last block, read from the index only."""
+        self.refresh()
+        rows = []
+        for namespace, positions in self._namespaces.items():
+            last = self._entries[positions[-1]]
+            rows.append(
+                {
+                    "Run": namespace,
+                    "Blocks": len(positions),
+                    "Backtest": last["backtest"],
+                    "Timestamp": pd.Timestamp(last["timestamp"], unit="s"),
+                }
+            )
+        return pd.DataFrame(rows, columns=RUN_COLUMNS)
+
+    ######## Reading ########
+    def _map(self, segment, end):
+        # Memory map of a segment, remapped when it grew past `end`
+        mapped = self._maps.get(segment)
+        if mapped is None or len(mapped) < end:
+            with open(self._path(segment), "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._maps[segment] = mapped
+        return mapped
+
+    def _read(self, entry):
+        start = entry["offset"] + _RECORD_HEADER.size
+        end = start + entry["length"]
+        record = json.loads(self._map(entry["segment"], end)[start:end])
+        # The stored hash is kept, verifying the block recomputes it
+        block = Block.__new__(Block)
+        block.__dict__.update(record["block"])
+        return block
+
+    def block(self, namespace, i):
+        """Block `i` of a chain, read from its segment."""
+        with self._lock:
+            self._refresh()
+            return self._read(self._entries[self._namespaces[namespace][i]])
+
+    def find(self, backtest):
+        """Last block stored for a backtest name, None if there is none."""
+        with self._lock:
+            self._refresh()
+            position = self._backtests.get(backtest)
+            return None if position is None else self._read(self._entries[position])
+
+    def load(self, namespace):
+        """Chain of a namespace as an upstream Blockchain, e.g. for is_valid."""
+        with self._lock:
+            self._refresh()
+            positions = self._namespaces.get(namespace)
+            if positions is None:
+                raise KeyError(f"No chain {namespace!r} in {self.directory}")
+            blocks = [self._read(self._entries[i]) for i in positions]
+        # Built without __post_init__, which would add a block and pickle it
+        chain = Blockchain.__new__(Blockchain)
+        chain.name = namespace
+        chain.chain = blocks
+        return chain
+
+    ######## Writing ########
+    @contextmanager
+    def _writing(self):
+        # One writer at a time, across threads and processes
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock, open(self._path("lock"), "a") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            self.refresh()
+            yield
+
+    def _segment_for(self, size):
+        # Current segment, or the next one when the record does not fit
+        if not self._entries:
+            return "0000-000000.seg"
+        segment = self._entries[-1]["segment"]
+        end = self._end(self._entries[-1])
+        if end > 0 and end + size > self.segment_bytes:
+            generation, number = segment[:-4].split("-")
+            return f"{generation}-{int(number) + 1:06d}.seg"
+        return segment
+
+    @staticmethod
+    def _end(entry):
+        return entry["offset"] + _RECORD_HEADER.size + entry["length"]
+
+    def _write(self, namespace, block, segment=None, index=None):
+        payload = json.dumps({"namespace": namespace, "block": vars(block)}).encode()
+        segment = segment or self._segment_for(_RECORD_HEADER.size + len(payload))
+        path = self._path(segment)
+        with open(path, "ab") as f:
+            offset = f.tell()
+            f.write(_RECORD_HEADER.pack(len(payload)))
+            f.write(payload)
+        entry = {
+            "namespace": namespace,
+            "backtest": block.name_backtest,
+            "timestamp": block.timestamp,
+            "hash": block.hash,
+            "previous_hash": block.previous_hash,
+            "segment": segment,
+            "offset": offset,
+            "length": len(payload),
+        }
+        line = (json.dumps(entry) + "\n").encode()
+        if index is not None:
+            index.write(line)
+            return entry
+        with open(self._path("index.jsonl"), "ab") as f:
+            f.write(line)
+        self.refresh()
+        return entry
+
+    def _truncate_unindexed(self):
+        # A writer stopped between the record and its index line: the block
+        # was never acknowledged, its bytes are dropped
+        if not self._entries:
+            return
+        last = self._entries[-1]
+        path = self._path(last["segment"])
+        if os.path.getsize(path) > self._end(last):
+            os.truncate(path, self._end(last))
+
+    def append(self, namespace, backtest, data):
+        """Add a block to the chain of `namespace`, created with its genesis.
+
+        Returns:
+            Block: The new block.
+        """
+        with self._writing():
+            self._truncate_unindexed()
+            positions = self._namespaces.get(namespace)
+            if positions is None:
+                self._write(namespace, Block("Genesis Block", "", "0"))
+                positions = self._namespaces[namespace]
+            previous = self._entries[positions[-1]]["hash"]
+            block = Block(backtest, data, previous)
+            self._write(namespace, block)
+            return block
+
+    def import_chain(self, chain, namespace):
+        """Copy the blocks of an upstream Blockchain, hashes unchanged."""
+        with self._writing():
+            if namespace in self._namespaces:
+                raise ValueError(f"Chain {namespace!r} already exists")
+            self._truncate_unindexed()
+            for block in chain.chain:
+                self._write(namespace, block)
+
+    def compact(self, namespaces=None):
+        """Rewrite the blocks into new segments, each chain stored contiguously.
+
+        Args:
+            namespaces (list): Chains kept, all of them if None. The others
+                are dropped from the store.
+
+        Returns:
+            dict: Size in bytes of the segments before and after, and the
+            number of blocks kept.
+        """
+        with self._writing():
+            before = {entry["segment"] for entry in self._entries}
+            keep = list(self._namespaces) if namespaces is None else namespaces
+            generation = 0
+            if self._entries:
+                generation = int(self._entries[-1]["segment"].split("-")[0]) + 1
+            segment, size, kept = f"{generation:04d}-000000.seg", 0, 0
+            with open(self._path("index.jsonl.tmp"), "wb") as index:
+                for namespace in keep:
+                    for position in self._namespaces.get(namespace, ()):
+                        entry = self._entries[position]
+                        block = self._read(entry)
+                        if size and size + entry["length"] > self.segment_bytes:
+                            number = int(segment[5:11]) + 1
+                            segment, size = f"{generation:04d}-{number:06d}.seg", 0
+                        written = self._write(namespace, block, segment, index)
+                        size = self._end(written)
+                        kept += 1
+            before_bytes = sum(os.path.getsize(self._path(name)) for name in before)
+            after = {f for f in os.listdir(self.directory) if f.endswith(".seg")}
+            after -= before
+            # Readers see the new index at once, or the old one with its segments
+            os.replace(self._path("index.jsonl.tmp"), self._path("index.jsonl"))
+            for name in before:
+                os.remove(self._path(name))
+            self._reset()
+            self.refresh()
+            return {
+                "bytes_before": before_bytes,
+                "bytes_after": sum(os.path.getsize(self._path(f)) for f in after),
+                "blocks": kept,
+            }
+
+
+def open_chain_store(name, directory="blockchain"):
+    """ChainStore of a chain name, importing its legacy pickle on first use.
+
+    The chain pickled by pybacktestchain under `<directory>/<name>.pkl`, if
+    any, becomes the namespace "legacy" of the new store.
+    """
+    store = ChainStore(os.path.join(directory, name))
+    legacy = os.path.join(directory, f"{name}.pkl")
+    if not store.namespaces() and os.path.exists(legacy):
+        with open(legacy, "rb") as f:
+            chain = pickle.load(f)
+        try:
+            store.import_chain(chain, "legacy")
+        except ValueError:
+            # Imported by another process in the meantime
+            pass
+    return store
+
+
+def load_blockchain(name, namespace=None, directory="blockchain"):
+    """Chain of a run from the segmented store of `name`.
+
+    Without a namespace, the pickled chain of pybacktestchain's
+    load_blockchain is read instead.
+    """
+    if namespace is None:
+        with open(os.path.join(directory, f"{name}.pkl"), "rb") as f:
+            return pickle.load(f)
+    return ChainStore(os.path.join(directory, name)).load(namespace)
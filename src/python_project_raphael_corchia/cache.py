@@ -0,0 +1,149 @@
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date, datetime
+
+import pandas as pd
+
+
+## Result of a backtest as kept in the cache ##
+@dataclass
+class CachedResult:
+    key: str
+    backtest_name: str
+    transaction_log: pd.DataFrame
+    trace: dict = None  # Tracer snapshot of the run, see tracing.py
+
+
+def _canonical(value):
+    # JSON-friendly representation that does not depend on object identity
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, type):
+        return value.__name__
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in sorted(value.items())}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    return repr(value)
+
+
+def config_key(**config):
+    """Stable hash of a backtest configuration.
+
+    Example:
+        config_key(initial_date=datetime(2019, 1, 1), gamma=1.0, risk_model=StopLoss)
+    """
+    payload = json.dumps(_canonical(config), sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+
+class ResultCache:
+    """Two-level cache of backtest results.
+
+    Results are kept in `memory` (e.g. st.session_state) for the current
+    session and as Parquet files in `directory` across sessions. The disk
+    level evicts the least recently used results once it exceeds `max_bytes`.
+    """
+
+    def __init__(
+        self,
+        directory="backtest_cache",
+        max_bytes=500 * 1024**2,
+        memory=None,
+        max_memory_items=8,
+    ):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_memory_items = max_memory_items
+        if memory is None:
+            memory = {}
+        # The session state only stores plain objects, keep an ordered dict in it
+        self._memory = memory.setdefault("backtest_results", OrderedDict())
+
+    def _paths(self, key):
+        base = os.path.join(self.directory, key)
+        return f"{base}.parquet", f"{base}.json"
+
+    def _index(self):
+        # Size and last access of every result stored on disk
+        entries = []
+        if not os.path.isdir(self.directory):
+            return entries
+        for file in os.listdir(self.directory):
+            if file.endswith(".json"):
+                key = file[: -len(".json")]
+                data_path, meta_path = self._paths(key)
+                if not os.path.exists(data_path):
+                    continue
+                size = os.path.getsize(data_path) + os.path.getsize(meta_path)
+                entries.append((os.path.getmtime(meta_path), size, key))
+        return sorted(entries)
+
+    def _remember(self, result):
+        self._memory[result.key] = result
+        self._memory.move_to_end(result.key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
+    def get(self, key):
+        """Return the cached result of a configuration, or None."""
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return self._memory[key]
+        data_path, meta_path = self._paths(key)
+        if not (os.path.exists(data_path) and os.path.exists(meta_path)):
+            return None
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            result = CachedResult(
+                key,
+                meta["backtest_name"],
+                pd.read_parquet(data_path),
+                meta.get("trace"),
+            )
+            # Touch the metadata file, its modification time drives the eviction
+            os.utime(meta_path)
+        except FileNotFoundError:
+            # Evicted by another session while reading
+            return None
+        self._remember(result)
+        return result
+
+    def put(self, key, backtest_name, transaction_log, trace=None):
+        """Store a result in memory and on disk, then enforce the size limit."""
+        result = CachedResult(key, backtest_name, transaction_log, trace)
+        data_path, meta_path = self._paths(key)
+        os.makedirs(self.directory, exist_ok=True)
+        transaction_log.infer_objects().to_parquet(data_path, index=False)
+        with open(meta_path, "w") as f:
+            json.dump(
+                {
+                    "backtest_name": backtest_name,
+                    "created": time.time(),
+                    "trace": trace,
+                },
+                f,
+            )
+        self._remember(result)
+        self.evict()
+        return result
+
+    def evict(self):
+        # Drop the least recently used results until the limit is met
+        entries = self._index()
+        total = sum(size for _, size, _ in entries)
+        for _, size, key in entries:
+            if total <= self.max_bytes:
+                break
+            for path in self._paths(key):
+                if os.path.exists(path):
+                    os.remove(path)
+            self._memory.pop(key, None)
+            total -= size
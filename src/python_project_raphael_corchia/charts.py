@@ -0,0 +1,183 @@
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+# Points sent per line chart, about two per pixel of a wide chart
+MAX_POINTS = 2000
+# Below this number of points the markers are still drawn
+MARKERS_MAX_POINTS = 200
+
+
+## Downsampling of line charts ##
+def _as_float(x):
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.astype("datetime64[ns]").astype(np.int64).astype(float)
+    return x.astype(float)
+
+
+def lttb(x, y, n_out):
+    """Indices of the points kept by Largest-Triangle-Three-Buckets.
+
+    The first and last points are kept, every bucket in between keeps the
+    point forming the largest triangle with the previous kept point and the
+    average of the next bucket, which preserves the visual shape of the line.
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x, y = _as_float(x), np.asarray(y, dtype=float)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    indices = np.empty(n_out, dtype=int)
+    indices[0], indices[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_x = x[edges[i + 1] : edges[i + 2]].mean()
+            next_y = y[edges[i + 1] : edges[i + 2]].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+        area = np.abs(
+            (x[a] - next_x) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (next_y - y[a])
+        )
+        a = start + int(np.argmax(area))
+        indices[i + 1] = a
+    return indices
+
+
+def min_max(x, y, n_out):
+    """Indices of the minimum and maximum of n_out / 2 buckets, in order.
+
+    Cheaper than LTTB and keeps every extreme value, e.g. the lowest cash.
+    """
+    n = len(y)
+    if n_out >= n or n_out < 2:
+        return np.arange(n)
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(0, n, n_out // 2 + 1).astype(int)
+    indices = []
+    for start, end in zip(edges[:-1], edges[1:]):
+        if end > start:
+            bucket = y[start:end]
+            indices += [start + np.argmin(bucket), start + np.argmax(bucket)]
+    return np.unique(indices)
+
+
+def downsample(x, y, max_points=MAX_POINTS, method="lttb"):
+    """Points of a line reduced to at most `max_points`, with "lttb" or "minmax"."""
+    keep = (lttb if method == "lttb" else min_max)(x, y, max_points)
+    return np.asarray(x)[keep], np.asarray(y)[keep]
+
+
+## Aggregated inputs of the charts ##
+def cash_by_date(df_portfolio_mvmt):
+    """Cash after the last transaction of each date, sorted by date."""
+    dates = pd.to_datetime(df_portfolio_mvmt["Date"]).to_numpy()
+    cash = pd.to_numeric(df_portfolio_mvmt["Cash"]).to_numpy(dtype=float)
+    # Stable sort, the transactions of a date keep the order of the log
+    order = np.argsort(dates, kind="stable")
+    dates, cash = dates[order], cash[order]
+    last = np.r_[dates[1:] != dates[:-1], True] if len(dates) else np.zeros(0, bool)
+    return dates[last], cash[last]
+
+
+def transaction_counts(df_portfolio_mvmt):
+    """Number of transactions per ticker and action, the input of both charts."""
+    return (
+        df_portfolio_mvmt.groupby(["Ticker", "Action"], observed=True)
+        .size()
+        .reset_index(name="Count")
+    )
+
+
+## Figures ##
+def line_figure(
+    dates,
+    values,
+    name,
+    title,
+    yaxis_title,
+    color="blue",
+    max_points=MAX_POINTS,
+    method="lttb",
+):
+    """Line over time, downsampled and drawn with WebGL.
+
+    Missing values (e.g. a rolling metric before its first window) are dropped.
+    """
+    values = np.asarray(values, dtype=float)
+    finite = np.isfinite(values)
+    x, y = downsample(np.asarray(dates)[finite], values[finite], max_points, method)
+    fig = go.Figure()
+    fig.add_trace(
+        go.Scattergl(
+            x=x,
+            y=y,
+            mode="lines+markers" if len(x) <= MARKERS_MAX_POINTS else "lines",
+            name=name,
+            line=dict(color=color),
+            marker=dict(size=8),
+        )
+    )
+    fig.update_layout(
+        title=title,
+        xaxis_title="Date",
+        yaxis_title=yaxis_title,
+        template="plotly_white",
+        hovermode="x unified",
+    )
+    return fig
+
+
+def cash_figure(dates, cash, max_points=MAX_POINTS, method="lttb"):
+    """Cash over time, downsampled and drawn with WebGL."""
+    return line_figure(
+        dates,
+        cash,
+        "Cash",
+        "Evolution of Cash Over Time",
+        "Cash ($)",
+        max_points=max_points,
+        method=method,
+    )
+
+
+def pnl_bar(pnl_by_ticker):
+    """P&L of each ticker, from Performance.pnl_by_ticker."""
+    return px.bar(
+        pnl_by_ticker,
+        x="Ticker",
+        y="PnL",
+        color=np.where(pnl_by_ticker["PnL"] >= 0, "Gain", "Loss"),
+        color_discrete_map={"Gain": "green", "Loss": "red"},
+        title="P&L Attribution by Ticker",
+        labels={"PnL": "P&L ($)", "color": ""},
+    )
+
+
+def ticker_pie(counts):
+    """Share of the transactions of each ticker, from transaction_counts."""
+    by_ticker = counts.groupby("Ticker", observed=True)["Count"].sum().reset_index()
+    return px.pie(
+        by_ticker,
+        values="Count",
+        names="Ticker",
+        title="Distribution of Transactions by Ticker",
+        hole=0.4,
+    )
+
+
+def action_bar(counts):
+    """BUY and SELL transactions of each ticker, from transaction_counts."""
+    return px.bar(
+        counts,
+        x="Ticker",
+        y="Count",
+        color="Action",
+        barmode="group",
+        title="BUY and SELL Distribution by Ticker",
+        labels={"Count": "Number of Transactions", "Ticker": "Ticker"},
+    )
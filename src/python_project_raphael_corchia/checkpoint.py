@@ -0,0 +1,74 @@
+import os
+import pickle
+from dataclasses import dataclass
+from datetime import datetime
+
+import pandas as pd
+
+
+## State of a backtest at the last processed date ##
+@dataclass
+class BacktestCheckpoint:
+    """Everything needed to extend a backtest without replaying its history.
+
+    Attributes:
+        fingerprint (str): Hash of the configuration the state belongs to.
+        backtest_name (str): Name of the extended backtest.
+        last_date (datetime): Last date processed by the loop.
+        cash (float): Cash of the broker.
+        positions (dict): Positions of the broker, by ticker.
+        entry_prices (dict): Entry prices used by the stop loss, by ticker.
+        transaction_log (pd.DataFrame): Transactions up to `last_date`.
+        last_weights (dict): Weights of the last optimization (warm start).
+        risk_model (object): Risk model instance, None if disabled.
+    """
+
+    fingerprint: str
+    backtest_name: str
+    last_date: datetime
+    cash: float
+    positions: dict
+    entry_prices: dict
+    transaction_log: pd.DataFrame
+    last_weights: dict = None
+    risk_model: object = None
+
+    @classmethod
+    def capture(cls, fingerprint, backtest_name, last_date, broker, info, risk_model):
+        return cls(
+            fingerprint=fingerprint,
+            backtest_name=backtest_name,
+            last_date=last_date,
+            cash=broker.cash,
+            positions=broker.positions,
+            entry_prices=broker.entry_prices,
+            transaction_log=broker.transaction_log,
+            last_weights=getattr(info, "_last_weights", None),
+            risk_model=risk_model,
+        )
+
+    def restore(self, broker, info):
+        # Put the broker and the information object back in their saved state
+        broker.cash = self.cash
+        broker.positions = self.positions
+        broker.entry_prices = self.entry_prices
+        broker.transaction_log = self.transaction_log
+        if hasattr(info, "_last_weights"):
+            info._last_weights = self.last_weights
+
+    def save(self, path):
+        # Write to a temporary file first so a crash never leaves half a checkpoint
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(f"{path}.tmp", "wb") as f:
+            pickle.dump(self, f)
+        os.replace(f"{path}.tmp", path)
+
+
+def load_checkpoint(path):
+    """Return the checkpoint stored at `path`, or None if there is none."""
+    if path is None or not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        return pickle.load(f)
@@ -0,0 +1,148 @@
+import argparse
+import json
+import logging
+import os
+import time
+from datetime import datetime
+
+from pybacktestchain.broker import EndOfMonth
+
+from python_project_raphael_corchia.blockchain import open_chain_store
+from python_project_raphael_corchia.data_store import PriceStore
+from python_project_raphael_corchia.engine import (
+    CustomBacktest,
+    CustomFirstTwoMoments,
+)
+from python_project_raphael_corchia.risk import ArrayStopLoss
+from python_project_raphael_corchia.universe import resolve_universe
+
+# Classes selectable by name in a configuration file
+REBALANCE_FLAGS = {"EndOfMonth": EndOfMonth}
+RISK_MODELS = {"StopLoss": ArrayStopLoss, None: None}
+
+
+def load_config(path):
+    """Read a backtest configuration from a JSON file.
+
+    Example of configuration:
+        {"initial_date": "2019-01-01", "final_date": "2020-01-01",
+         "gamma": 1.0, "bounds": [[0.0, 1.0]], "estimator": "sample",
+         "universe": ["AAPL", "MSFT"], "price_store": "market_data"}
+
+    The universe can also be the path of an index constituents file, e.g.
+    "universe": "sp500.csv", and large universes use "estimator": "factor".
+    """
+    with open(path) as f:
+        return json.load(f)
+
+
+def config_classes(config):
+    """Rebalance flag and risk model classes named by a configuration.
+
+    Raises:
+        ValueError: If a name is not in REBALANCE_FLAGS or RISK_MODELS.
+    """
+    classes = []
+    for table, key, default in (
+        (REBALANCE_FLAGS, "rebalance_flag", "EndOfMonth"),
+        (RISK_MODELS, "risk_model", "StopLoss"),
+    ):
+        name = config.get(key, default)
+        if name not in table:
+            allowed = ", ".join(json.dumps(k) for k in table)
+            raise ValueError(f"Unknown {key} {json.dumps(name)}, use one of {allowed}")
+        classes.append(table[name])
+    return tuple(classes)
+
+
+def backtest_from_config(config):
+    """CustomBacktest described by a configuration dictionary."""
+    rebalance_flag, risk_model = config_classes(config)
+    config = dict(config)
+    config.pop("rebalance_flag", None)
+    config.pop("risk_model", None)
+    information_kwargs = {
+        k: config.pop(k) for k in ("gamma", "bounds", "estimator") if k in config
+    }
+    if "bounds" in information_kwargs:
+        information_kwargs["bounds"] = [tuple(b) for b in information_kwargs["bounds"]]
+    price_store = config.pop("price_store", None)
+    universe = resolve_universe(config.pop("universe", None))
+    offline = config.pop("offline", False)
+    return CustomBacktest(
+        initial_date=datetime.fromisoformat(config.pop("initial_date")),
+        final_date=datetime.fromisoformat(config.pop("final_date")),
+        information_class=CustomFirstTwoMoments,
+        information_kwargs=information_kwargs,
+        rebalance_flag=rebalance_flag,
+        risk_model=risk_model,
+        price_store=(PriceStore(price_store, offline=offline) if price_store else None),
+        universe=universe,
+        **config,
+    )
+
+
+def run(config, output):
+    """Run one backtest and write its transactions and summary to `output`.
+
+    Returns:
+        dict: The summary written to `output/summary.json`.
+    """
+    start = time.perf_counter()
+    backtest = backtest_from_config(config)
+    backtest.run_backtest()
+    log = backtest.broker.get_transaction_log()
+    prices = backtest.information.get_prices(backtest.final_date)
+
+    os.makedirs(output, exist_ok=True)
+    log.infer_objects().to_parquet(
+        os.path.join(output, "transactions.parquet"), index=False
+    )
+    summary = {
+        "backtest_name": backtest.backtest_name,
+        "config": config,
+        "final_value": backtest.broker.get_portfolio_value(prices),
+        "final_cash": backtest.broker.get_cash_balance(),
+        "n_trades": len(log),
+        "performance": backtest.performance().summary(),
+        "elapsed_seconds": time.perf_counter() - start,
+    }
+    with open(os.path.join(output, "summary.json"), "w") as f:
+        json.dump(summary, f, indent=2, default=str)
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m python_project_raphael_corchia",
+        description="Run backtests without the Streamlit interface.",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="run the backtest of a config file")
+    run_parser.add_argument("--config", required=True, help="JSON configuration")
+    run_parser.add_argument(
+        "--output", default="results", help="directory of the result files"
+    )
+    run_parser.add_argument("--quiet", action="store_true", help="only log warnings")
+    compact_parser = commands.add_parser(
+        "compact", help="rewrite the segments of a stored blockchain"
+    )
+    compact_parser.add_argument("--chain", default="backtest", help="chain name")
+    compact_parser.add_argument(
+        "--keep", nargs="+", help="runs to keep, the others are dropped"
+    )
+    args = parser.parse_args(argv)
+
+    if args.command == "compact":
+        store = open_chain_store(args.chain)
+        print(json.dumps(store.compact(args.keep), indent=2))
+        return
+    if args.quiet:
+        logging.getLogger().setLevel(logging.WARNING)
+    config = load_config(args.config)
+    try:
+        config_classes(config)
+    except ValueError as e:
+        parser.error(str(e))
+    summary = run(config, args.output)
+    print(json.dumps(summary, indent=2, default=str))
@@ -0,0 +1,336 @@
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass, field, replace
+
+import numpy as np
+import pandas as pd
+from pybacktestchain.data_module import get_stocks_data
+
+from python_project_raphael_corchia.estimators import SampleCovariance
+
+# Stores of several threads may write to the same directory
+_WRITE_LOCK = threading.Lock()
+
+
+def _naive_dates(values):
+    # Dates without time zone, as compared by Information.slice_data
+    dates = pd.to_datetime(pd.Series(values))
+    if dates.dt.tz is not None:
+        dates = dates.dt.tz_localize(None)
+    return dates
+
+
+def _day(value):
+    return pd.Timestamp(value).strftime("%Y-%m-%d")
+
+
+def _rows(dates, start, end):
+    # Positions of the sorted dates in [start, end)
+    i0 = np.searchsorted(dates, pd.Timestamp(start).to_datetime64(), side="left")
+    i1 = np.searchsorted(dates, pd.Timestamp(end).to_datetime64(), side="left")
+    return i0, max(i0, i1)
+
+
+## Prices of a DataFrame as a (dates x tickers) matrix, kept in memory ##
+@dataclass
+class PriceMatrix:
+    """In-memory counterpart of PriceStore, built once from a price table."""
+
+    dates: np.ndarray
+    prices: np.ndarray
+    tickers: np.ndarray
+
+    @classmethod
+    def from_frame(
+        cls, df, time_column="Date", company_column="ticker", price_column="Adj Close"
+    ):
+        wide = (
+            pd.DataFrame(
+                {
+                    time_column: _naive_dates(df[time_column]).to_numpy(),
+                    company_column: df[company_column].to_numpy(),
+                    price_column: df[price_column].to_numpy(dtype=float),
+                }
+            )
+            .pivot_table(
+                index=time_column,
+                columns=company_column,
+                values=price_column,
+                aggfunc="last",
+            )
+            .sort_index()
+            .sort_index(axis=1)
+        )
+        return cls(
+            wide.index.to_numpy(dtype="datetime64[ns]"),
+            wide.to_numpy(dtype=np.float64),
+            np.array(wide.columns, dtype=object),
+        )
+
+    def window(self, start, end):
+        """Dates, prices and tickers in [start, end), as views."""
+        i0, i1 = _rows(self.dates, start, end)
+        return self.dates[i0:i1], self.prices[i0:i1], self.tickers
+
+
+## Local price store, one memory-mapped (dates x tickers) matrix ##
+@dataclass
+class PriceStore:
+    """Prices kept on disk and read through memory maps.
+
+    The directory holds `prices.npy` (dates x tickers, NaN when a ticker has
+    no price), `dates.npy` and `store.json` with the tickers and the period
+    already downloaded for each of them. `update` only downloads the missing
+    part of a period; with `offline=True` the store never downloads and only
+    serves what is already on disk.
+
+    A store can be restricted to some tickers and to a period with `restrict`,
+    the windows returned by `window` are then views on the memory map.
+
+    Example:
+        store = PriceStore("market_data", tickers=["AAPL", "MSFT"])
+        store.update("2019-01-01", "2020-01-01")
+        dates, prices, tickers = store.window(datetime(2019, 1, 1), datetime(2019, 7, 1))
+    """
+
+    directory: str = "market_data"
+    tickers: list = None
+    start: object = None
+    end: object = None
+    offline: bool = False
+    fetch: object = None
+    time_column: str = "Date"
+    company_column: str = "ticker"
+    price_column: str = "Adj Close"
+    _cache: dict = field(default_factory=dict, init=False, repr=False, compare=False)
+
+    ######## Files ########
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _meta(self):
+        if "meta" not in self._cache:
+            path = self._path("store.json")
+            if os.path.exists(path):
+                with open(path) as f:
+                    self._cache["meta"] = json.load(f)
+            else:
+                self._cache["meta"] = {"tickers": [], "coverage": {}}
+        return self._cache["meta"]
+
+    def _arrays(self):
+        # Memory maps of the stored dates and prices, opened once
+        if "arrays" not in self._cache:
+            tickers = self._meta()["tickers"]
+            if tickers and os.path.exists(self._path("prices.npy")):
+                dates = np.load(self._path("dates.npy"))
+                prices = np.load(self._path("prices.npy"), mmap_mode="r")
+            else:
+                dates = np.array([], dtype="datetime64[ns]")
+                prices = np.empty((0, len(tickers)))
+            self._cache["arrays"] = dates, prices
+        return self._cache["arrays"]
+
+    def _write(self, wide, coverage):
+        os.makedirs(self.directory, exist_ok=True)
+        # Temporary files replaced at once, readers keep their previous map
+        for name, array in (
+            ("dates.npy", wide.index.to_numpy(dtype="datetime64[ns]")),
+            ("prices.npy", wide.to_numpy(dtype=np.float64)),
+        ):
+            with open(self._path(f"{name}.tmp"), "wb") as f:
+                np.save(f, array)
+            os.replace(self._path(f"{name}.tmp"), self._path(name))
+        meta = {"tickers": list(wide.columns), "coverage": coverage}
+        with open(self._path("store.json.tmp"), "w") as f:
+            json.dump(meta, f)
+        os.replace(self._path("store.json.tmp"), self._path("store.json"))
+        self._cache.clear()
+
+    ######## Download ########
+    def missing_ranges(self, start, end):
+        """Periods to download so that every ticker covers [start, end)."""
+        start, end = _day(start), _day(end)
+        coverage = self._meta()["coverage"]
+        missing = {}
+        for ticker in self.tickers or []:
+            if ticker not in coverage:
+                missing.setdefault((start, end), []).append(ticker)
+                continue
+            covered_start, covered_end = coverage[ticker]
+            if start < covered_start:
+                missing.setdefault((start, covered_start), []).append(ticker)
+            if end > covered_end:
+                missing.setdefault((covered_end, end), []).append(ticker)
+        # Tickers missing the same period are downloaded together
+        return [(tickers, s, e) for (s, e), tickers in sorted(missing.items())]
+
+    def update(self, start, end):
+        """Download the prices missing in [start, end) and store them."""
+        with _WRITE_LOCK:
+            # Another store may have written the directory in the meantime
+            self._cache.clear()
+            self._update(start, end)
+
+    def _update(self, start, end):
+        ranges = self.missing_ranges(start, end)
+        if not ranges:
+            return
+        if self.offline:
+            logging.warning("Offline price store, missing prices are not downloaded.")
+            return
+
+        fetch = self.fetch or get_stocks_data
+        coverage = {k: list(v) for k, v in self._meta()["coverage"].items()}
+        frames = []
+        for tickers, range_start, range_end in ranges:
+            try:
+                df = fetch(tickers, range_start, range_end)
+            except ValueError:
+                # get_stocks_data fails when none of the tickers is found
+                logging.warning(f"No prices found for {tickers}")
+                continue
+            frames.append(df)
+            for ticker in tickers:
+                covered = coverage.get(ticker, [range_start, range_end])
+                coverage[ticker] = [
+                    min(covered[0], range_start),
+                    max(covered[1], range_end),
+                ]
+        if not frames:
+            return
+
+        df = pd.concat(frames, ignore_index=True)
+        new = pd.DataFrame(
+            {
+                self.time_column: _naive_dates(df[self.time_column]).to_numpy(),
+                self.company_column: df[self.company_column].to_numpy(),
+                self.price_column: df[self.price_column].to_numpy(dtype=float),
+            }
+        ).pivot_table(
+            index=self.time_column,
+            columns=self.company_column,
+            values=self.price_column,
+            aggfunc="last",
+        )
+        dates, prices = self._arrays()
+        stored = pd.DataFrame(
+            np.asarray(prices), index=dates, columns=self._meta()["tickers"]
+        )
+        wide = new.combine_first(stored).sort_index().sort_index(axis=1)
+        self._write(wide, coverage)
+
+    ######## Reading ########
+    def restrict(self, tickers=None, start=None, end=None):
+        """Same store seen through some tickers and/or a period."""
+        return replace(
+            self,
+            tickers=self.tickers if tickers is None else list(tickers),
+            start=self.start if start is None else start,
+            end=self.end if end is None else end,
+        )
+
+    def _columns(self):
+        # Columns of the selected tickers, a slice when they are contiguous
+        stored = self._meta()["tickers"]
+        if self.tickers is None:
+            return slice(None), list(stored)
+        position = {ticker: j for j, ticker in enumerate(stored)}
+        columns = sorted(position[t] for t in set(self.tickers) if t in position)
+        names = [stored[j] for j in columns]
+        if columns and columns == list(range(columns[0], columns[-1] + 1)):
+            return slice(columns[0], columns[-1] + 1), names
+        return np.array(columns, dtype=int), names
+
+    def window(self, start, end):
+        """Dates, prices and tickers in [start, end), within the store limits.
+
+        The prices are a read-only view on the memory map whenever the
+        selected tickers are contiguous in the store (e.g. a store holding
+        only the backtest universe).
+        """
+        dates, prices = self._arrays()
+        lower, upper = pd.Timestamp(start), pd.Timestamp(end)
+        if self.start is not None:
+            lower = max(lower, pd.Timestamp(self.start))
+        if self.end is not None:
+            upper = min(upper, pd.Timestamp(self.end))
+        i0, i1 = _rows(dates, lower, upper)
+        columns, names = self._columns()
+        return dates[i0:i1], prices[i0:i1, columns], np.array(names, dtype=object)
+
+    def to_frame(self):
+        """Long table of the selected prices, in the get_stocks_data format."""
+        dates, prices, tickers = self.window(pd.Timestamp.min, pd.Timestamp.max)
+        frames = []
+        for j, ticker in enumerate(tickers):
+            available = ~np.isnan(prices[:, j])
+            frames.append(
+                pd.DataFrame(
+                    {
+                        self.time_column: dates[available],
+                        self.price_column: prices[available, j],
+                        self.company_column: ticker,
+                    }
+                )
+            )
+        if not frames:
+            return pd.DataFrame(
+                columns=[self.time_column, self.price_column, self.company_column]
+            )
+        return pd.concat(frames, ignore_index=True)
+
+
+## Information set computed on the price matrix of a window ##
+def last_prices(prices, tickers):
+    """Last available price of each ticker, as Information.get_prices."""
+    if len(prices) == 0:
+        return {}
+    available = ~np.isnan(prices)
+    last = len(prices) - 1 - np.argmax(available[::-1], axis=0)
+    return {
+        tickers[j]: float(prices[last[j], j])
+        for j in np.flatnonzero(available.any(axis=0))
+    }
+
+
+def first_two_moments(prices, tickers, dates=None, estimator=None):
+    """Expected returns, covariance and companies, as FirstTwoMoments does.
+
+    Returns are computed between consecutive available prices of each ticker,
+    the covariance on the dates where every ticker of the window has a price,
+    with `estimator` (see estimators.py, sample covariance by default).
+    """
+    available = ~np.isnan(prices)
+    present = available.any(axis=0)
+    prices, available = prices[:, present], available[:, present]
+    companies = np.asarray(tickers, dtype=object)[present]
+    n = len(companies)
+
+    if available.all():
+        # Complete window, one vectorized pass over the matrix
+        returns = prices[1:] / prices[:-1] - 1
+        count = len(returns)
+        mu = returns.sum(axis=0) / count if count else np.full(n, np.nan)
+    else:
+        mu = np.full(n, np.nan)
+        for j in range(n):
+            column = prices[available[:, j], j]
+            if len(column) > 1:
+                mu[j] = np.mean(column[1:] / column[:-1] - 1)
+
+    complete = available.all(axis=1)
+    if complete.all():
+        rows, row_dates = prices, dates
+    else:
+        rows = prices[complete]
+        row_dates = None if dates is None else dates[complete]
+    estimator = estimator or SampleCovariance()
+    Sigma = estimator.covariance(row_dates, rows, companies)
+    return {
+        "expected_return": mu,
+        "covariance_matrix": Sigma,
+        "companies": companies,
+    }
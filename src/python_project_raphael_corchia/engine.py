@@ -0,0 +1,600 @@
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from itertools import repeat
+
+import numpy as np
+import pandas as pd
+from pybacktestchain.broker import Backtest
+from pybacktestchain.data_module import DataModule, FirstTwoMoments, get_stocks_data
+from scipy.optimize import minimize
+
+from python_project_raphael_corchia.cache import config_key
+from python_project_raphael_corchia.checkpoint import (
+    BacktestCheckpoint,
+    load_checkpoint,
+)
+from python_project_raphael_corchia.data_store import (
+    PriceMatrix,
+    PriceStore,
+    first_two_moments,
+    last_prices,
+)
+from python_project_raphael_corchia.estimators import (
+    FactorCovariance,
+    SampleCovariance,
+    make_estimator,
+)
+from python_project_raphael_corchia.metrics import performance
+from python_project_raphael_corchia.profiling import StageProfiler, profiler_from_env
+from python_project_raphael_corchia.solver import (
+    expand_bounds,
+    mean_variance_objective_and_gradient,
+    solve_box_qp,
+    solve_budget_kkt_batch,
+)
+from python_project_raphael_corchia.tracing import NULL_TRACER, Tracer
+from python_project_raphael_corchia.transactions import TypedBroker
+
+
+@contextmanager
+def _nested(*contexts):
+    # Enter several context managers as one
+    with ExitStack() as stack:
+        for context in contexts:
+            stack.enter_context(context)
+        yield
+
+
+def _try_solve_box_qp(mu, Sigma, gamma, lower, upper, x0=None):
+    # A solver error leaves the date unsolved, it then gets equal weights
+    try:
+        return solve_box_qp(mu, Sigma, gamma, lower, upper, x0=x0)
+    except Exception as e:
+        logging.warning(e)
+        return None
+
+
+## Define a custom class of the first two moments one in order to be able to modify some parameters ##
+@dataclass
+class CustomFirstTwoMoments(FirstTwoMoments):
+    gamma: float = 1.0  # Default risk aversion parameter
+    cons: list = None  # Default to None, will define later if not provided
+    bounds: list = None  # Default to None, will define later if not provided
+    solver: str = "analytic"  # "analytic" engine or "scipy" minimize
+    warm_start: bool = True  # Start each optimization from the previous weights
+    min_parallel_dates: int = 16  # Iterative solves needed before using processes
+    price_store: PriceStore = None  # Read the prices from a local store if set
+    estimator: object = "sample"  # Covariance estimator, see estimators.py
+    tracer: object = NULL_TRACER  # Solver statistics, see tracing.py
+
+    def __post_init__(self):
+        # The analytic engine only handles the default budget constraint
+        self._budget_only = self.cons is None
+        # Weights of the last successful optimization, used as warm start
+        self._last_weights = None
+        # One instance per information object, it keeps the rolling state
+        self._estimator = make_estimator(self.estimator)
+        self._prices = self.price_store
+        if self.cons is None:
+            # Default constraint: portfolio weights sum to 1
+            self.cons = [{"type": "eq", "fun": lambda x: np.sum(x) - 1}]
+        if self.bounds is None:
+            # Default bounds: allow short selling
+            self.bounds = [(0.0, 1.0)]  # Change if needed
+
+    def prices_between(self, start: datetime, end: datetime):
+        # Dates, prices and tickers in [start, end) as matrix views
+        if self._prices is None:
+            # Without a store, the price table is pivoted once for all dates
+            self._prices = PriceMatrix.from_frame(
+                self.data_module.data,
+                self.time_column,
+                self.company_column,
+                self.adj_close_column,
+            )
+        return self._prices.window(start, end)
+
+    def price_window(self, t: datetime):
+        # Lookback window of a date
+        return self.prices_between(t - self.s, t)
+
+    def compute_information(self, t: datetime):
+        if self.price_store is None and isinstance(self._estimator, SampleCovariance):
+            return super().compute_information(t)
+        # Moments computed on a view of the lookback window, without DataFrame
+        dates, prices, tickers = self.price_window(t)
+        return first_two_moments(prices, tickers, dates, self._estimator)
+
+    def get_prices(self, t: datetime):
+        if self.price_store is None:
+            return super().get_prices(t)
+        _, prices, tickers = self.price_window(t)
+        return last_prices(prices, tickers)
+
+    def initial_guess(self, companies):
+        # Previous weights if the universe did not change, None otherwise
+        last = self._last_weights
+        if self.warm_start and last is not None and list(last) == list(companies):
+            return np.array([last[k] for k in companies], dtype=float)
+        return None
+
+    def optimize(self, mu, Sigma, x0=None):
+        # Default constraints are solved analytically, custom ones go through scipy
+        if self.solver == "analytic" and self._budget_only:
+            lower, upper = expand_bounds(self.bounds, len(mu))
+            with self.tracer.span("solver"):
+                res = solve_box_qp(mu, Sigma, self.gamma, lower, upper, x0=x0)
+            self.tracer.count(f"solver.method.{res.method}")
+            self.tracer.observe("solver.iterations", res.iterations)
+            return res.x, res.success
+
+        # Initial guess: equal weights unless warm started
+        if x0 is None:
+            x0 = np.ones(len(mu)) / len(mu)
+        if not isinstance(Sigma, FactorCovariance):
+            Sigma = np.ascontiguousarray(Sigma)
+        with self.tracer.span("solver"):
+            # Objective and gradient from one call, compiled when numba is on
+            res = minimize(
+                mean_variance_objective_and_gradient,
+                x0,
+                args=(mu, Sigma, float(self.gamma)),
+                jac=True,
+                constraints=self.cons,
+                bounds=self.bounds,
+            )
+        self.tracer.count("solver.method.scipy")
+        self.tracer.observe("solver.iterations", res.nit)
+        return res.x, res.success
+
+    def compute_portfolio(self, t: datetime, information_set):
+        try:
+            mu = np.asarray(information_set["expected_return"], dtype=float)
+            Sigma = information_set["covariance_matrix"]
+            if not isinstance(Sigma, FactorCovariance):
+                Sigma = np.asarray(Sigma, dtype=float)
+            companies = information_set["companies"]
+
+            # Warm start from the previous weights when available
+            x0 = self.initial_guess(companies)
+
+            # Minimize
+            x, success = self.optimize(mu, Sigma, x0)
+
+            # Prepare dictionary
+            portfolio = {k: None for k in companies}
+
+            # If optimization converged, update portfolio
+            if success:
+                for i, company in enumerate(companies):
+                    portfolio[company] = x[i]
+                self._last_weights = dict(portfolio)
+            else:
+                self.tracer.count("solver.failures")
+                raise Exception("Optimization did not converge")
+
+            return portfolio
+        except Exception as e:
+            # If something goes wrong, return an equal weight portfolio but warn the user
+            self.tracer.count("portfolio.equal_weight_fallbacks")
+            logging.warning(
+                "Error computing portfolio, returning equal weight portfolio"
+            )
+            logging.warning(e)
+            return {
+                k: 1 / len(information_set["companies"])
+                for k in information_set["companies"]
+            }
+
+    def compute_portfolios(
+        self, dates, mu_stack, Sigma_stack, companies=None, max_workers=None
+    ):
+        """Compute the portfolios of several dates sharing the same universe.
+
+        Args:
+            dates (list): The T rebalance dates.
+            mu_stack (np.ndarray): Expected returns, shape (T, n).
+            Sigma_stack (np.ndarray): Covariance matrices, shape (T, n, n).
+            companies (list): The n tickers, defaults to their positions.
+            max_workers (int): Processes used when many dates need the
+                iterative solver, 1 to stay in the current process.
+
+        Returns:
+            dict: One portfolio dictionary per date.
+        """
+        mu_stack = np.asarray(mu_stack, dtype=float)
+        Sigma_stack = np.asarray(Sigma_stack, dtype=float)
+        T, n = mu_stack.shape
+        companies = list(range(n)) if companies is None else list(companies)
+        weights = np.full((T, n), np.nan)
+        solved = np.zeros(T, dtype=bool)
+
+        # Dates with missing estimates get equal weights, as in compute_portfolio
+        finite = np.isfinite(mu_stack).all(axis=1) & np.isfinite(Sigma_stack).all(
+            axis=(1, 2)
+        )
+        if n == 0:
+            finite[:] = False
+
+        if self.solver == "analytic" and self._budget_only:
+            lower, upper = expand_bounds(self.bounds, n)
+            # Closed-form solution of every date in one batched solve
+            if finite.any():
+                with self.tracer.span("solver.batch"):
+                    weights[finite] = solve_budget_kkt_batch(
+                        mu_stack[finite], Sigma_stack[finite], self.gamma
+                    )
+            within = (weights >= lower - 1e-10).all(axis=1) & (
+                weights <= upper + 1e-10
+            ).all(axis=1)
+            solved = finite & within
+            n_kkt = int(solved.sum())
+            pending = np.flatnonzero(finite & ~within)
+
+            # Dates hitting the bounds need the iterative solver
+            if len(pending) >= self.min_parallel_dates and max_workers != 1:
+                with ProcessPoolExecutor(max_workers=max_workers) as pool:
+                    results = pool.map(
+                        _try_solve_box_qp,
+                        mu_stack[pending],
+                        Sigma_stack[pending],
+                        repeat(self.gamma),
+                        repeat(lower),
+                        repeat(upper),
+                    )
+                    for i, res in zip(pending, results):
+                        if res is None:
+                            continue
+                        weights[i], solved[i] = res.x, res.success
+                        self.tracer.count(f"solver.method.{res.method}")
+                        self.tracer.observe("solver.iterations", res.iterations)
+            else:
+                # Serially, each date is warm-started from the previous one
+                x0 = None
+                for i in pending:
+                    with self.tracer.span("solver"):
+                        res = _try_solve_box_qp(
+                            mu_stack[i], Sigma_stack[i], self.gamma, lower, upper, x0
+                        )
+                    if res is None:
+                        x0 = None
+                        continue
+                    self.tracer.count(f"solver.method.{res.method}")
+                    self.tracer.observe("solver.iterations", res.iterations)
+                    weights[i], solved[i] = res.x, res.success
+                    x0 = res.x if res.success else None
+        else:
+            # Custom constraints cannot be sent to other processes, solve in order
+            n_kkt = 0
+            x0 = None
+            for i in np.flatnonzero(finite):
+                try:
+                    weights[i], solved[i] = self.optimize(
+                        mu_stack[i], Sigma_stack[i], x0
+                    )
+                except Exception as e:
+                    logging.warning(e)
+                x0 = weights[i] if solved[i] else None
+
+        self.tracer.count("solver.batch_kkt", n_kkt)
+        self.tracer.count("solver.failures", int((finite & ~solved).sum()))
+        self.tracer.count("portfolio.equal_weight_fallbacks", int((~solved).sum()))
+        portfolios = {}
+        for i, t in enumerate(dates):
+            if solved[i]:
+                portfolios[t] = dict(zip(companies, weights[i]))
+            else:
+                logging.warning(
+                    f"Error computing portfolio at {t}, returning equal weight portfolio"
+                )
+                portfolios[t] = {k: 1 / n for k in companies}
+        if solved.any():
+            self._last_weights = dict(portfolios[dates[np.flatnonzero(solved)[-1]]])
+        return portfolios
+
+
+## Define a custom class of the backtest one in order to be able to modify some parameters ##
+class CustomBacktest(Backtest):
+    def __init__(
+        self,
+        *args,
+        backtest_name: str = None,
+        initial_cash: float = 1_000_000,
+        batch: bool = False,
+        max_workers: int = None,
+        data: pd.DataFrame = None,
+        information_kwargs: dict = None,
+        store_results: bool = True,
+        checkpoint: str = None,
+        price_store: PriceStore = None,
+        progress=None,
+        universe: list = None,
+        profiler: StageProfiler = None,
+        tracer: Tracer = None,
+        **kwargs,
+    ):
+        self.initial_cash = initial_cash
+        # Tickers of the backtest, the class default universe if None
+        if universe is not None:
+            self.universe = list(universe)
+        self.broker = TypedBroker(cash=self.initial_cash, verbose=self.verbose)
+        # Precompute every portfolio in one pass before walking the dates
+        self.batch = batch
+        self.max_workers = max_workers
+        # Price data already loaded by the caller, fetched in run_backtest if None
+        self.data = data
+        # Extra parameters of the information class (gamma, bounds, ...)
+        self.information_kwargs = information_kwargs or {}
+        # Write the csv file and the blockchain block at the end of the run
+        self.store_results = store_results
+        # File holding the state of the last run, extended instead of rerun
+        self.checkpoint = checkpoint
+        # Local price store used instead of downloading the prices every run
+        self.price_store = price_store
+        # Called after each date with the date, the cash and the number of trades
+        self.progress = progress
+        # Opt-in timing and memory of the stages, see profiling.py
+        self.profiler = profiler if profiler is not None else profiler_from_env()
+        # Counters and stage timings of the run, nothing recorded if None
+        self.tracer = tracer if tracer is not None else NULL_TRACER
+        super().__init__(*args, **kwargs)
+        # The Backtest dataclass resets initial_cash to its default
+        self.initial_cash = initial_cash
+        # if backtest_name is None, use teh default value of the Backtest class
+        self.backtest_name = (
+            backtest_name if backtest_name is not None else self.backtest_name
+        )
+
+    def load_data(self, start=None):
+        # Retrieve the prices of the universe over the backtest period
+        init_ = (start or self.initial_date).strftime("%Y-%m-%d")
+        final_ = self.final_date.strftime("%Y-%m-%d")
+        if self.price_store is not None:
+            # Only the missing prices are downloaded, then read from the store
+            store = self.price_store.restrict(self.universe, init_, final_)
+            store.update(init_, final_)
+            return store
+        if self.data is None:
+            return get_stocks_data(self.universe, init_, final_)
+
+        # Keep the same period as a download would, the end date is excluded
+        dates = pd.to_datetime(self.data[self.time_column]).dt.tz_localize(None)
+        mask = (dates >= init_) & (dates < final_)
+        mask &= self.data[self.company_column].isin(self.universe)
+        return self.data[mask.to_numpy()].copy()
+
+    def create_information(self, df):
+        # Build the information object on top of the price data
+        kwargs = dict(self.information_kwargs)
+        if issubclass(self.information_class, CustomFirstTwoMoments):
+            # Solver statistics are recorded with the stages of the backtest
+            kwargs.setdefault("tracer", self.tracer)
+        if isinstance(df, PriceStore):
+            return self.information_class(
+                s=self.s,
+                data_module=DataModule(None),
+                time_column=self.time_column,
+                company_column=self.company_column,
+                adj_close_column=self.adj_close_column,
+                price_store=df,
+                **kwargs,
+            )
+        return self.information_class(
+            s=self.s,
+            data_module=DataModule(df),
+            time_column=self.time_column,
+            company_column=self.company_column,
+            adj_close_column=self.adj_close_column,
+            **kwargs,
+        )
+
+    def portfolio_dates(self, dates, risk_model):
+        # Dates on which the loop asks the information object for a portfolio
+        if risk_model is not None:
+            return list(dates)
+        return [t for t in dates if self.rebalance_flag().time_to_rebalance(t)]
+
+    def precompute_portfolios(self, info, dates):
+        """Compute the portfolios of all the given dates in one pass."""
+        if not hasattr(info, "compute_portfolios"):
+            return {}
+        # Stack the information sets sharing the same universe
+        groups = {}
+        portfolios = {}
+        for t in dates:
+            information_set = info.compute_information(t)
+            if isinstance(information_set["covariance_matrix"], FactorCovariance):
+                # Factor models are solved date by date, stacking them as
+                # dense matrices would need the memory they are meant to save
+                portfolios[t] = info.compute_portfolio(t, information_set)
+                continue
+            key = tuple(information_set["companies"])
+            groups.setdefault(key, []).append((t, information_set))
+
+        for companies, items in groups.items():
+            T, n = len(items), len(companies)
+            mu_stack = np.array([x["expected_return"] for _, x in items], dtype=float)
+            Sigma_stack = np.array(
+                [x["covariance_matrix"] for _, x in items], dtype=float
+            )
+            portfolios.update(
+                info.compute_portfolios(
+                    [t for t, _ in items],
+                    mu_stack.reshape(T, n),
+                    Sigma_stack.reshape(T, n, n),
+                    companies=companies,
+                    max_workers=self.max_workers,
+                )
+            )
+        return portfolios
+
+    def performance(self):
+        """Equity curve and performance metrics of the last run, see metrics.py.
+
+        Positions are marked to market with the prices loaded by the run, from
+        the initial date (or the lookback of a resumed run) to the final date.
+        """
+        window = self.price_window(
+            self.initial_date, self.final_date + timedelta(days=1)
+        )
+        return performance(
+            self.broker.get_transaction_log(), *window, initial_cash=self.initial_cash
+        )
+
+    def price_window(self, start, end):
+        # Dates, prices and tickers loaded by the run in [start, end)
+        info = self.information
+        if hasattr(info, "prices_between"):
+            return info.prices_between(start, end)
+        return PriceMatrix.from_frame(
+            info.data_module.data,
+            self.time_column,
+            self.company_column,
+            self.adj_close_column,
+        ).window(start, end)
+
+    def stage(self, name):
+        # Stage of the run timed by the tracer, and profiled when profiling
+        if self.profiler is None:
+            return self.tracer.span(name)
+        return _nested(self.tracer.span(name), self.profiler.stage(name))
+
+    def fingerprint(self):
+        # Configuration a checkpoint must match to be extended
+        return config_key(
+            initial_date=self.initial_date,
+            universe=list(self.universe),
+            information_class=self.information_class,
+            information_kwargs=self.information_kwargs,
+            s=self.s,
+            columns=[self.time_column, self.company_column, self.adj_close_column],
+            rebalance_flag=self.rebalance_flag,
+            risk_model=self.risk_model,
+            initial_cash=self.initial_cash,
+        )
+
+    def resume_from_checkpoint(self):
+        """Checkpoint of a previous run this backtest can extend, or None."""
+        checkpoint = load_checkpoint(self.checkpoint)
+        if checkpoint is None:
+            return None
+        if checkpoint.fingerprint != self.fingerprint():
+            logging.warning("Checkpoint of another configuration, running from start.")
+            return None
+        if checkpoint.last_date > self.final_date:
+            logging.warning("Checkpoint after the end date, running from start.")
+            return None
+        return checkpoint
+
+    def save_results(self, df, append=False):
+        if not self.store_results:
+            return
+
+        # create backtests folder if it does not exist
+        if not os.path.exists("backtests"):
+            os.makedirs("backtests")
+
+        # save to csv, use the backtest name
+        path = f"backtests/{self.backtest_name}.csv"
+        if append and os.path.exists(path):
+            # Only the new transactions are written after the previous ones
+            df.to_csv(path, mode="a", header=False)
+        else:
+            df.to_csv(path)
+
+        # store the backtest in the blockchain, in the chain of this run only
+        # (the store locks the appends of other threads and processes)
+        with self.tracer.span("blockchain_write"):
+            self.broker.blockchain.append(
+                self.backtest_name, self.backtest_name, df.to_string()
+            )
+
+    def run_backtest(self):
+        logging.info(f"Running backtest from {self.initial_date} to {self.final_date}.")
+        logging.info("Retrieving price data for universe")
+        risk_model = (
+            self.risk_model(threshold=0.1) if self.risk_model is not None else None
+        )
+        start, data_start = self.initial_date, None
+        checkpoint = self.resume_from_checkpoint()
+        if checkpoint is not None:
+            # Only the dates after the checkpoint are replayed, with their lookback
+            start = checkpoint.last_date + timedelta(days=1)
+            data_start = max(self.initial_date, start - self.s)
+            logging.info(f"Resuming backtest {checkpoint.backtest_name} at {start}.")
+        with self.stage("load_data"):
+            info = self.create_information(self.load_data(data_start))
+        # Kept for the analysis of the results (prices, final value)
+        self.information = info
+        n_previous = 0
+        if checkpoint is not None:
+            checkpoint.restore(self.broker, info)
+            risk_model = checkpoint.risk_model
+            self.backtest_name = checkpoint.backtest_name
+            n_previous = len(self.broker.transactions)
+        dates = pd.date_range(start=start, end=self.final_date, freq="D")
+
+        # Portfolios computed up front in batch mode, on the fly otherwise
+        portfolios = {}
+        if self.batch:
+            with self.stage("precompute_portfolios"):
+                portfolios = self.precompute_portfolios(
+                    info, self.portfolio_dates(dates, risk_model)
+                )
+
+        def get_portfolio(t):
+            if t in portfolios:
+                return portfolios[t]
+            with self.stage("information"):
+                information_set = info.compute_information(t)
+            with self.stage("optimization"):
+                return info.compute_portfolio(t, information_set)
+
+        # Run the backtest
+        for i, t in enumerate(dates):
+            if risk_model is not None:
+                portfolio = get_portfolio(t)
+                with self.stage("stop_loss"):
+                    prices = info.get_prices(t)
+                    risk_model.trigger_stop_loss(t, portfolio, prices, self.broker)
+
+            if self.rebalance_flag().time_to_rebalance(t):
+                logging.info("-----------------------------------")
+                logging.info(f"Rebalancing portfolio at {t}")
+                portfolio = get_portfolio(t)
+                with self.stage("execution"):
+                    prices = info.get_prices(t)
+                    self.broker.execute_portfolio(portfolio, prices, t)
+
+            if self.progress is not None:
+                self.progress(
+                    date=t,
+                    fraction=(i + 1) / len(dates),
+                    cash=self.broker.get_cash_balance(),
+                    n_trades=len(self.broker.transactions),
+                )
+
+        logging.info(
+            f"Backtest completed. Final portfolio value: {self.broker.get_portfolio_value(info.get_prices(self.final_date))}"
+        )
+        if self.checkpoint is not None:
+            with self.stage("checkpoint"):
+                BacktestCheckpoint.capture(
+                    self.fingerprint(),
+                    self.backtest_name,
+                    self.final_date,
+                    self.broker,
+                    info,
+                    risk_model,
+                ).save(self.checkpoint)
+        # A resumed run only stores the transactions of the new dates
+        with self.stage("save_results"):
+            log = self.broker.get_transaction_log()
+            self.save_results(log.iloc[n_previous:], append=checkpoint is not None)
+        if self.profiler is not None:
+            path = self.profiler.write(self.backtest_name)
+            logging.info(f"Profile of the stages written to {path}")
@@ -0,0 +1,273 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+## Covariance estimators of the information set ##
+# Every estimator receives the dates and the rows of the lookback window where
+# all the companies have a price, and returns an (n x n) covariance matrix or,
+# for large universes, a FactorCovariance.
+
+
+@dataclass
+class SampleCovariance:
+    """Sample covariance of the window, recomputed at every date.
+
+    This is the estimator of FirstTwoMoments, O(window x n^2) per date.
+    """
+
+    def covariance(self, dates, rows, companies):
+        n = rows.shape[1]
+        if len(rows) < 2:
+            return np.full((n, n), np.nan)
+        return np.atleast_2d(np.cov(rows, rowvar=False))
+
+
+@dataclass
+class RollingCovariance:
+    """Sample covariance of the window, updated as the window slides.
+
+    The weighted sums of the rows are kept between dates: rows leaving the
+    window are removed and rows entering it are added (rank-one updates), so a
+    date costs O(n^2) per new row instead of O(window x n^2). The sums are
+    rebuilt when the companies change, when the window moves backwards or once
+    a whole window has been replaced, to bound the rounding errors.
+    """
+
+    def __post_init__(self):
+        self.reset()
+
+    @property
+    def decay(self):
+        # Weight of a row relative to the next one, 1 for equal weights
+        return 1.0
+
+    def reset(self):
+        self._companies = None
+        self._dates = None
+        self._rows = None
+
+    def _initialize(self, dates, rows, companies):
+        self._companies = list(companies)
+        self._dates, self._rows = dates, rows
+        # Shifted rows keep the sums small and the differences accurate
+        self._shift = rows.mean(axis=0) if len(rows) else 0.0
+        self._replaced = 0
+        weights = self.decay ** np.arange(len(rows) - 1, -1, -1, dtype=float)
+        centered = rows - self._shift
+        self._w = weights.sum()
+        self._w2 = (weights**2).sum()
+        self._s1 = weights @ centered
+        self._s2 = (centered * weights[:, None]).T @ centered
+
+    def _slide(self, dates, rows):
+        # Returns False when the new window does not extend the current one
+        old = self._dates
+        if old is None or dates is None or len(old) == 0 or len(dates) == 0:
+            return False
+        if dates[0] < old[0] or dates[-1] < old[-1] or dates[0] > old[-1]:
+            return False
+        n_drop = np.searchsorted(old, dates[0], side="left")
+        first_new = np.searchsorted(dates, old[-1], side="right")
+        n_add = len(dates) - first_new
+        if len(old) - n_drop + n_add != len(dates):
+            return False
+        if self._replaced + n_drop + n_add > len(dates):
+            return False
+
+        decay = self.decay
+        if n_drop:
+            # The oldest rows carry the smallest weights
+            weights = decay ** np.arange(len(old) - 1, len(old) - 1 - n_drop, -1.0)
+            leaving = self._rows[:n_drop] - self._shift
+            self._w -= weights.sum()
+            self._w2 -= (weights**2).sum()
+            self._s1 -= weights @ leaving
+            self._s2 -= (leaving * weights[:, None]).T @ leaving
+        if n_add:
+            weights = decay ** np.arange(n_add - 1, -1, -1, dtype=float)
+            entering = rows[first_new:] - self._shift
+            if decay != 1.0:
+                scale = decay**n_add
+                self._w *= scale
+                self._w2 *= scale**2
+                self._s1 *= scale
+                self._s2 *= scale
+            self._w += weights.sum()
+            self._w2 += (weights**2).sum()
+            self._s1 += weights @ entering
+            self._s2 += (entering * weights[:, None]).T @ entering
+        self._replaced += n_drop + n_add
+        self._dates, self._rows = dates, rows
+        return True
+
+    def covariance(self, dates, rows, companies):
+        n = rows.shape[1]
+        if self._companies != list(companies) or not self._slide(dates, rows):
+            self._initialize(dates, rows, companies)
+        # Unbiased weighted covariance, as np.cov with aweights
+        normalization = self._w - self._w2 / self._w if self._w > 0 else 0.0
+        if len(rows) < 2 or normalization <= 0:
+            return np.full((n, n), np.nan)
+        mean = self._s1 / self._w
+        Sigma = self._s2 - self._w * np.outer(mean, mean)
+        Sigma /= normalization
+        return Sigma
+
+
+@dataclass
+class EWMACovariance(RollingCovariance):
+    """Exponentially weighted covariance of the window.
+
+    The weight of a row halves every `halflife` rows, updated as RollingCovariance.
+    """
+
+    halflife: float = 60.0
+
+    @property
+    def decay(self):
+        return 0.5 ** (1 / self.halflife)
+
+
+@dataclass
+class LedoitWolfCovariance(RollingCovariance):
+    """Rolling sample covariance shrunk towards a scaled identity.
+
+    The shrinkage intensity is the one of Ledoit and Wolf (2004). It only
+    needs the norms of the centered rows, O(window x n) on top of the update.
+    """
+
+    def covariance(self, dates, rows, companies):
+        Sigma = super().covariance(dates, rows, companies)
+        m, n = rows.shape
+        if m < 2 or not np.isfinite(Sigma).all():
+            return Sigma
+        # Biased sample covariance of the estimator formulas
+        S = Sigma * (m - 1) / m
+        target = np.trace(S) / n
+        delta = np.sum((S - target * np.eye(n)) ** 2)
+        if delta <= 0:
+            return Sigma
+        norms = np.sum((rows - rows.mean(axis=0)) ** 2, axis=1)
+        beta = (np.sum(norms**2) / m - np.sum(S**2)) / m
+        intensity = min(max(beta, 0.0), delta) / delta
+        return intensity * np.trace(Sigma) / n * np.eye(n) + (1 - intensity) * Sigma
+
+
+## Factor model covariance B F B' + D, never formed as an (n x n) matrix ##
+@dataclass
+class FactorCovariance:
+    """Covariance of a factor model, for universes of thousands of tickers.
+
+    Sigma = B F B' + diag(D) with the (n x k) loadings B, the (k x k) factor
+    covariance F and the n specific variances D. Products with Sigma cost
+    O(n k) and systems on any block of Sigma are solved with the Woodbury
+    identity in O(n k^2), so the solver never needs the n^2 entries.
+    """
+
+    loadings: np.ndarray
+    factor_covariance: np.ndarray
+    specific: np.ndarray
+
+    @property
+    def shape(self):
+        n = len(self.specific)
+        return (n, n)
+
+    def __len__(self):
+        return len(self.specific)
+
+    def dot(self, x):
+        """Sigma x, for a vector or the columns of a matrix."""
+        B, F = self.loadings, self.factor_covariance
+        specific = self.specific if np.ndim(x) == 1 else self.specific[:, None]
+        return specific * x + B @ (F @ (B.T @ x))
+
+    def diagonal(self):
+        B = self.loadings
+        return self.specific + np.einsum("ik,kl,il->i", B, self.factor_covariance, B)
+
+    def solve(self, rhs, free=None):
+        """Solve Sigma[free, free] y = rhs, rhs can hold several columns.
+
+        Woodbury: (D + B F B')^-1 = D^-1 - D^-1 B F (I + B' D^-1 B F)^-1 B' D^-1,
+        which does not need F to be invertible.
+        """
+        B, D = self.loadings, self.specific
+        if free is not None:
+            B, D = B[free], D[free]
+        F = self.factor_covariance
+        scale = 1 / D if np.ndim(rhs) == 1 else 1 / D[:, None]
+        y = scale * rhs
+        capacitance = np.eye(len(F)) + ((B.T / D) @ B) @ F
+        return y - scale * (B @ (F @ np.linalg.solve(capacitance, B.T @ y)))
+
+    def largest_eigenvalue(self):
+        """Upper bound on the largest eigenvalue, max(D) + that of B F B'."""
+        B, F = self.loadings, self.factor_covariance
+        # The non-zero eigenvalues of B F B' are those of the (k x k) F B'B
+        factor = np.abs(np.linalg.eigvals(F @ (B.T @ B))).max() if F.size else 0.0
+        return float(self.specific.max() + factor)
+
+    def is_finite(self):
+        return bool(
+            np.isfinite(self.loadings).all()
+            and np.isfinite(self.factor_covariance).all()
+            and np.isfinite(self.specific).all()
+        )
+
+    def dense(self):
+        """The (n x n) matrix, only meant for small universes and tests."""
+        B = self.loadings
+        return B @ self.factor_covariance @ B.T + np.diag(self.specific)
+
+
+@dataclass
+class StatisticalFactorCovariance:
+    """Factor model of the window from its first principal components.
+
+    The k largest principal components of the window are the factors, the
+    rest of the variance of each ticker is its specific variance, floored at
+    `min_specific` times the average variance to keep Sigma positive definite.
+    One thin SVD of the (window x n) rows per date, O(window^2 x n).
+    """
+
+    n_factors: int = 10
+    min_specific: float = 1e-4
+
+    def covariance(self, dates, rows, companies):
+        m, n = rows.shape
+        if m < 2:
+            nan = np.full(n, np.nan)
+            return FactorCovariance(np.zeros((n, 0)), np.zeros((0, 0)), nan)
+        centered = rows - rows.mean(axis=0)
+        variance = (centered**2).sum(axis=0) / (m - 1)
+        k = min(self.n_factors, m - 1, n)
+        _, s, vt = np.linalg.svd(centered, full_matrices=False)
+        loadings = vt[:k].T
+        factor_variance = s[:k] ** 2 / (m - 1)
+        specific = variance - (loadings**2) @ factor_variance
+        floor = self.min_specific * max(variance.mean(), np.finfo(float).tiny)
+        return FactorCovariance(
+            loadings, np.diag(factor_variance), np.maximum(specific, floor)
+        )
+
+
+ESTIMATORS = {
+    "sample": SampleCovariance,
+    "rolling": RollingCovariance,
+    "ewma": EWMACovariance,
+    "ledoit-wolf": LedoitWolfCovariance,
+    "factor": StatisticalFactorCovariance,
+}
+
+
+def make_estimator(estimator):
+    """Estimator instance from its name in ESTIMATORS, or the instance itself."""
+    if isinstance(estimator, str):
+        if estimator not in ESTIMATORS:
+            raise ValueError(
+                f"Unknown covariance estimator {estimator!r}, "
+                f"expected one of {list(ESTIMATORS)}"
+            )
+        return ESTIMATORS[estimator]()
+    return estimator
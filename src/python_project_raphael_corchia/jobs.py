@@ -0,0 +1,103 @@
+import logging
+import queue
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+
+## A backtest running in the background ##
+@dataclass
+class BacktestJob:
+    """Status, progress and result of a backtest submitted to a JobRegistry.
+
+    The worker reports progress with `report`, the interface collects it with
+    `poll`; the updates go through a thread-safe queue.
+    """
+
+    job_id: str
+    key: str
+    status: str = "queued"  # queued, running, done or failed
+    progress: dict = field(default_factory=dict)
+    history: list = field(default_factory=list)
+    result: object = None
+    error: str = None
+    _updates: queue.Queue = field(default_factory=queue.Queue, repr=False)
+
+    @property
+    def finished(self):
+        return self.status in ("done", "failed")
+
+    def report(self, **progress):
+        # Called from the worker thread, e.g. report(date=t, cash=..., n_trades=...)
+        self._updates.put(progress)
+
+    def poll(self):
+        """Move the pending updates to `history` and return the latest progress."""
+        while True:
+            try:
+                update = self._updates.get_nowait()
+            except queue.Empty:
+                break
+            self.history.append(update)
+            self.progress = update
+        return self.progress
+
+
+## Jobs shared by every session of the server ##
+class JobRegistry:
+    """Run backtests on a thread pool and keep track of them by id.
+
+    A configuration submitted while an identical one (same key) is still
+    queued or running gets the existing job instead of a second run.
+
+    Example:
+        registry = JobRegistry(max_workers=2)
+        job = registry.submit(key, lambda job: run(job.report))
+        registry.get(job.job_id).poll()
+    """
+
+    def __init__(self, max_workers=4, max_finished=32):
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="backtest"
+        )
+        self.max_finished = max_finished
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, key, run):
+        """Queue `run(job)`, its return value becomes the job result."""
+        with self._lock:
+            for job in self._jobs.values():
+                if job.key == key and not job.finished:
+                    return job
+            job = BacktestJob(uuid.uuid4().hex, key)
+            self._jobs[job.job_id] = job
+            self._prune()
+        self._executor.submit(self._run, job, run)
+        return job
+
+    def _run(self, job, run):
+        job.status = "running"
+        try:
+            job.result = run(job)
+            job.status = "done"
+        except Exception as e:
+            logging.exception(f"Backtest job {job.job_id} failed")
+            job.error = f"{type(e).__name__}: {e}"
+            job.status = "failed"
+
+    def _prune(self):
+        # Forget the oldest finished jobs, their results are in the result cache
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[: max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def jobs(self):
+        return list(self._jobs.values())
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
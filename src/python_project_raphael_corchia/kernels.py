@@ -0,0 +1,96 @@
+import os
+
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:  # pragma: no cover - numba is a declared dependency
+    njit = None
+
+# Set to 0 to run the NumPy implementations instead of the compiled kernels
+NUMBA_ENV = "BACKTEST_NUMBA"
+# Read at call time by the callers, tests switch it off to compare both paths
+ENABLED = njit is not None and os.environ.get(NUMBA_ENV, "1") != "0"
+
+
+def _jit(func):
+    # Compiled on first call, the machine code is cached on disk so the JIT
+    # warm-up is paid once per machine and not once per process
+    return njit(cache=True, nogil=True)(func) if njit is not None else func
+
+
+## Mean-variance objective -x'mu + gamma/2 x'Sigma x and its gradient ##
+@_jit
+def objective_and_gradient(x, mu, Sigma, gamma):
+    # One product with the covariance matrix for both values
+    Sx = np.dot(Sigma, x)
+    value = -np.dot(x, mu) + gamma / 2 * np.dot(x, Sx)
+    return value, gamma * Sx - mu
+
+
+## Projected gradient on {x : sum(x) = budget, lower <= x <= upper} ##
+@_jit
+def _clipped_sum(y, tau, lower, upper):
+    total = 0.0
+    for i in range(len(y)):
+        total += min(max(y[i] - tau, lower[i]), upper[i])
+    return total
+
+
+@_jit
+def project_budget_box(y, lower, upper, budget=1.0, tol=1e-12, max_iter=200):
+    # Same bisection on the shift tau as solver.project_budget_box, without
+    # the temporary arrays of each step
+    lo, hi, largest, any_finite = np.inf, -np.inf, 0.0, False
+    for i in range(len(y)):
+        largest = max(largest, abs(y[i]))
+        for gap in (y[i] - lower[i], y[i] - upper[i]):
+            if np.isfinite(gap):
+                lo, hi, any_finite = min(lo, gap), max(hi, gap), True
+    span = largest + abs(budget) + 1.0
+    if any_finite:
+        lo, hi = lo - span, hi + span
+    else:
+        lo, hi = -span, span
+    tau = (lo + hi) / 2
+    for _ in range(max_iter):
+        tau = (lo + hi) / 2
+        total = _clipped_sum(y, tau, lower, upper)
+        if abs(total - budget) <= tol:
+            break
+        if total > budget:
+            lo = tau
+        else:
+            hi = tau
+    x = np.empty_like(y)
+    for i in range(len(y)):
+        x[i] = min(max(y[i] - tau, lower[i]), upper[i])
+    return x
+
+
+@_jit
+def projected_gradient(mu, Sigma, gamma, lower, upper, start, step, tol, max_iter):
+    # Accelerated projected gradient with a fixed step, see solver.py
+    x = project_budget_box(start, lower, upper)
+    y, t = x.copy(), 1.0
+    for iteration in range(1, max_iter + 1):
+        grad = gamma * np.dot(Sigma, y) - mu
+        x_new = project_budget_box(y - step * grad, lower, upper)
+        t_new = (1 + np.sqrt(1 + 4 * t * t)) / 2
+        y = x_new + (t - 1) / t_new * (x_new - x)
+        if np.linalg.norm(x_new - x) <= tol * max(1.0, np.linalg.norm(x)):
+            return x_new, True, iteration
+        x, t = x_new, t_new
+    return x, False, max_iter
+
+
+## Stop-loss check of all the open positions of a date ##
+@_jit
+def stop_loss_triggers(entry_prices, current_prices, threshold):
+    # Positions whose loss since entry exceeds the threshold, a missing (NaN)
+    # price never triggers
+    triggered = np.zeros(len(entry_prices), dtype=np.bool_)
+    for i in range(len(entry_prices)):
+        loss = (current_prices[i] - entry_prices[i]) / entry_prices[i]
+        triggered[i] = loss < -threshold
+    return triggered
@@ -0,0 +1,235 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+# Trading days per year, used to annualize daily figures
+PERIODS_PER_YEAR = 252
+# About three months of trading days
+SHARPE_WINDOW = 63
+
+
+## Vectorized building blocks ##
+def forward_fill(prices):
+    """Last available price of each column at each row, NaN before the first."""
+    prices = np.asarray(prices, dtype=float)
+    missing = np.isnan(prices)
+    gaps = np.flatnonzero(missing.any(axis=0))
+    if len(gaps) == 0:
+        return prices
+    # Only the columns with missing prices are filled
+    filled = prices.copy()
+    rows = np.where(missing[:, gaps], 0, np.arange(len(prices))[:, None])
+    np.maximum.accumulate(rows, axis=0, out=rows)
+    filled[:, gaps] = prices[rows, gaps]
+    return filled
+
+
+def trade_matrices(transaction_log, dates, tickers):
+    """Trades of a transaction log summed per trade date and ticker.
+
+    Each transaction is assigned to the last date of `dates` not after it,
+    transactions before the first date to the first date.
+
+    Returns:
+        tuple: The K sorted positions in `dates` with at least one trade, the
+        signed quantities and the cash spent per (trade date, ticker) of shape
+        (K, N), and the absolute notional traded on each of the T dates.
+    """
+    T, N = len(dates), len(tickers)
+    if len(transaction_log) == 0 or T == 0:
+        return np.zeros(0, dtype=int), np.zeros((0, N)), np.zeros((0, N)), np.zeros(T)
+    columns = pd.Index(tickers).get_indexer(transaction_log["Ticker"].to_numpy())
+    if (columns < 0).any():
+        unknown = sorted(set(transaction_log["Ticker"][columns < 0]))
+        raise ValueError(f"No prices for the traded tickers {unknown}")
+    trade_dates = transaction_log["Date"]
+    if not pd.api.types.is_datetime64_dtype(trade_dates):
+        trade_dates = pd.to_datetime(trade_dates)
+    rows = np.searchsorted(
+        dates, trade_dates.to_numpy(dtype="datetime64[ns]"), side="right"
+    )
+    rows = np.clip(rows - 1, 0, T - 1)
+
+    sign = np.where(transaction_log["Action"].to_numpy() == "BUY", 1.0, -1.0)
+    quantity = sign * pd.to_numeric(transaction_log["Quantity"]).to_numpy(dtype=float)
+    spent = quantity * pd.to_numeric(transaction_log["Price"]).to_numpy(dtype=float)
+    # One bincount per matrix instead of a loop over the transactions
+    trade_rows, compact = np.unique(rows, return_inverse=True)
+    K = len(trade_rows)
+    flat = compact * N + columns
+    return (
+        trade_rows,
+        np.bincount(flat, weights=quantity, minlength=K * N).reshape(K, N),
+        np.bincount(flat, weights=spent, minlength=K * N).reshape(K, N),
+        np.bincount(rows, weights=np.abs(spent), minlength=T),
+    )
+
+
+def simple_returns(nav):
+    """Daily returns of an equity curve, one less than the number of dates."""
+    nav = np.asarray(nav, dtype=float)
+    return nav[1:] / nav[:-1] - 1
+
+
+def rolling_sharpe(returns, window=SHARPE_WINDOW, periods_per_year=PERIODS_PER_YEAR):
+    """Annualized Sharpe ratio of each trailing window, NaN until it is full.
+
+    The rolling mean and variance come from cumulative sums of the returns
+    and of their squares, no loop over the windows.
+    """
+    returns = np.asarray(returns, dtype=float)
+    sharpe = np.full(len(returns), np.nan)
+    if window < 2 or len(returns) < window:
+        return sharpe
+    s1 = np.concatenate([[0.0], np.cumsum(returns)])
+    s2 = np.concatenate([[0.0], np.cumsum(returns**2)])
+    total = s1[window:] - s1[:-window]
+    mean = total / window
+    variance = (s2[window:] - s2[:-window] - total * mean) / (window - 1)
+    std = np.sqrt(np.maximum(variance, 0.0))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe[window - 1 :] = np.where(
+            std > 0, mean / std * np.sqrt(periods_per_year), np.nan
+        )
+    return sharpe
+
+
+def drawdown(nav):
+    """Relative distance of the equity curve to its running maximum (<= 0)."""
+    nav = np.asarray(nav, dtype=float)
+    return nav / np.maximum.accumulate(nav) - 1
+
+
+## Equity curve of a backtest ##
+@dataclass
+class Performance:
+    """Daily positions, equity curve and P&L of a backtest.
+
+    Built by `performance`, every array has one row per price date.
+    """
+
+    dates: np.ndarray
+    tickers: np.ndarray
+    initial_cash: float
+    holdings: np.ndarray  # Quantity of each ticker, (T, N)
+    cash: np.ndarray  # Cash after the trades of each date, (T,)
+    nav: np.ndarray  # Cash plus the holdings at the last prices, (T,)
+    traded: np.ndarray  # Absolute notional traded on each date, (T,)
+    pnl: np.ndarray  # P&L of each ticker since the start, (T, N)
+
+    @property
+    def returns(self):
+        return simple_returns(self.nav)
+
+    @property
+    def drawdown(self):
+        return drawdown(self.nav)
+
+    @property
+    def turnover(self):
+        # Notional traded over the value held before the trades of the date
+        before = np.concatenate([[self.initial_cash], self.nav[:-1]])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(before > 0, self.traded / before, np.nan)
+
+    def rolling_sharpe(self, window=SHARPE_WINDOW):
+        """Annualized Sharpe ratio of the trailing `window` daily returns."""
+        return np.concatenate([[np.nan], rolling_sharpe(self.returns, window)])
+
+    def pnl_by_ticker(self):
+        """Total P&L of each traded ticker, largest contribution first."""
+        traded = (self.holdings != 0).any(axis=0) | (self.pnl[-1:] != 0).any(axis=0)
+        total = self.pnl[-1] if len(self.pnl) else np.zeros(len(self.tickers))
+        return (
+            pd.DataFrame({"Ticker": self.tickers[traded], "PnL": total[traded]})
+            .sort_values("PnL", ascending=False, kind="stable")
+            .reset_index(drop=True)
+        )
+
+    def daily(self, window=SHARPE_WINDOW):
+        """Daily equity curve and metrics as a DataFrame."""
+        returns = np.concatenate([[np.nan], self.returns])
+        return pd.DataFrame(
+            {
+                "Date": self.dates,
+                "NAV": self.nav,
+                "Cash": self.cash,
+                "Return": returns,
+                "Drawdown": self.drawdown,
+                "Rolling_Sharpe": self.rolling_sharpe(window),
+                "Turnover": self.turnover,
+            }
+        )
+
+    def summary(self):
+        """Headline figures of the backtest as a dictionary of floats."""
+        returns = self.returns
+        if len(returns) < 2:
+            return {}
+        years = len(returns) / PERIODS_PER_YEAR
+        final = float(self.nav[-1])
+        volatility = float(returns.std(ddof=1) * np.sqrt(PERIODS_PER_YEAR))
+        mean = float(returns.mean() * PERIODS_PER_YEAR)
+        return {
+            "final_value": final,
+            "total_return": final / self.initial_cash - 1,
+            "annualized_return": (final / self.initial_cash) ** (1 / years) - 1,
+            "annualized_volatility": volatility,
+            "sharpe_ratio": mean / volatility if volatility > 0 else np.nan,
+            "max_drawdown": float(self.drawdown.min()),
+            "annualized_turnover": float(np.nansum(self.turnover)) / years,
+        }
+
+
+def performance(transaction_log, dates, prices, tickers, initial_cash=1_000_000):
+    """Rebuild positions and mark-to-market NAV from a broker transaction log.
+
+    Args:
+        transaction_log (pd.DataFrame): `broker.get_transaction_log()`, with
+            Date, Action, Ticker, Quantity and Price columns.
+        dates (np.ndarray): The T sorted price dates, e.g. from
+            `PriceStore.window` or `PriceMatrix.window`.
+        prices (np.ndarray): Prices of shape (T, N), NaN when missing.
+        tickers (np.ndarray): The N tickers of the price columns.
+        initial_cash (float): Cash before the first transaction.
+
+    Returns:
+        Performance: Daily holdings, cash, NAV, traded notional and P&L.
+
+    Example:
+        perf = performance(broker.get_transaction_log(), *store.window(start, end))
+        perf.summary()["max_drawdown"]
+    """
+    dates = np.asarray(dates, dtype="datetime64[ns]")
+    tickers = np.asarray(tickers, dtype=object)
+    trade_rows, quantity, spent, traded = trade_matrices(
+        transaction_log, dates, tickers
+    )
+    # Running totals only change on trade dates, then spread to every date
+    N = len(tickers)
+    held = np.cumsum(np.vstack([np.zeros(N), quantity]), axis=0)
+    invested = np.cumsum(np.vstack([np.zeros(N), spent]), axis=0)
+    last_trade = np.searchsorted(trade_rows, np.arange(len(dates)), side="right")
+    holdings = np.take(held, last_trade, axis=0)
+    cash = initial_cash - np.take(invested.sum(axis=1), last_trade)
+    invested = np.take(invested, last_trade, axis=0)
+
+    value = holdings * forward_fill(prices)
+    missing = np.isnan(value)
+    if missing.any():
+        # Tickers not held are worth nothing, even before their first price
+        value[missing & (holdings == 0)] = 0.0
+    nav = cash + value.sum(axis=1)
+    # P&L of each ticker: market value minus the cash spent on it, in place
+    value -= invested
+    return Performance(
+        dates=dates,
+        tickers=tickers,
+        initial_cash=float(initial_cash),
+        holdings=holdings,
+        cash=cash,
+        nav=nav,
+        traded=traded,
+        pnl=value,
+    )
@@ -0,0 +1,105 @@
+import cProfile
+import json
+import os
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# Directory of the profiles, profiling is enabled when the variable is set
+PROFILE_ENV = "BACKTEST_PROFILE"
+
+
+## Opt-in profiler of the stages of a backtest ##
+class StageProfiler:
+    """Wall time, peak memory and cProfile statistics per stage of a run.
+
+    A stage entered several times (e.g. "rebalance" once per date) is
+    accumulated. Stages are not meant to be nested, an inner stage is timed
+    but its memory and CPU profile are counted by the outer one.
+
+    Example:
+        profiler = StageProfiler("profiles")
+        backtest = CustomBacktest(..., profiler=profiler)
+        backtest.run_backtest()  # writes profiles/<backtest name>.json
+    """
+
+    def __init__(self, directory="profiles", cprofile=True, memory=True):
+        self.directory = directory
+        self.cprofile = cprofile
+        self.memory = memory
+        self.stages = {}
+        self._profiles = {}
+        self._active = False
+
+    @contextmanager
+    def stage(self, name):
+        outer = not self._active
+        profile = cProfile.Profile() if self.cprofile and outer else None
+        trace = self.memory and outer
+        started_tracing = False
+        if trace:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started_tracing = True
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        self._active = True
+        start = time.perf_counter()
+        if profile is not None:
+            profile.enable()
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.disable()
+            elapsed = time.perf_counter() - start
+            self._active = not outer
+            peak = 0
+            if trace:
+                peak = tracemalloc.get_traced_memory()[1] - base
+                if started_tracing:
+                    tracemalloc.stop()
+            stats = self.stages.setdefault(
+                name, {"calls": 0, "seconds": 0.0, "peak_bytes": 0}
+            )
+            stats["calls"] += 1
+            stats["seconds"] += elapsed
+            stats["peak_bytes"] = max(stats["peak_bytes"], peak)
+            if profile is not None:
+                if name in self._profiles:
+                    self._profiles[name].add(profile)
+                else:
+                    self._profiles[name] = pstats.Stats(profile)
+
+    def report(self):
+        """Calls, total seconds and peak memory (MB) of each stage."""
+        return {
+            name: {
+                "calls": stats["calls"],
+                "seconds": stats["seconds"],
+                "peak_mb": stats["peak_bytes"] / 1024**2,
+            }
+            for name, stats in self.stages.items()
+        }
+
+    def write(self, name):
+        """Write `<name>.json` and one `<name>.<stage>.prof` per stage.
+
+        Returns:
+            str: Path of the json report.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        base = os.path.join(self.directory, name)
+        for stage, stats in self._profiles.items():
+            # Readable with pstats or snakeviz
+            stats.dump_stats(f"{base}.{stage}.prof")
+        with open(f"{base}.json", "w") as f:
+            json.dump(self.report(), f, indent=2)
+        return f"{base}.json"
+
+
+def profiler_from_env():
+    """StageProfiler writing to $BACKTEST_PROFILE, None when it is not set."""
+    directory = os.environ.get(PROFILE_ENV)
+    return StageProfiler(directory) if directory else None
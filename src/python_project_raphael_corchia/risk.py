@@ -0,0 +1,57 @@
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+
+import numpy as np
+from pybacktestchain.broker import Broker, StopLoss
+
+from python_project_raphael_corchia import kernels
+
+
+def stop_loss_triggers(entry_prices, current_prices, threshold):
+    """Mask of the positions losing more than `threshold` since their entry.
+
+    A missing (NaN) current price never triggers the stop loss.
+    """
+    entry_prices = np.asarray(entry_prices, dtype=float)
+    current_prices = np.asarray(current_prices, dtype=float)
+    if kernels.ENABLED:
+        return kernels.stop_loss_triggers(
+            entry_prices, current_prices, float(threshold)
+        )
+    with np.errstate(invalid="ignore"):
+        return (current_prices - entry_prices) / entry_prices < -threshold
+
+
+## Stop loss checking every position of a date at once ##
+@dataclass
+class ArrayStopLoss(StopLoss):
+    """StopLoss evaluating the open positions as arrays.
+
+    Same decisions as the upstream StopLoss: a position is sold in full when
+    its price fell more than `threshold` below the entry price recorded by
+    the broker, and positions without a price are skipped with a warning.
+    """
+
+    def trigger_stop_loss(
+        self, t: datetime, portfolio: dict, prices: dict, broker: Broker
+    ):
+        positions = list(broker.positions.items())
+        if not positions:
+            return
+        n = len(positions)
+        entry = np.fromiter(
+            (broker.entry_prices[ticker] for ticker, _ in positions), float, n
+        )
+        current = [prices.get(ticker) for ticker, _ in positions]
+        for (ticker, _), price in zip(positions, current):
+            if price is None:
+                logging.warning(f"Price for {ticker} not available on {t}")
+        # None becomes NaN, which never triggers
+        current = np.array(current, dtype=float)
+        for i in np.flatnonzero(stop_loss_triggers(entry, current, self.threshold)):
+            ticker, position = positions[i]
+            logging.info(
+                f"Stop loss triggered for {ticker} at {t}. Selling all shares."
+            )
+            broker.sell(ticker, position.quantity, prices[ticker], t)
@@ -0,0 +1,351 @@
+from dataclasses import dataclass
+
+import numpy as np
+from scipy.linalg import LinAlgError, cho_factor, cho_solve
+
+from python_project_raphael_corchia import kernels
+from python_project_raphael_corchia.estimators import FactorCovariance
+
+
+## Result of a mean-variance solve ##
+@dataclass
+class SolverResult:
+    x: np.ndarray
+    success: bool
+    iterations: int = 0
+    method: str = ""
+
+
+## Analytic derivatives of the mean-variance objective -x'mu + gamma/2 x'Sigma x ##
+def mean_variance_objective(x, mu, Sigma, gamma):
+    return -x.dot(mu) + gamma / 2 * x.dot(Sigma.dot(x))
+
+
+def mean_variance_gradient(x, mu, Sigma, gamma):
+    return -mu + gamma * Sigma.dot(x)
+
+
+def mean_variance_objective_and_gradient(x, mu, Sigma, gamma):
+    """Objective and gradient sharing one product with Sigma, for `jac=True`."""
+    if kernels.ENABLED and isinstance(Sigma, np.ndarray):
+        return kernels.objective_and_gradient(x, mu, Sigma, gamma)
+    Sx = Sigma.dot(x)
+    return -x.dot(mu) + gamma / 2 * x.dot(Sx), gamma * Sx - mu
+
+
+def expand_bounds(bounds, n):
+    """Convert scipy-style bounds into lower and upper arrays of length n.
+
+    A single (low, high) pair is broadcast to every asset, as scipy does, and
+    None stands for an infinite bound.
+    """
+    if bounds is None:
+        return np.full(n, -np.inf), np.full(n, np.inf)
+    pairs = list(bounds)
+    if len(pairs) == 1:
+        pairs = pairs * n
+    if len(pairs) != n:
+        raise ValueError(f"Expected 1 or {n} bounds, got {len(pairs)}")
+    lower = np.array([-np.inf if lo is None else lo for lo, _ in pairs], dtype=float)
+    upper = np.array([np.inf if hi is None else hi for _, hi in pairs], dtype=float)
+    return lower, upper
+
+
+## Linear algebra helpers on the free block of the covariance matrix ##
+# Sigma is a dense array or a FactorCovariance, which has its own products and
+# solves and is never turned into an (n x n) matrix
+
+
+def _matvec(Sigma, x):
+    return Sigma.dot(x)
+
+
+def _is_finite(Sigma):
+    if isinstance(Sigma, FactorCovariance):
+        return Sigma.is_finite()
+    return bool(np.all(np.isfinite(Sigma)))
+
+
+def _solve_free(Sigma, free, rhs):
+    # Solve Sigma[free, free] y = rhs, rhs can hold several columns
+    if isinstance(Sigma, FactorCovariance):
+        return Sigma.solve(rhs, free)
+    block = Sigma[np.ix_(free, free)]
+    try:
+        return cho_solve(cho_factor(block), rhs)
+    except LinAlgError:
+        # Singular block (e.g. fewer observations than assets): a small ridge
+        # picks one of the equally good solutions
+        ridge = 1e-10 * max(np.trace(block) / len(free), np.finfo(float).tiny)
+        return cho_solve(cho_factor(block + ridge * np.eye(len(free))), rhs)
+
+
+def regularize_covariance(Sigma, ridge=1e-10):
+    """Add a small ridge to a covariance matrix that is not positive definite.
+
+    With fewer observations than assets the sample covariance is singular and
+    the optimum is not unique; the ridge selects one of the optimal portfolios
+    and keeps the active-set iterations well defined.
+    """
+    if isinstance(Sigma, FactorCovariance):
+        # Positive specific variances already make it positive definite
+        return Sigma
+    try:
+        cho_factor(Sigma)
+        return Sigma
+    except LinAlgError:
+        n = len(Sigma)
+        scale = max(np.trace(Sigma) / n, np.finfo(float).tiny)
+        return Sigma + ridge * scale * np.eye(n)
+
+
+def _row_abs_sum_bound(Sigma):
+    # Gershgorin bound on the largest eigenvalue, used as a Lipschitz constant
+    if isinstance(Sigma, FactorCovariance):
+        return Sigma.largest_eigenvalue()
+    return np.abs(Sigma).sum(axis=1).max()
+
+
+## Closed-form solution when only the budget constraint sum(x) = 1 is active ##
+def solve_budget_kkt(mu, Sigma, gamma, free=None, fixed=None, budget=1.0):
+    """Solve min -x'mu + gamma/2 x'Sigma x subject to sum(x) = budget.
+
+    The KKT conditions give x = Sigma^-1 (mu - nu) / gamma with the multiplier
+    nu chosen so that the weights sum to the budget. When `free` is given the
+    problem is solved on that subset only, the remaining assets being held at
+    the values in `fixed` (a full-length vector).
+
+    Returns:
+        tuple: the weights of the free assets and the budget multiplier nu.
+    """
+    mu = np.asarray(mu, dtype=float)
+    n = len(mu)
+    if free is None:
+        free = np.arange(n)
+    rhs = mu[free].copy()
+    if fixed is not None:
+        held = np.ones(n, dtype=bool)
+        held[free] = False
+        if held.any():
+            rhs -= gamma * _matvec(Sigma, np.where(held, fixed, 0.0))[free]
+            budget = budget - fixed[held].sum()
+    # Two right-hand sides share the same factorisation
+    sol = _solve_free(Sigma, free, np.column_stack([rhs, np.ones(len(free))]))
+    y_mu, y_one = sol[:, 0] / gamma, sol[:, 1] / gamma
+    nu = (y_mu.sum() - budget) / y_one.sum()
+    return y_mu - nu * y_one, nu
+
+
+def solve_budget_kkt_batch(mu_stack, Sigma_stack, gamma):
+    """Closed-form budget-only solution for a stack of (T, n) / (T, n, n) problems.
+
+    All dates are solved with one batched factorisation; singular matrices
+    get the same ridge as in `regularize_covariance`.
+    """
+    mu_stack = np.asarray(mu_stack, dtype=float)
+    Sigma_stack = np.asarray(Sigma_stack, dtype=float)
+    try:
+        # Batched Cholesky only checks that every matrix is positive definite
+        np.linalg.cholesky(Sigma_stack)
+    except np.linalg.LinAlgError:
+        Sigma_stack = np.stack([regularize_covariance(S) for S in Sigma_stack])
+    rhs = np.stack([mu_stack, np.ones_like(mu_stack)], axis=-1)
+    sol = np.linalg.solve(Sigma_stack, rhs) / gamma
+    y_mu, y_one = sol[..., 0], sol[..., 1]
+    nu = (y_mu.sum(axis=1) - 1) / y_one.sum(axis=1)
+    return y_mu - nu[:, None] * y_one
+
+
+def project_budget_box(y, lower, upper, budget=1.0, tol=1e-12, max_iter=200):
+    """Euclidean projection of y onto {x : sum(x) = budget, lower <= x <= upper}."""
+    # The projection is clip(y - tau) for the scalar tau matching the budget
+    finite = np.concatenate([y - lower, y - upper])
+    finite = finite[np.isfinite(finite)]
+    span = np.abs(y).max() + abs(budget) + 1.0
+    lo = finite.min() - span if len(finite) else -span
+    hi = finite.max() + span if len(finite) else span
+    for _ in range(max_iter):
+        tau = (lo + hi) / 2
+        total = np.clip(y - tau, lower, upper).sum()
+        if abs(total - budget) <= tol:
+            break
+        if total > budget:
+            lo = tau
+        else:
+            hi = tau
+    return np.clip(y - tau, lower, upper)
+
+
+## Box-constrained solvers ##
+def _active_set(mu, Sigma, gamma, lower, upper, at_lower, at_upper, tol, max_iter):
+    # Primal-dual active set: guess which assets sit on a bound, solve the
+    # equality-constrained problem on the others, then update the guess
+    # from the bound multipliers until it stops changing
+    seen = set()
+    for iteration in range(1, max_iter + 1):
+        free = np.flatnonzero(~(at_lower | at_upper))
+        if len(free) == 0:
+            return None, iteration
+        x = np.where(at_lower, lower, np.where(at_upper, upper, 0.0))
+        x[free], nu = solve_budget_kkt(mu, Sigma, gamma, free=free, fixed=x)
+        # Multipliers of the bounds: positive on the lower, negative on the upper
+        z = gamma * _matvec(Sigma, x) - mu + nu
+        new_lower = z + (lower - x) > tol
+        new_upper = (-z + (x - upper) > tol) & ~new_lower
+        if np.array_equal(new_lower, at_lower) and np.array_equal(new_upper, at_upper):
+            return x, iteration
+        key = (new_lower.tobytes(), new_upper.tobytes())
+        if key in seen:
+            # Cycling between active sets, give up and let the caller fall back
+            return None, iteration
+        seen.add(key)
+        at_lower, at_upper = new_lower, new_upper
+    return None, max_iter
+
+
+def _primal_active_set(mu, Sigma, gamma, lower, upper, x, tol, max_iter):
+    # Classic primal active set from a feasible point: move towards the
+    # minimiser on the current face, stop at the first bound hit, and release
+    # the bound with the worst multiplier once the face is optimal
+    at_lower = x <= lower + tol
+    at_upper = (x >= upper - tol) & ~at_lower
+    x = np.where(at_lower, lower, np.where(at_upper, upper, x))
+    for iteration in range(1, max_iter + 1):
+        free = np.flatnonzero(~(at_lower | at_upper))
+        if len(free) == 0:
+            # At a vertex, release the bound the gradient most wants to leave
+            grad = mean_variance_gradient(x, mu, Sigma, gamma)
+            release = np.where(at_lower, grad, np.inf).argmin()
+            if not at_lower[release]:
+                release = np.where(at_upper, grad, -np.inf).argmax()
+            at_lower[release] = at_upper[release] = False
+            continue
+        target = x.copy()
+        target[free], nu = solve_budget_kkt(mu, Sigma, gamma, free=free, fixed=x)
+        step = target - x
+        if np.abs(step).max() <= tol:
+            z = gamma * _matvec(Sigma, x) - mu + nu
+            violation = np.where(at_lower, -z, 0.0) + np.where(at_upper, z, 0.0)
+            worst = violation.argmax()
+            if violation[worst] <= tol * max(1.0, np.abs(z).max()):
+                return x, iteration
+            at_lower[worst] = at_upper[worst] = False
+            continue
+        # Longest feasible step along the direction, capped at the full step
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratio = np.where(
+                step < 0,
+                (lower - x) / step,
+                np.where(step > 0, (upper - x) / step, np.inf),
+            )
+        alpha = min(1.0, ratio[free].min())
+        x = x + alpha * step
+        if alpha < 1.0:
+            blocking = free[ratio[free] <= alpha + tol]
+            at_lower[blocking] = step[blocking] < 0
+            at_upper[blocking] = step[blocking] > 0
+            x = np.where(at_lower, lower, np.where(at_upper, upper, x))
+    return None, max_iter
+
+
+def _projected_gradient(mu, Sigma, gamma, lower, upper, x0, tol, max_iter):
+    # Accelerated projected gradient with a fixed 1 / L step
+    n = len(mu)
+    step = 1.0 / max(gamma * _row_abs_sum_bound(Sigma), np.finfo(float).tiny)
+    start = x0 if x0 is not None else np.full(n, 1.0 / n)
+    if kernels.ENABLED and isinstance(Sigma, np.ndarray):
+        # Compiled loop, the bisection of each projection dominates in NumPy
+        return kernels.projected_gradient(
+            mu,
+            np.ascontiguousarray(Sigma, dtype=float),
+            float(gamma),
+            lower,
+            upper,
+            np.asarray(start, dtype=float),
+            step,
+            tol,
+            max_iter,
+        )
+    x = project_budget_box(start, lower, upper)
+    y, t = x.copy(), 1.0
+    for iteration in range(1, max_iter + 1):
+        grad = mean_variance_gradient(y, mu, Sigma, gamma)
+        x_new = project_budget_box(y - step * grad, lower, upper)
+        t_new = (1 + np.sqrt(1 + 4 * t * t)) / 2
+        y = x_new + (t - 1) / t_new * (x_new - x)
+        if np.linalg.norm(x_new - x) <= tol * max(1.0, np.linalg.norm(x)):
+            return x_new, True, iteration
+        x, t = x_new, t_new
+    return x, False, max_iter
+
+
+def solve_box_qp(
+    mu,
+    Sigma,
+    gamma,
+    lower=None,
+    upper=None,
+    x0=None,
+    tol=1e-10,
+    max_iter=25,
+    pg_max_iter=20_000,
+):
+    """Solve min -x'mu + gamma/2 x'Sigma x s.t. sum(x) = 1, lower <= x <= upper.
+
+    The closed-form KKT solution is tried first; when it violates the bounds a
+    primal-dual active-set method takes over, warm-started from `x0` if given.
+    A primal active-set method and then an accelerated projected gradient are
+    used as fallbacks when it does not settle.
+
+    Returns:
+        SolverResult: the weights and how they were obtained.
+    """
+    mu = np.asarray(mu, dtype=float)
+    n = len(mu)
+    if not (np.all(np.isfinite(mu)) and _is_finite(Sigma)):
+        raise ValueError("Expected returns and covariance matrix must be finite")
+    lower = np.full(n, -np.inf) if lower is None else np.asarray(lower, dtype=float)
+    upper = np.full(n, np.inf) if upper is None else np.asarray(upper, dtype=float)
+    if lower.sum() > 1 or upper.sum() < 1:
+        raise ValueError("Bounds are incompatible with fully invested weights")
+    Sigma = regularize_covariance(Sigma)
+
+    if x0 is None or np.all(np.isinf(lower) & np.isinf(upper)):
+        # Start from the budget-only KKT solution, optimal if within the bounds
+        guess, _ = solve_budget_kkt(mu, Sigma, gamma)
+        if np.all(guess >= lower - tol) and np.all(guess <= upper + tol):
+            return SolverResult(np.clip(guess, lower, upper), True, 1, "kkt")
+        at_lower, at_upper = guess < lower, guess > upper
+    else:
+        # Warm start: assume the bounds binding at x0 are still binding
+        guess = np.clip(np.asarray(x0, dtype=float), lower, upper)
+        at_lower = guess <= lower + tol
+        at_upper = (guess >= upper - tol) & ~at_lower
+
+    x, iterations = _active_set(
+        mu, Sigma, gamma, lower, upper, at_lower, at_upper, tol, max_iter
+    )
+    if x is not None:
+        return SolverResult(np.clip(x, lower, upper), True, iterations, "active_set")
+
+    # The primal-dual iteration can cycle on ill-conditioned matrices, the
+    # primal method is slower but monotone from any feasible point
+    start = project_budget_box(guess, lower, upper)
+    x, primal_iterations = _primal_active_set(
+        mu, Sigma, gamma, lower, upper, start, tol, 10 * n
+    )
+    iterations += primal_iterations
+    if x is not None:
+        # Its steps add up rounding errors on singular matrices, the projection
+        # puts the weights back on the budget
+        return SolverResult(
+            project_budget_box(x, lower, upper, tol=0.0),
+            True,
+            iterations,
+            "primal_active_set",
+        )
+
+    x, success, pg_iterations = _projected_gradient(
+        mu, Sigma, gamma, lower, upper, x0, tol, pg_max_iter
+    )
+    return SolverResult(x, success, iterations + pg_iterations, "projected_gradient")
@@ -0,0 +1,199 @@
+import itertools
+import logging
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from pybacktestchain.broker import Backtest
+from pybacktestchain.data_module import get_stocks_data
+
+from python_project_raphael_corchia.data_store import PriceStore
+from python_project_raphael_corchia.engine import (
+    CustomBacktest,
+    CustomFirstTwoMoments,
+)
+
+
+## Price data shared read-only between the worker processes ##
+@dataclass
+class SharedMarketData:
+    """Handle on a (dates x tickers) price matrix stored in a memory-mapped file.
+
+    The files have the layout of a PriceStore. Only the handle is sent to the
+    workers; each of them reads the prices through `store`, whose windows are
+    views on the same memory map, instead of receiving or downloading its own
+    copy of the prices.
+    """
+
+    path: str
+    dates: np.ndarray
+    tickers: list
+    time_column: str = "Date"
+    company_column: str = "ticker"
+    price_column: str = "Adj Close"
+
+    @classmethod
+    def from_frame(
+        cls,
+        df,
+        directory,
+        time_column="Date",
+        company_column="ticker",
+        price_column="Adj Close",
+    ):
+        # The long price table is pivoted and written once by a price store
+        dates = pd.to_datetime(df[time_column]).dt.tz_localize(None)
+        store = PriceStore(
+            directory,
+            tickers=sorted(set(df[company_column])),
+            fetch=lambda tickers, start, end: df,
+            time_column=time_column,
+            company_column=company_column,
+            price_column=price_column,
+        )
+        store.update(dates.min(), dates.max() + pd.Timedelta(days=1))
+        stored_dates, _, tickers = store.window(pd.Timestamp.min, pd.Timestamp.max)
+        return cls(
+            os.path.join(directory, "prices.npy"),
+            stored_dates,
+            list(tickers),
+            time_column,
+            company_column,
+            price_column,
+        )
+
+    def store(self):
+        """Offline PriceStore reading the shared files, nothing is copied."""
+        return PriceStore(
+            os.path.dirname(self.path),
+            offline=True,
+            time_column=self.time_column,
+            company_column=self.company_column,
+            price_column=self.price_column,
+        )
+
+
+## One point of the parameter grid ##
+@dataclass
+class SweepConfig:
+    initial_date: datetime
+    final_date: datetime
+    gamma: float = 1.0
+    bounds: list = field(default_factory=lambda: [(0.0, 1.0)])
+    initial_cash: float = 1_000_000
+
+
+def parameter_grid(gammas, bounds, date_ranges, initial_cash=1_000_000):
+    """Cartesian product of risk aversions, bounds and (start, end) periods.
+
+    Example:
+        parameter_grid([0.5, 1.0], [[(0.0, 1.0)], [(0.0, 0.2)]],
+                       [(datetime(2019, 1, 1), datetime(2020, 1, 1))])
+    """
+    return [
+        SweepConfig(start, end, gamma, list(bound), initial_cash)
+        for gamma, bound, (start, end) in itertools.product(gammas, bounds, date_ranges)
+    ]
+
+
+def _run_config(config, market, universe):
+    # Executed in a worker: a failed configuration does not stop the sweep
+    logging.getLogger().setLevel(logging.WARNING)
+    try:
+        return {**_backtest_config(config, market, universe), "error": None}
+    except Exception as e:
+        logging.exception(f"Sweep configuration {config} failed")
+        return {"error": f"{type(e).__name__}: {e}"}
+
+
+def _backtest_config(config, market, universe):
+    # One backtest on the shared prices, nothing stored
+    backtest = CustomBacktest(
+        initial_date=config.initial_date,
+        final_date=config.final_date,
+        information_class=CustomFirstTwoMoments,
+        information_kwargs={"gamma": config.gamma, "bounds": config.bounds},
+        initial_cash=config.initial_cash,
+        universe=universe,
+        price_store=market.store(),
+        time_column=market.time_column,
+        company_column=market.company_column,
+        adj_close_column=market.price_column,
+        store_results=False,
+        verbose=False,
+    )
+    backtest.run_backtest()
+    log = backtest.broker.get_transaction_log()
+    prices = backtest.information.get_prices(config.final_date)
+    final_value = backtest.broker.get_portfolio_value(prices)
+    return {
+        "final_value": final_value,
+        "total_return": final_value / config.initial_cash - 1,
+        "final_cash": backtest.broker.get_cash_balance(),
+        "n_trades": len(log),
+        "n_buy": int((log["Action"] == "BUY").sum()),
+        "n_sell": int((log["Action"] == "SELL").sum()),
+    }
+
+
+def run_sweep(
+    configs,
+    universe=None,
+    data=None,
+    max_workers=None,
+    time_column="Date",
+    company_column="ticker",
+    price_column="Adj Close",
+):
+    """Run one backtest per configuration across a process pool.
+
+    The prices of the universe are downloaded once (or taken from `data`),
+    written to a memory-mapped file and shared read-only by the workers.
+
+    Args:
+        configs (list): SweepConfig objects, see `parameter_grid`.
+        universe (list): Tickers, defaults to the Backtest universe.
+        data (pd.DataFrame): Prices in the get_stocks_data format.
+        max_workers (int): Number of processes, defaults to the CPU count.
+        time_column, company_column, price_column (str): Columns of `data`.
+
+    Returns:
+        pd.DataFrame: One row of parameters and metrics per configuration.
+            A configuration whose backtest raised has no metrics, its `error`
+            column holds the exception.
+    """
+    configs = list(configs)
+    if not configs:
+        return pd.DataFrame()
+    universe = list(universe) if universe is not None else list(Backtest.universe)
+    if data is None:
+        start = min(c.initial_date for c in configs).strftime("%Y-%m-%d")
+        end = max(c.final_date for c in configs).strftime("%Y-%m-%d")
+        data = get_stocks_data(universe, start, end)
+    data = data[data[company_column].isin(universe)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        market = SharedMarketData.from_frame(
+            data, directory, time_column, company_column, price_column
+        )
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            metrics = list(
+                pool.map(
+                    _run_config,
+                    configs,
+                    itertools.repeat(market),
+                    itertools.repeat(universe),
+                )
+            )
+
+    rows = []
+    for config, result in zip(configs, metrics):
+        row = asdict(config)
+        row["bounds"] = str(config.bounds)
+        row.update(result)
+        rows.append(row)
+    return pd.DataFrame(rows)
@@ -0,0 +1,131 @@
+import json
+import threading
+import time
+from contextlib import nullcontext
+
+import numpy as np
+
+# Quantiles reported for every histogram
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+## Counters, histograms and timed spans of a run ##
+class Tracer:
+    """Lightweight instrumentation of the hot paths of a backtest.
+
+    Counters count events (solver failures, equal weight fallbacks), histograms
+    keep every observed value (solver iterations) and spans add the wall time
+    of a stage to the histogram `<stage>.seconds`. A Tracer can be shared by
+    the threads of a run.
+
+    Example:
+        tracer = Tracer()
+        with tracer.span("execution"):
+            broker.execute_portfolio(portfolio, prices, t)
+        tracer.count("solver.failures")
+        tracer.to_json()
+    """
+
+    enabled = True
+
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def observe(self, name, value):
+        with self._lock:
+            self.histograms.setdefault(name, []).append(value)
+
+    def span(self, name):
+        return _Span(self, f"{name}.seconds")
+
+    def snapshot(self):
+        """Counters and histogram summaries as plain dictionaries."""
+        with self._lock:
+            counters = dict(self.counters)
+            histograms = {
+                k: np.asarray(v, dtype=float) for k, v in self.histograms.items()
+            }
+        summaries = {}
+        for name, values in histograms.items():
+            summary = {
+                "count": len(values),
+                "total": float(values.sum()),
+                "mean": float(values.mean()),
+                "max": float(values.max()),
+            }
+            for q, value in zip(QUANTILES, np.quantile(values, QUANTILES)):
+                summary[f"p{round(100 * q)}"] = float(value)
+            summaries[name] = summary
+        return {"counters": counters, "histograms": summaries}
+
+    def stages(self):
+        """Calls and total seconds of each span, slowest stage first."""
+        return stages(self.snapshot())
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2)
+
+
+class _Span:
+    # Context manager adding its duration to a histogram
+    __slots__ = ("tracer", "name", "start")
+
+    def __init__(self, tracer, name):
+        self.tracer = tracer
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer.observe(self.name, time.perf_counter() - self.start)
+        return False
+
+
+def stages(snapshot):
+    """Calls and total seconds of each span of a snapshot, slowest first."""
+    table = {
+        name[: -len(".seconds")]: {
+            "calls": summary["count"],
+            "seconds": summary["total"],
+        }
+        for name, summary in snapshot["histograms"].items()
+        if name.endswith(".seconds")
+    }
+    return dict(sorted(table.items(), key=lambda item: -item[1]["seconds"]))
+
+
+## Disabled tracer, every call returns at once ##
+class NullTracer:
+    """Tracer doing nothing, used when tracing is disabled."""
+
+    enabled = False
+    _span = nullcontext()
+
+    def count(self, name, n=1):
+        pass
+
+    def observe(self, name, value):
+        pass
+
+    def span(self, name):
+        return self._span
+
+    def snapshot(self):
+        return {"counters": {}, "histograms": {}}
+
+    def stages(self):
+        return {}
+
+    def to_json(self):
+        return json.dumps(self.snapshot())
+
+
+NULL_TRACER = NullTracer()
@@ -0,0 +1,179 @@
+import numpy as np
+import pandas as pd
+from pybacktestchain.broker import Broker
+
+from python_project_raphael_corchia.blockchain import open_chain_store
+
+ACTIONS = ["BUY", "SELL"]
+
+# Columns of the broker transaction log and their type. Prices stay in
+# float64: the cash and the P&L are rebuilt from Price x Quantity, float32
+# would drift by cents per trade.
+TRANSACTION_DTYPES = {
+    "Date": "datetime64[ns]",
+    "Action": "category",
+    "Ticker": "category",
+    "Quantity": "int32",
+    "Price": "float64",
+    "Cash": "float64",
+}
+
+
+def typed_log(df):
+    """Transaction log with categorical tickers/actions and numeric columns.
+
+    Accepts the object-dtype log of the upstream Broker (or a log read back
+    from csv/parquet). A log that is already typed is returned as is, without
+    a copy.
+    """
+    typed = all(
+        str(df[column].dtype) == dtype for column, dtype in TRANSACTION_DTYPES.items()
+    )
+    if typed and list(df["Action"].cat.categories) == ACTIONS:
+        return df
+    dates = pd.to_datetime(df["Date"])
+    if dates.dt.tz is not None:
+        dates = dates.dt.tz_localize(None)
+    return pd.DataFrame(
+        {
+            "Date": dates.to_numpy(dtype="datetime64[ns]"),
+            "Action": pd.Categorical(df["Action"].to_numpy(), categories=ACTIONS),
+            "Ticker": df["Ticker"].astype("category").array,
+            "Quantity": pd.to_numeric(df["Quantity"]).to_numpy(dtype=np.int32),
+            "Price": pd.to_numeric(df["Price"]).to_numpy(dtype=np.float64),
+            "Cash": pd.to_numeric(df["Cash"]).to_numpy(dtype=np.float64),
+        }
+    )
+
+
+## Append-only transaction log backed by numpy arrays ##
+class TransactionBuffer:
+    """Transactions appended one by one into preallocated arrays.
+
+    The arrays double in size when full, appending is amortized O(1) instead
+    of the O(n) DataFrame concatenation of the upstream Broker. `to_frame`
+    builds the typed DataFrame once per new batch of transactions.
+    """
+
+    def __init__(self, capacity=1024):
+        self._size = 0
+        self._tickers = []
+        self._ticker_codes = {}
+        self._arrays = self._allocate(capacity)
+        self._frame = None
+
+    @staticmethod
+    def _allocate(capacity):
+        return {
+            "Date": np.empty(capacity, dtype="datetime64[ns]"),
+            "Action": np.empty(capacity, dtype=np.int8),
+            "Ticker": np.empty(capacity, dtype=np.int32),
+            "Quantity": np.empty(capacity, dtype=np.int32),
+            "Price": np.empty(capacity, dtype=np.float64),
+            "Cash": np.empty(capacity, dtype=np.float64),
+        }
+
+    def __len__(self):
+        return self._size
+
+    def _reserve(self, n):
+        capacity = len(self._arrays["Date"])
+        if self._size + n <= capacity:
+            return
+        arrays = self._allocate(max(2 * capacity, self._size + n))
+        for column, array in self._arrays.items():
+            arrays[column][: self._size] = array[: self._size]
+        self._arrays = arrays
+
+    def _ticker_code(self, ticker):
+        code = self._ticker_codes.get(ticker)
+        if code is None:
+            code = self._ticker_codes[ticker] = len(self._tickers)
+            self._tickers.append(ticker)
+        return code
+
+    def append(self, date, action, ticker, quantity, price, cash):
+        """Add one transaction at the end of the log."""
+        self._reserve(1)
+        i = self._size
+        self._arrays["Date"][i] = pd.Timestamp(date).tz_localize(None).to_datetime64()
+        self._arrays["Action"][i] = ACTIONS.index(action)
+        self._arrays["Ticker"][i] = self._ticker_code(ticker)
+        self._arrays["Quantity"][i] = quantity
+        self._arrays["Price"][i] = price
+        self._arrays["Cash"][i] = cash
+        self._size += 1
+        self._frame = None
+
+    def extend(self, df):
+        """Add the transactions of a log DataFrame, e.g. from a checkpoint."""
+        if len(df) == 0:
+            return
+        df = typed_log(df)
+        n = len(df)
+        self._reserve(n)
+        # Codes of the log categories translated into the buffer ones
+        tickers = df["Ticker"].cat
+        mapping = np.array(
+            [self._ticker_code(ticker) for ticker in tickers.categories],
+            dtype=np.int32,
+        )
+        rows = slice(self._size, self._size + n)
+        self._arrays["Date"][rows] = df["Date"].to_numpy()
+        self._arrays["Action"][rows] = df["Action"].cat.codes.to_numpy()
+        self._arrays["Ticker"][rows] = mapping[tickers.codes.to_numpy()]
+        for column in ("Quantity", "Price", "Cash"):
+            self._arrays[column][rows] = df[column].to_numpy()
+        self._size += n
+        self._frame = None
+
+    def to_frame(self):
+        """The transactions as a typed DataFrame, rebuilt only after appends."""
+        if self._frame is None:
+            n = self._size
+            arrays = self._arrays
+            self._frame = pd.DataFrame(
+                {
+                    "Date": arrays["Date"][:n].copy(),
+                    "Action": pd.Categorical.from_codes(
+                        arrays["Action"][:n], categories=ACTIONS
+                    ),
+                    "Ticker": pd.Categorical.from_codes(
+                        arrays["Ticker"][:n], categories=list(self._tickers)
+                    ),
+                    "Quantity": arrays["Quantity"][:n].copy(),
+                    "Price": arrays["Price"][:n].copy(),
+                    "Cash": arrays["Cash"][:n].copy(),
+                }
+            )
+        return self._frame
+
+
+## Broker logging into a TransactionBuffer ##
+class TypedBroker(Broker):
+    """Broker whose transaction log is an append-only TransactionBuffer.
+
+    `transaction_log` still reads and assigns a DataFrame, as the upstream
+    Broker (checkpoints restore it by assignment), but the log is typed and
+    appending a transaction no longer copies the whole log. Its blockchain
+    is a ChainStore, see blockchain.py.
+    """
+
+    @property
+    def transaction_log(self):
+        return self.transactions.to_frame()
+
+    @transaction_log.setter
+    def transaction_log(self, df):
+        # Called by the dataclass __init__ with None, or with a restored log
+        self.transactions = TransactionBuffer()
+        if df is not None:
+            self.transactions.extend(df)
+
+    def log_transaction(self, date, action, ticker, quantity, price):
+        """Logs the transaction."""
+        self.transactions.append(date, action, ticker, quantity, price, self.cash)
+
+    def initialize_blockchain(self, name: str):
+        # Segmented store of the chain, opened without reading its blocks
+        self.blockchain = open_chain_store(name)
@@ -0,0 +1,498 @@
+import ast
+import io
+import json
+from datetime import datetime, timedelta
+from functools import partial
+
+import pandas as pd
+import streamlit as st
+from pybacktestchain.broker import EndOfMonth
+
+from python_project_raphael_corchia.analytics import (
+    transaction_summary_by_period,
+    transaction_summary_by_ticker,
+)
+from python_project_raphael_corchia.blockchain import ChainMonitor, block_page
+from python_project_raphael_corchia.cache import ResultCache, config_key
+from python_project_raphael_corchia.data_store import PriceStore
+from python_project_raphael_corchia.engine import (
+    CustomBacktest,
+    CustomFirstTwoMoments,
+)
+from python_project_raphael_corchia.estimators import ESTIMATORS
+from python_project_raphael_corchia.jobs import JobRegistry
+from python_project_raphael_corchia.metrics import SHARPE_WINDOW, performance
+from python_project_raphael_corchia.risk import ArrayStopLoss
+from python_project_raphael_corchia.tracing import Tracer, stages
+from python_project_raphael_corchia.transactions import typed_log
+from python_project_raphael_corchia.universe import DEFAULT_UNIVERSE, read_universe
+
+# Rows of the block table shown at once in the Blockchain Monitoring panel
+BLOCKS_PER_PAGE = 50
+# Tickers of the universe listed under the strategy parameters
+UNIVERSE_PREVIEW = 50
+
+
+def parse_bounds(text):
+    # Read bounds written as a Python list of (low, high) tuples
+    try:
+        return [(low, high) for low, high in ast.literal_eval(text)]
+    except (ValueError, SyntaxError, TypeError):
+        st.warning(f"Invalid bounds {text!r}, using [(0.0, 1.0)]")
+        return [(0.0, 1.0)]
+
+
+@st.cache_resource
+def chain_monitor():
+    # Loaded chains and verified prefixes, shared by every session
+    return ChainMonitor()
+
+
+@st.cache_resource
+def job_registry():
+    # One registry shared by every session of the server
+    return JobRegistry()
+
+
+def run_backtest_job(job, trace=True, **settings):
+    # Executed in a worker thread: no streamlit call, the result is stored on disk
+    tracer = Tracer() if trace else None
+    backtest = CustomBacktest(progress=job.report, tracer=tracer, **settings)
+    backtest.run_backtest()
+    return ResultCache().put(
+        job.key,
+        backtest.backtest_name,
+        backtest.broker.get_transaction_log(),
+        trace=None if tracer is None else tracer.snapshot(),
+    )
+
+
+@st.fragment(run_every=1)
+def show_progress(job_id):
+    # Refreshed every second until the job of the session is finished
+    job = job_registry().get(job_id)
+    if job is None:
+        st.session_state.pop("backtest_job", None)
+        return
+    progress = job.poll()
+    if job.status == "failed":
+        st.session_state.pop("backtest_job", None)
+        st.error(f"Backtest failed: {job.error}")
+        return
+    if job.status == "done":
+        # Rerun the whole page to display the results
+        st.session_state.pop("backtest_job", None)
+        st.rerun()
+
+    st.header("Backtest Running")
+    date = progress.get("date")
+    st.progress(
+        progress.get("fraction", 0.0),
+        text="Waiting for a worker" if date is None else f"Processing {date:%Y-%m-%d}",
+    )
+    cols = st.columns(3)
+    cols[0].metric("Date", "-" if date is None else f"{date:%Y-%m-%d}")
+    cols[1].metric("Cash ($)", f"{progress.get('cash', 0):,.0f}")
+    cols[2].metric("Trades", progress.get("n_trades", 0))
+    if job.history:
+        cash = pd.DataFrame(job.history).set_index("date")["cash"]
+        st.line_chart(cash, x_label="Date", y_label="Cash ($)")
+
+
+def show_performance(df_portfolio_mvmt, start, end, universe, initial_cash):
+    from python_project_raphael_corchia import charts
+
+    # Positions valued with the stored prices the backtest ran on
+    store = PriceStore("market_data", offline=True).restrict(universe)
+    dates, prices, tickers = store.window(start, end + timedelta(days=1))
+    perf = performance(df_portfolio_mvmt, dates, prices, tickers, initial_cash)
+    summary = perf.summary()
+    if not summary:
+        st.write("Not enough stored prices to value the portfolio.")
+        return
+
+    cols = st.columns(6)
+    cols[0].metric("Final Value ($)", f"{summary['final_value']:,.0f}")
+    cols[1].metric("Total Return", f"{summary['total_return']:.2%}")
+    cols[2].metric("Volatility", f"{summary['annualized_volatility']:.2%}")
+    cols[3].metric("Sharpe Ratio", f"{summary['sharpe_ratio']:.2f}")
+    cols[4].metric("Max Drawdown", f"{summary['max_drawdown']:.2%}")
+    cols[5].metric("Turnover (per year)", f"{summary['annualized_turnover']:.2f}")
+
+    tab1, tab2, tab3, tab4 = st.tabs(
+        ["Equity Curve", "Drawdown", "Rolling Sharpe", "P&L by Ticker"]
+    )
+    with tab1:
+        st.plotly_chart(
+            charts.line_figure(
+                dates, perf.nav, "NAV", "Portfolio Value Over Time", "Value ($)"
+            )
+        )
+    with tab2:
+        st.plotly_chart(
+            charts.line_figure(
+                dates,
+                perf.drawdown,
+                "Drawdown",
+                "Drawdown",
+                "Drawdown",
+                color="red",
+                method="minmax",
+            )
+        )
+    with tab3:
+        st.plotly_chart(
+            charts.line_figure(
+                dates,
+                perf.rolling_sharpe(),
+                "Sharpe",
+                f"Rolling Sharpe Ratio ({SHARPE_WINDOW} days)",
+                "Sharpe Ratio",
+            )
+        )
+    with tab4:
+        st.plotly_chart(charts.pnl_bar(perf.pnl_by_ticker()))
+
+
+def show_trace(backtest_name, backtest_trace, render_trace):
+    # Stage timings and solver statistics of the run and of this page
+    if backtest_trace is None:
+        st.write("This result was computed without tracing.")
+    else:
+        st.subheader("Backtest Stages")
+        table = pd.DataFrame.from_dict(stages(backtest_trace), orient="index")
+        if not table.empty:
+            table["share"] = table["seconds"] / table["seconds"].max()
+        st.dataframe(table)
+        cols = st.columns(2)
+        with cols[0]:
+            st.subheader("Counters")
+            counters = backtest_trace["counters"]
+            st.dataframe(pd.Series(counters, name="count", dtype="int64"))
+        with cols[1]:
+            st.subheader("Histograms")
+            histograms = {
+                name: summary
+                for name, summary in backtest_trace["histograms"].items()
+                if not name.endswith(".seconds")
+            }
+            st.dataframe(pd.DataFrame.from_dict(histograms, orient="index"))
+
+    st.subheader("Rendering of this Page")
+    st.dataframe(pd.DataFrame.from_dict(stages(render_trace), orient="index"))
+    st.download_button(
+        "Download as JSON",
+        json.dumps({"backtest": backtest_trace, "render": render_trace}, indent=2),
+        file_name=f"{backtest_name}_trace.json",
+        mime="application/json",
+    )
+
+
+def main():
+    # Plotting libraries are only needed by the interface, imported on first use
+    import plotly.express as px
+
+    from python_project_raphael_corchia import charts
+
+    # Configure the page
+    st.set_page_config(page_title="Backtest Interface", layout="wide")
+
+    # Page title
+    st.title("Backtest Interface")
+
+    ###################### Section 1: User inputs ######################
+    st.header("Configure Backtest Parameters")
+    with st.container(border=True):
+        ######## General inputs ########
+        with st.expander("General Parameters", True):
+            initial_date = st.date_input("Start Date", value=datetime(2019, 1, 1))
+            final_date = st.date_input("End Date", value=datetime(2020, 1, 1))
+            file_name = st.text_input(
+                "Backtest File Name", placeholder="Leave empty for default name"
+            )
+            file_name = None if file_name == "" else file_name
+            initial_cash = st.number_input("Initial Cash ($)", value=1000000, step=1000)
+
+        ######## Strategy inputs ########
+        with st.expander("Strategy Parameters"):
+            gamma = st.number_input(
+                "Risk Parameter (gamma)",
+                min_value=0.0,
+                value=1.0,
+                step=0.1,
+            )
+            bounds = parse_bounds(st.text_input("Bounds", value="[(0.0, 1.0)]"))
+            st.text_input(
+                "Constraints (cons)",
+                value="{'type': 'eq', 'fun': lambda x: np.sum(x) - 1}",
+                disabled=True,
+            )
+            # Stock universe: the default one, an uploaded list or an index
+            # constituents file on the server
+            universe_source = st.radio(
+                "Stock Universe",
+                options=["Default", "Upload a list", "Constituents file"],
+                horizontal=True,
+            )
+            universe = list(DEFAULT_UNIVERSE)
+            if universe_source == "Upload a list":
+                upload = st.file_uploader(
+                    "Tickers (csv with a ticker or symbol column, or a plain list)",
+                    type=["csv", "txt"],
+                )
+                if upload is not None:
+                    universe = read_universe(io.BytesIO(upload.getvalue()))
+            elif universe_source == "Constituents file":
+                path = st.text_input("Path", value="universes/constituents.csv")
+                try:
+                    universe = read_universe(path)
+                except (OSError, ValueError):
+                    st.warning(f"Cannot read {path}, using the default universe.")
+            if not universe:
+                st.warning("No tickers found, using the default universe.")
+                universe = list(DEFAULT_UNIVERSE)
+
+            # Display the final selected universe, truncated when large
+            st.write(
+                f"Current Stock Universe ({len(universe)} tickers):",
+                universe[:UNIVERSE_PREVIEW],
+            )
+
+        ######## Rebalancing and risk model options ########
+        with st.expander("Advanced Options"):
+            rebalance_flag = st.selectbox(
+                "Rebalancing", options=["EndOfMonth"], index=0
+            )
+            rebalance_flag = EndOfMonth if rebalance_flag == "EndOfMonth" else None
+            risk_model = st.selectbox("Risk Model", options=["StopLoss"], index=0)
+            risk_model = ArrayStopLoss if risk_model == "StopLoss" else None
+            estimator = st.selectbox(
+                "Covariance Estimator",
+                options=list(ESTIMATORS),
+                index=0,
+                help="sample: recomputed on the whole window at each date, "
+                "rolling: updated as the window slides, ewma: exponentially "
+                "weighted, ledoit-wolf: rolling and shrunk towards the identity, "
+                "factor: principal component factor model, for large universes",
+            )
+            offline = st.checkbox(
+                "Offline (only use the prices stored in market_data)", value=False
+            )
+            verbose = st.checkbox("Verbose broker logging", value=False)
+            trace = st.checkbox(
+                "Trace the run (stage timings and solver statistics)", value=True
+            )
+
+        # Button to submit inputs
+        submitted = st.button(label="Run Backtest")
+
+    st.markdown("---")
+
+    ###################### Section 2: Results ######################
+    # Results are cached by configuration, in the session and on disk. The
+    # name is part of it, a run under a new name writes its own blocks.
+    cache = ResultCache(memory=st.session_state)
+    key = config_key(
+        backtest_name=file_name,
+        initial_date=initial_date,
+        final_date=final_date,
+        universe=universe,
+        gamma=gamma,
+        bounds=bounds,
+        estimator=estimator,
+        initial_cash=initial_cash,
+        rebalance_flag=rebalance_flag,
+        risk_model=risk_model,
+    )
+
+    if submitted:
+        result = cache.get(key)
+        if result is None:
+            # Run the backtest in the background, the page stays responsive
+            settings = dict(
+                initial_date=datetime.combine(initial_date, datetime.min.time()),
+                final_date=datetime.combine(final_date, datetime.min.time()),
+                information_class=CustomFirstTwoMoments,
+                universe=universe,
+                information_kwargs={
+                    "gamma": gamma,
+                    "bounds": bounds,
+                    "estimator": estimator,
+                },
+                rebalance_flag=rebalance_flag,
+                risk_model=risk_model,
+                name_blockchain="backtest",
+                price_store=PriceStore("market_data", offline=offline),
+                verbose=verbose,
+                backtest_name=file_name,
+                initial_cash=initial_cash,
+                trace=trace,
+            )
+            job = job_registry().submit(key, partial(run_backtest_job, **settings))
+            st.session_state["backtest_job"] = job.job_id
+        # Keep displaying this result when another widget reruns the script
+        st.session_state["backtest_key"] = key
+        # Period and universe of the result, to value its positions
+        st.session_state["backtest_period"] = dict(
+            start=initial_date,
+            end=final_date,
+            universe=universe,
+            initial_cash=initial_cash,
+        )
+
+    if "backtest_job" in st.session_state:
+        show_progress(st.session_state["backtest_job"])
+
+    result = None
+    if "backtest_key" in st.session_state:
+        result = cache.get(st.session_state["backtest_key"])
+
+    if result is not None:
+        st.header("Backtest Results")
+        # Server-side time spent building each section of the page
+        render = Tracer()
+        monitor = chain_monitor()
+        # Typed log: datetime dates and categorical tickers, no copy if already typed
+        df_portfolio_mvmt = typed_log(result.transaction_log)
+
+        # Display results
+        st.write(f"Backtest '{result.backtest_name}' completed successfully!")
+
+        ###################### Performance ######################
+        period = st.session_state.get("backtest_period")
+        if period is not None:
+            with render.span("render.portfolio_performance"), st.expander(
+                "Portfolio Performance", expanded=True
+            ):
+                show_performance(df_portfolio_mvmt, **period)
+
+        # Expanders for results
+        with st.expander("Processed Results (Key Metrics and Analysis)", expanded=True):
+            ###################### Summary of Transactions by Ticker ######################
+            with render.span("render.summary"), st.container(border=True):
+                cols = st.columns(2)
+                with cols[0]:
+                    summary = transaction_summary_by_ticker(df_portfolio_mvmt)
+                    st.title("Summary of Transactions by Ticker")
+                    st.dataframe(summary)
+
+                with cols[1]:
+                    # Counted once for the pie and the bar chart
+                    counts = charts.transaction_counts(df_portfolio_mvmt)
+                    st.plotly_chart(charts.ticker_pie(counts))
+
+            ###################### BUY and SELL Distribution by Ticker ######################
+            with render.span("render.charts"), st.container(border=True):
+                st.title("BUY and SELL Distribution by Ticker")
+                st.plotly_chart(charts.action_bar(counts))
+
+            ###################### Cash Evolution ######################
+            with render.span("render.charts"), st.container(border=True):
+                st.title("Evolution of Cash Over Time")
+                dates, cash = charts.cash_by_date(df_portfolio_mvmt)
+                st.plotly_chart(charts.cash_figure(dates, cash))
+
+            ###################### Agregate data ######################
+            with render.span("render.periods"), st.container(border=True):
+                st.title("Aggregate Data by Period")
+                tab1, tab2 = st.tabs(["Month", "Quarter"])
+
+                ######## Tab with monthly data ########
+                with tab1:
+                    cols = st.columns((2, 3))
+                    with cols[0]:
+                        st.subheader("Aggregate Data by Month")
+                        grouped_month = transaction_summary_by_period(
+                            df_portfolio_mvmt, "M"
+                        )
+
+                        st.dataframe(grouped_month)
+                    with cols[1]:
+                        fig_month = px.bar(
+                            grouped_month,
+                            x="Month",
+                            y=["Total_Quantity_Buy", "Total_Quantity_Sell"],
+                            title="Transactions by Month",
+                            labels={
+                                "value": "Quantity",
+                                "variable": "Transaction Type",
+                            },
+                            barmode="stack",
+                        )
+                        st.plotly_chart(fig_month)
+
+                ######## Tab with quarterly data ########
+                with tab2:
+                    cols = st.columns((2, 3))
+                    with cols[0]:
+                        st.subheader("Aggregate Data by Quarter")
+                        grouped_quarter = transaction_summary_by_period(
+                            df_portfolio_mvmt, "Q"
+                        )
+
+                        st.dataframe(grouped_quarter)
+
+                    with cols[1]:
+                        fig_quarter = px.bar(
+                            grouped_quarter,
+                            x="Quarter",
+                            y=["Total_Quantity_Buy", "Total_Quantity_Sell"],
+                            title="Transactions by Quarter",
+                            labels={
+                                "value": "Quantity",
+                                "variable": "Transaction Type",
+                            },
+                            barmode="stack",
+                        )
+                        st.plotly_chart(fig_quarter)
+
+        ###################### Blockchain data ######################
+        with render.span("render.blockchain"), st.expander(
+            "Blockchain Monitoring", expanded=False
+        ):
+            st.subheader("Blockchain Data")
+            # Only the chain of this run is read from the store
+            try:
+                block_chain = monitor.load("backtest", namespace=result.backtest_name)
+            except KeyError:
+                block_chain = None
+            if block_chain is None:
+                st.write("No block is stored for this backtest.")
+            else:
+                # Verified once per run, only the new blocks are hashed again
+                valid = monitor.verify(block_chain)
+                if valid:
+                    st.write("The blockchain is valid.")
+                else:
+                    st.write("The blockchain is not valid.")
+                st.write("Below is the raw blockchain data:")
+                n_pages = max(1, -(-len(block_chain.chain) // BLOCKS_PER_PAGE))
+                page = st.number_input(
+                    f"Page (of {n_pages})", min_value=1, max_value=n_pages, value=1
+                )
+                st.dataframe(
+                    block_page(block_chain, page - 1, BLOCKS_PER_PAGE),
+                    hide_index=True,
+                )
+                st.write(f"Blockchain Valid: {valid}")
+            # Every run of the store, from its index only
+            st.subheader("Stored Runs")
+            st.dataframe(monitor.store("backtest").runs(), hide_index=True)
+
+        ###################### Portfolio mov data ######################
+        with render.span("render.movements"), st.expander(
+            "Portfolio Movements (Pure Data)", expanded=False
+        ):
+            st.subheader("Portfolio Transactions")
+            st.dataframe(df_portfolio_mvmt)
+
+        ###################### Run performance ######################
+        with st.expander("Performance", expanded=False):
+            show_trace(result.backtest_name, result.trace, render.snapshot())
+
+    st.write("---")
+    st.caption("Streamlit Interface for Backtest Management.")
+
+
+if __name__ == "__main__":
+    main()
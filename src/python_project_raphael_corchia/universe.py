@@ -0,0 +1,61 @@
+import csv
+import re
+
+from pybacktestchain.broker import Backtest
+
+# The ten tickers of the upstream Backtest
+DEFAULT_UNIVERSE = list(Backtest.universe)
+# Columns holding the tickers in an index constituents file, any case
+TICKER_COLUMNS = ("ticker", "symbol", "code")
+
+
+def parse_universe(text):
+    """Tickers of a list separated by commas, semicolons, spaces or lines.
+
+    Tickers are upper-cased and duplicates dropped, the first occurrence
+    keeping its place.
+    """
+    tickers = (token.strip().upper() for token in re.split(r"[,;\s]+", text))
+    return list(dict.fromkeys(t for t in tickers if t))
+
+
+def read_universe(source):
+    """Tickers of a constituents file or of a plain list of tickers.
+
+    Args:
+        source: Path or file-like object (e.g. a Streamlit upload). A csv
+            whose header has a ticker, symbol or code column is read as
+            constituents (other columns such as weights are ignored), any
+            other content as a plain list, see `parse_universe`.
+
+    Returns:
+        list: The tickers, in the order of the file.
+    """
+    if hasattr(source, "read"):
+        text = source.read()
+    else:
+        with open(source, newline="", encoding="utf-8-sig") as f:
+            text = f.read()
+    if isinstance(text, bytes):
+        text = text.decode("utf-8-sig")
+    text = text.lstrip("\ufeff")
+
+    lines = text.splitlines()
+    header = [name.strip().lower() for name in next(csv.reader(lines[:1]), [])]
+    column = next((c for c in TICKER_COLUMNS if c in header), None)
+    if column is None:
+        return parse_universe(text)
+    position = header.index(column)
+    rows = csv.reader(lines[1:])
+    return parse_universe(
+        "\n".join(row[position] for row in rows if len(row) > position)
+    )
+
+
+def resolve_universe(universe):
+    """Universe of a configuration: a list of tickers or a constituents file."""
+    if universe is None:
+        return list(DEFAULT_UNIVERSE)
+    if isinstance(universe, str):
+        return read_universe(universe)
+    return parse_universe(" ".join(universe))
@@ -0,0 +1,253 @@
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from itertools import repeat
+
+import pandas as pd
+
+from python_project_raphael_corchia.engine import CustomBacktest
+from python_project_raphael_corchia.metrics import performance
+from python_project_raphael_corchia.transactions import TypedBroker
+
+# Arguments of CustomBacktest that cannot be sent to a worker process
+LOCAL_ONLY = ("tracer", "profiler", "progress")
+
+
+## One window of a rolling-origin evaluation ##
+@dataclass(frozen=True)
+class Fold:
+    initial_date: datetime
+    final_date: datetime
+
+    @property
+    def name(self):
+        return f"{self.initial_date:%Y-%m-%d}_{self.final_date:%Y-%m-%d}"
+
+    def contains(self, t):
+        return self.initial_date <= t <= self.final_date
+
+
+def rolling_folds(initial_date, final_date, length, step):
+    """Windows of `length` whose start moves by `step`, all ending by `final_date`.
+
+    Example:
+        rolling_folds(datetime(2018, 1, 1), datetime(2021, 1, 1),
+                      length=timedelta(days=365), step=timedelta(days=91))
+    """
+    if step <= timedelta(0):
+        raise ValueError("The step between two folds must be positive")
+    folds, start = [], initial_date
+    while start + length <= final_date:
+        folds.append(Fold(start, start + length))
+        start += step
+    return folds
+
+
+def overlapping_groups(folds):
+    """Folds split into chains of overlapping windows, sorted by start date.
+
+    Two groups share no date, they can be evaluated independently.
+    """
+    groups, end = [], None
+    for fold in sorted(set(folds), key=lambda f: (f.initial_date, f.final_date)):
+        if groups and fold.initial_date <= end:
+            groups[-1].append(fold)
+            end = max(end, fold.final_date)
+        else:
+            groups.append([fold])
+            end = fold.final_date
+    return groups
+
+
+## Information sets and portfolios shared by the folds ##
+class DateCache:
+    """Prices and portfolios of the information object of a backtest, by date.
+
+    A value is computed the first time a fold needs it, in the order of the
+    timeline as in a single backtest, then reused by the other folds holding
+    the date. Hits and misses are counted by the tracer of the backtest.
+    """
+
+    def __init__(self, backtest, info):
+        self.backtest = backtest
+        self.info = info
+        self._prices = {}
+        self._portfolios = {}
+
+    def update(self, portfolios):
+        # Portfolios precomputed in batch mode
+        self._portfolios.update(portfolios)
+
+    def prices(self, t):
+        if t not in self._prices:
+            self._prices[t] = self.info.get_prices(t)
+        return self._prices[t]
+
+    def portfolio(self, t):
+        tracer = self.backtest.tracer
+        if t in self._portfolios:
+            tracer.count("walkforward.cache_hits")
+            return self._portfolios[t]
+        tracer.count("walkforward.cache_misses")
+        with self.backtest.stage("information"):
+            information_set = self.info.compute_information(t)
+        with self.backtest.stage("optimization"):
+            portfolio = self.info.compute_portfolio(t, information_set)
+        self._portfolios[t] = portfolio
+        return portfolio
+
+
+def walk_folds(backtest, folds):
+    """Evaluate overlapping folds in one walk over the dates of `backtest`.
+
+    `backtest` spans the folds and holds the configuration. Every fold trades
+    with its own broker, while the prices and portfolios of the dates are
+    computed once for all of them. The data is loaded from the lookback of
+    the first date, so each fold starts with a full estimation window
+    whatever the other folds are.
+
+    Returns:
+        list: One dictionary of dates and metrics per fold, in order of `folds`.
+    """
+    risk_models, brokers = {}, {}
+    for fold in folds:
+        brokers[fold] = TypedBroker(
+            cash=backtest.initial_cash, verbose=backtest.verbose
+        )
+        if backtest.risk_model is not None:
+            risk_models[fold] = backtest.risk_model(threshold=0.1)
+    with backtest.stage("load_data"):
+        info = backtest.create_information(
+            backtest.load_data(backtest.initial_date - backtest.s)
+        )
+    backtest.information = info
+    cache = DateCache(backtest, info)
+
+    dates = pd.date_range(
+        start=backtest.initial_date, end=backtest.final_date, freq="D"
+    )
+    # Dates between two folds are skipped
+    dates = [t for t in dates if any(fold.contains(t) for fold in folds)]
+    if backtest.batch:
+        with backtest.stage("precompute_portfolios"):
+            cache.update(
+                backtest.precompute_portfolios(
+                    info, backtest.portfolio_dates(dates, backtest.risk_model)
+                )
+            )
+
+    # Run the folds side by side, date by date
+    for t in dates:
+        rebalance = backtest.rebalance_flag().time_to_rebalance(t)
+        for fold in folds:
+            if not fold.contains(t):
+                continue
+            broker = brokers[fold]
+            if fold in risk_models:
+                portfolio = cache.portfolio(t)
+                with backtest.stage("stop_loss"):
+                    risk_models[fold].trigger_stop_loss(
+                        t, portfolio, cache.prices(t), broker
+                    )
+            if rebalance:
+                portfolio = cache.portfolio(t)
+                with backtest.stage("execution"):
+                    broker.execute_portfolio(portfolio, cache.prices(t), t)
+
+    results = []
+    for fold in folds:
+        log = brokers[fold].get_transaction_log()
+        # The end date is excluded, as from the prices loaded by a backtest
+        window = backtest.price_window(fold.initial_date, fold.final_date)
+        summary = performance(log, *window, initial_cash=backtest.initial_cash)
+        results.append(
+            {
+                "fold": fold.name,
+                "initial_date": fold.initial_date,
+                "final_date": fold.final_date,
+                "final_cash": brokers[fold].get_cash_balance(),
+                "n_trades": len(log),
+                **summary.summary(),
+            }
+        )
+    return results
+
+
+def _walk_group(folds, kwargs):
+    # Executed in a worker or in the current process: one walk, nothing stored
+    backtest = CustomBacktest(
+        initial_date=min(fold.initial_date for fold in folds),
+        final_date=max(fold.final_date for fold in folds),
+        store_results=False,
+        **kwargs,
+    )
+    return walk_folds(backtest, folds)
+
+
+def _group_data(data, folds, kwargs):
+    # Prices a group of folds needs, with the lookback of its first date
+    lookback = kwargs.get("s", CustomBacktest.s)
+    start = min(fold.initial_date for fold in folds) - lookback
+    end = max(fold.final_date for fold in folds)
+    dates = pd.to_datetime(data[kwargs.get("time_column", "Date")])
+    dates = dates.dt.tz_localize(None)
+    return data[((dates >= start) & (dates <= end)).to_numpy()]
+
+
+## Rolling-origin evaluation of one configuration ##
+class WalkForward:
+    """Backtest a configuration over many windows and report each of them.
+
+    Overlapping folds are walked together: the information sets and optimal
+    portfolios of a date are computed once and shared by every fold holding
+    it. Groups of folds that do not overlap share nothing and run in a
+    process pool.
+
+    Args:
+        folds (list): Fold windows, see `rolling_folds`.
+        max_workers (int): Processes running the independent groups of folds,
+            1 to stay in the current process.
+        **kwargs: Arguments of CustomBacktest except the dates, e.g.
+            information_class, information_kwargs, universe, data, batch.
+            A tracer, profiler or progress callback is only used when the
+            folds run in the current process.
+
+    Example:
+        folds = rolling_folds(datetime(2018, 1, 1), datetime(2021, 1, 1),
+                              timedelta(days=365), timedelta(days=91))
+        WalkForward(folds, information_class=CustomFirstTwoMoments,
+                    information_kwargs={"gamma": 2.0}).run()
+    """
+
+    def __init__(self, folds, max_workers=None, **kwargs):
+        self.folds = list(folds)
+        self.max_workers = max_workers
+        kwargs.setdefault("verbose", False)
+        self.kwargs = kwargs
+
+    def run(self):
+        """Metrics of every fold as a DataFrame, one row per fold in order."""
+        if not self.folds:
+            return pd.DataFrame()
+        groups = overlapping_groups(self.folds)
+        if len(groups) > 1 and self.max_workers != 1:
+            logging.info(f"Walking {len(groups)} groups of folds in parallel.")
+            kwargs = {k: v for k, v in self.kwargs.items() if k not in LOCAL_ONLY}
+            data = kwargs.pop("data", None)
+            arguments = []
+            for group in groups:
+                group_kwargs = dict(kwargs)
+                if data is not None:
+                    # Each worker only receives the prices of its own group
+                    group_kwargs["data"] = _group_data(data, group, kwargs)
+                arguments.append(group_kwargs)
+            with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+                results = list(pool.map(_walk_group, groups, arguments))
+        else:
+            results = list(map(_walk_group, groups, repeat(self.kwargs)))
+
+        rows = {}
+        for group, metrics in zip(groups, results):
+            rows.update(zip(group, metrics))
+        return pd.DataFrame([rows[fold] for fold in self.folds])
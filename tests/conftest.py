@@ -0,0 +1,7 @@
+import pytest
+from synthetic import synthetic_prices, workdir  # noqa: F401
+
+
+@pytest.fixture
+def make_prices():
+    return synthetic_prices
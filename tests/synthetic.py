@@ -0,0 +1,40 @@
+"""Synthetic, offline inputs shared by the tests and the benchmark suite."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from python_project_raphael_corchia.engine import CustomBacktest
+
+
+def synthetic_prices(
+    tickers=None,
+    start="2018-01-01",
+    end="2020-01-01",
+    seed=0,
+    drift=3e-4,
+    tz=None,
+):
+    """Long price table in the get_stocks_data format, random walks.
+
+    The tickers default to the universe of CustomBacktest.
+    """
+    tickers = list(CustomBacktest.universe) if tickers is None else list(tickers)
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(start, end, tz=tz)
+    returns = rng.normal(drift, 0.02, (len(dates), len(tickers)))
+    prices = 100 * np.exp(np.cumsum(returns, axis=0))
+    return pd.DataFrame(
+        {
+            "Date": dates[np.tile(np.arange(len(dates)), len(tickers))],
+            "Adj Close": prices.T.ravel(),
+            "ticker": np.repeat(tickers, len(dates)),
+        }
+    )
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    # Backtests write their blockchain and results in the current directory
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
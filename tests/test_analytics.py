@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from python_project_raphael_corchia.analytics import (
+    transaction_summary_by_period,
+    transaction_summary_by_ticker,
+)
+
+
+@pytest.fixture
+def transaction_log():
+    rng = np.random.default_rng(0)
+    n = 500
+    return pd.DataFrame(
+        {
+            "Date": pd.Timestamp("2019-01-01")
+            + pd.to_timedelta(rng.integers(0, 400, n), unit="D"),
+            "Action": rng.choice(["BUY", "SELL"], n),
+            "Ticker": rng.choice(["AAPL", "MSFT", "TSLA"], n),
+            "Quantity": rng.integers(1, 100, n),
+            "Price": rng.uniform(10, 300, n),
+            "Cash": rng.uniform(0, 1e6, n),
+        }
+    )
+
+
+def buy_sum(df, x, action="BUY"):
+    # Reference implementation, as previously written in main()
+    return sum(x[df.loc[x.index, "Action"] == action])
+
+
+def test_summary_by_ticker_matches_reference(transaction_log):
+    df = transaction_log
+    expected = (
+        df.groupby("Ticker")
+        .agg(
+            Total_Buy=("Quantity", lambda x: buy_sum(df, x)),
+            Total_Sell=("Quantity", lambda x: buy_sum(df, x, "SELL")),
+            Net_Quantity=(
+                "Quantity",
+                lambda x: buy_sum(df, x) - buy_sum(df, x, "SELL"),
+            ),
+            Total_Investment=(
+                "Price",
+                lambda x: sum(
+                    x[df.loc[x.index, "Action"] == "BUY"]
+                    * df.loc[x.index, "Quantity"][df.loc[x.index, "Action"] == "BUY"]
+                ),
+            ),
+        )
+        .reset_index()
+    )
+    pd.testing.assert_frame_equal(
+        transaction_summary_by_ticker(df), expected, check_dtype=False
+    )
+
+
+@pytest.mark.parametrize("freq, name", [("M", "Month"), ("Q", "Quarter")])
+def test_summary_by_period_matches_reference(transaction_log, freq, name):
+    df = transaction_log.copy()
+    df[name] = df["Date"].dt.to_period(freq).astype(str)
+    expected = (
+        df.groupby(name)
+        .agg(
+            Total_Investment=(
+                "Price",
+                lambda x: sum(
+                    x[df.loc[x.index, "Action"] == "BUY"]
+                    * df.loc[x.index, "Quantity"][df.loc[x.index, "Action"] == "BUY"]
+                ),
+            ),
+            Total_Quantity_Buy=("Quantity", lambda x: buy_sum(df, x)),
+            Total_Quantity_Sell=("Quantity", lambda x: buy_sum(df, x, "SELL")),
+        )
+        .reset_index()
+    )
+    pd.testing.assert_frame_equal(
+        transaction_summary_by_period(transaction_log, freq),
+        expected,
+        check_dtype=False,
+    )
+
+
+def test_object_dtype_log_is_supported(transaction_log):
+    # The broker log starts from an empty frame, so columns are of object dtype
+    summary = transaction_summary_by_ticker(transaction_log.astype(object))
+    assert (
+        summary["Total_Buy"].sum()
+        == transaction_log.loc[transaction_log["Action"] == "BUY", "Quantity"].sum()
+    )
@@ -0,0 +1,174 @@
+import os
+import pickle
+
+import pytest
+from pybacktestchain.blockchain import Blockchain
+
+from python_project_raphael_corchia.blockchain import (
+    BLOCK_COLUMNS,
+    RUN_COLUMNS,
+    ChainMonitor,
+    ChainStore,
+    block_page,
+    load_blockchain,
+    open_chain_store,
+)
+
+
+def make_chain(tmp_path, monkeypatch, n_blocks=5):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("blockchain", exist_ok=True)
+    chain = Blockchain("test")
+    for i in range(n_blocks):
+        chain.add_block(f"backtest{i}", f"data{i}")
+    return chain
+
+
+def test_verify_matches_is_valid(tmp_path, monkeypatch):
+    chain = make_chain(tmp_path, monkeypatch)
+    monitor = ChainMonitor()
+    assert monitor.verify(chain) == chain.is_valid() is True
+
+    chain.chain[3].data = "tampered"
+    assert not ChainMonitor().verify(chain)
+    assert not chain.is_valid()
+
+
+def test_only_new_blocks_are_verified(tmp_path, monkeypatch):
+    chain = make_chain(tmp_path, monkeypatch)
+    monitor = ChainMonitor()
+    assert monitor.verify(chain)
+    assert monitor.verified_height(chain) == 6
+
+    # The verified prefix is trusted, the appended blocks are checked
+    chain.chain[2].data = "tampered"
+    chain.add_block("backtest5", "data5")
+    assert monitor.verified_height(chain) == 6
+    assert monitor.verify(chain)
+    chain.add_block("backtest6", "data6")
+    chain.chain[-1].data = "tampered"
+    assert not monitor.verify(chain)
+    assert monitor.verified_height(chain) == 7
+
+
+def test_other_chain_is_verified_from_the_start(tmp_path, monkeypatch):
+    chain = make_chain(tmp_path, monkeypatch)
+    monitor = ChainMonitor()
+    monitor.verify(chain)
+    # Same name and length but a different history
+    other = make_chain(tmp_path, monkeypatch)
+    assert monitor.verified_height(other) == 1
+
+
+def test_load_reloads_changed_files(tmp_path, monkeypatch):
+    chain = make_chain(tmp_path, monkeypatch)
+    monitor = ChainMonitor()
+    loaded = monitor.load("test")
+    assert monitor.load("test") is loaded
+    chain.add_block("backtest5", "data5")
+    assert len(monitor.load("test").chain) == 7
+
+
+def test_block_page(tmp_path, monkeypatch):
+    chain = make_chain(tmp_path, monkeypatch, n_blocks=11)
+    page = block_page(chain, 1, page_size=5)
+    assert list(page.columns) == BLOCK_COLUMNS
+    assert page["Block"].tolist() == [5, 6, 7, 8, 9]
+    assert page["Backtest"].tolist() == [f"backtest{i}" for i in range(4, 9)]
+    assert block_page(chain, 2, page_size=5)["Block"].tolist() == [10, 11]
+    assert block_page(chain, 3, page_size=5).empty
+
+
+def fill_store(store, runs=3, blocks=4):
+    for b in range(blocks):
+        for r in range(runs):
+            store.append(f"run{r}", f"run{r}", f"data {r} {b} " * 50)
+
+
+def test_store_chains_are_valid_per_run(tmp_path):
+    store = ChainStore(str(tmp_path / "chain"), segment_bytes=4096)
+    fill_store(store)
+    assert store.namespaces() == ["run0", "run1", "run2"]
+    assert len({name for name in os.listdir(tmp_path / "chain")}) > 4
+    for r in range(3):
+        chain = store.load(f"run{r}")
+        assert chain.chain[0].name_backtest == "Genesis Block"
+        assert [block.data for block in chain.chain[1:]] == [
+            f"data {r} {b} " * 50 for b in range(4)
+        ]
+        assert chain.is_valid() and ChainMonitor().verify(chain)
+    assert store.find("run1").data == "data 1 3 " * 50
+    assert store.find("missing") is None
+    assert store.block("run2", 2).hash == store.load("run2").chain[2].hash
+
+
+def test_store_sees_blocks_of_other_writers(tmp_path):
+    reader = ChainStore(str(tmp_path / "chain"))
+    writer = pickle.loads(pickle.dumps(ChainStore(str(tmp_path / "chain"))))
+    assert reader.height("run") == 0
+    writer.append("run", "run", "first")
+    writer.append("run", "run", "second")
+    assert reader.height("run") == 3
+    runs = reader.runs()
+    assert list(runs.columns) == RUN_COLUMNS
+    assert runs.iloc[0][["Run", "Blocks", "Backtest"]].tolist() == ["run", 3, "run"]
+
+
+def test_tampered_block_is_detected(tmp_path):
+    store = ChainStore(str(tmp_path / "chain"))
+    fill_store(store, runs=1)
+    segment = tmp_path / "chain" / "0000-000000.seg"
+    content = segment.read_bytes()
+    segment.write_bytes(content.replace(b"data 0 2", b"data 0 9"))
+    assert not ChainStore(str(tmp_path / "chain")).load("run0").is_valid()
+
+
+def test_unindexed_record_is_dropped(tmp_path):
+    store = ChainStore(str(tmp_path / "chain"))
+    fill_store(store, runs=1, blocks=2)
+    # A writer stopped after the record and before its index line
+    with open(tmp_path / "chain" / "0000-000000.seg", "ab") as f:
+        f.write(b"torn record")
+    store.append("run0", "run0", "after")
+    chain = ChainStore(str(tmp_path / "chain")).load("run0")
+    assert chain.chain[-1].data == "after" and chain.is_valid()
+
+
+def test_compaction_keeps_chains_and_drops_runs(tmp_path):
+    store = ChainStore(str(tmp_path / "chain"), segment_bytes=4096)
+    fill_store(store)
+    reader = ChainStore(str(tmp_path / "chain"))
+    expected = reader.load("run1").chain
+    report = store.compact(["run1", "run2"])
+    assert report["blocks"] == 10
+    assert report["bytes_after"] < report["bytes_before"]
+    assert store.namespaces() == ["run1", "run2"]
+    # A reader opened before the compaction reloads the new index
+    assert reader.namespaces() == ["run1", "run2"]
+    chain = reader.load("run1")
+    assert [b.hash for b in chain.chain] == [b.hash for b in expected]
+    assert chain.is_valid()
+    store.append("run1", "run1", "after compaction")
+    assert ChainStore(str(tmp_path / "chain")).load("run1").is_valid()
+
+
+def test_legacy_pickle_is_imported(tmp_path, monkeypatch):
+    chain = make_chain(tmp_path, monkeypatch, n_blocks=3)
+    store = open_chain_store("test")
+    assert store.namespaces() == ["legacy"]
+    imported = load_blockchain("test", namespace="legacy")
+    assert [b.hash for b in imported.chain] == [b.hash for b in chain.chain]
+    assert load_blockchain("test").chain[-1].hash == chain.chain[-1].hash
+    with pytest.raises(KeyError):
+        load_blockchain("test", namespace="missing")
+
+
+def test_monitor_loads_a_run(tmp_path):
+    store = ChainStore(str(tmp_path / "backtest"))
+    fill_store(store, runs=2, blocks=1)
+    monitor = ChainMonitor(str(tmp_path))
+    chain = monitor.load("backtest", namespace="run0")
+    assert monitor.load("backtest", namespace="run0") is chain
+    assert monitor.verify(chain)
+    store.append("run0", "run0", "more")
+    assert len(monitor.load("backtest", namespace="run0").chain) == 3
@@ -0,0 +1,59 @@
+import os
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from python_project_raphael_corchia.cache import ResultCache, config_key
+
+
+def make_log(n=100):
+    return pd.DataFrame(
+        {
+            "Date": pd.date_range("2019-01-01", periods=n),
+            "Action": ["BUY", "SELL"] * (n // 2),
+            "Ticker": "AAPL",
+            "Quantity": np.arange(n),
+            "Price": np.linspace(10, 20, n),
+            "Cash": np.linspace(1e6, 0, n),
+        }
+    )
+
+
+class StopLoss:
+    pass
+
+
+def test_config_key_is_stable_and_sensitive():
+    config = dict(
+        initial_date=date(2019, 1, 1),
+        universe=["AAPL", "MSFT"],
+        gamma=1.0,
+        bounds=[(0.0, 1.0)],
+        risk_model=StopLoss,
+    )
+    assert config_key(**config) == config_key(**dict(reversed(config.items())))
+    assert config_key(**config) != config_key(**{**config, "gamma": 2.0})
+    assert config_key(**config) != config_key(**{**config, "risk_model": None})
+
+
+def test_results_survive_a_new_session(tmp_path):
+    log = make_log()
+    ResultCache(tmp_path, memory={}).put("abc", "RedFoxPilot", log)
+    result = ResultCache(tmp_path, memory={}).get("abc")
+    assert result.backtest_name == "RedFoxPilot"
+    pd.testing.assert_frame_equal(result.transaction_log, log)
+    assert ResultCache(tmp_path, memory={}).get("missing") is None
+
+
+def test_least_recently_used_results_are_evicted(tmp_path):
+    cache = ResultCache(tmp_path, memory={})
+    for key in ["a", "b", "c"]:
+        cache.put(key, key, make_log(1000))
+    size = sum(os.path.getsize(tmp_path / f) for f in os.listdir(tmp_path)) / 3
+    # Use "a" so that "b" becomes the least recently used
+    os.utime(tmp_path / "a.json", (1e10, 1e10))
+    cache = ResultCache(tmp_path, max_bytes=2.5 * size, memory={})
+    cache.evict()
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
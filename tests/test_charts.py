@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+
+from python_project_raphael_corchia import charts
+
+
+def random_walk(n=10_000, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.arange(n), np.cumsum(rng.normal(size=n))
+
+
+def test_lttb_keeps_endpoints():
+    x, y = random_walk()
+    keep = charts.lttb(x, y, 500)
+    assert len(keep) == 500
+    assert keep[0] == 0 and keep[-1] == len(y) - 1
+    assert np.all(np.diff(keep) > 0)
+    # Short lines are left untouched
+    assert np.array_equal(charts.lttb(x[:100], y[:100], 500), np.arange(100))
+
+
+def test_min_max_keeps_extremes():
+    x, y = random_walk()
+    keep = charts.min_max(x, y, 500)
+    assert len(keep) <= 500
+    assert np.argmin(y) in keep and np.argmax(y) in keep
+    assert np.all(np.diff(keep) > 0)
+
+
+def test_cash_by_date_matches_groupby():
+    rng = np.random.default_rng(1)
+    dates = pd.bdate_range("2020-01-01", periods=100)
+    df = pd.DataFrame(
+        {
+            "Date": rng.choice(dates, 2000),
+            "Cash": rng.normal(1e6, 1e3, 2000),
+        }
+    )
+    expected = df.sort_values("Date", kind="stable").groupby("Date")["Cash"].last()
+    result_dates, result_cash = charts.cash_by_date(df)
+    assert np.array_equal(result_dates, expected.index.to_numpy())
+    assert np.array_equal(result_cash, expected.to_numpy())
+
+
+def test_cash_figure_is_downsampled_webgl():
+    dates = pd.bdate_range("1990-01-01", periods=10_000).to_numpy()
+    _, cash = random_walk()
+    fig = charts.cash_figure(dates, cash)
+    (trace,) = fig.data
+    assert trace.type == "scattergl"
+    assert len(trace.x) == charts.MAX_POINTS
+    assert trace.mode == "lines"
+    assert charts.cash_figure(dates[:50], cash[:50]).data[0].mode == "lines+markers"
+
+
+def test_counts_feed_pie_and_bar():
+    df = pd.DataFrame(
+        {"Ticker": ["A", "A", "B", "A"], "Action": ["BUY", "SELL", "BUY", "BUY"]}
+    )
+    counts = charts.transaction_counts(df)
+    assert counts.set_index(["Ticker", "Action"])["Count"].to_dict() == {
+        ("A", "BUY"): 2,
+        ("A", "SELL"): 1,
+        ("B", "BUY"): 1,
+    }
+    pie = charts.ticker_pie(counts)
+    assert dict(zip(pie.data[0].labels, pie.data[0].values)) == {"A": 3, "B": 1}
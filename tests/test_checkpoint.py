@@ -0,0 +1,76 @@
+from datetime import datetime
+
+import pandas as pd
+import pandas.testing as pdt
+
+from python_project_raphael_corchia.engine import (
+    CustomBacktest,
+    CustomFirstTwoMoments,
+)
+
+
+def run(final_date, data, checkpoint=None, name="run"):
+    backtest = CustomBacktest(
+        initial_date=datetime(2019, 1, 1),
+        final_date=final_date,
+        information_class=CustomFirstTwoMoments,
+        data=data,
+        checkpoint=checkpoint,
+        backtest_name=name,
+        verbose=False,
+    )
+    backtest.run_backtest()
+    return backtest
+
+
+def test_resumed_backtest_matches_full_run(tmp_path, monkeypatch, make_prices):
+    monkeypatch.chdir(tmp_path)
+    data = make_prices(start="2018-06-01", end="2019-09-01")
+    full = run(datetime(2019, 8, 1), data)
+
+    checkpoint = str(tmp_path / "checkpoint.pkl")
+    run(datetime(2019, 5, 1), data, checkpoint, name="daily")
+    resumed = run(datetime(2019, 8, 1), data, checkpoint)
+
+    assert resumed.backtest_name == "daily"
+    assert len(full.broker.get_transaction_log()) > 0
+    pdt.assert_frame_equal(
+        resumed.broker.get_transaction_log(), full.broker.get_transaction_log()
+    )
+    assert resumed.broker.get_cash_balance() == full.broker.get_cash_balance()
+    # The csv file holds the transactions of both runs
+    stored = pd.read_csv(tmp_path / "backtests" / "daily.csv", index_col=0)
+    assert len(stored) == len(full.broker.get_transaction_log())
+
+
+def test_checkpoint_of_another_configuration_is_ignored(
+    tmp_path, monkeypatch, make_prices
+):
+    monkeypatch.chdir(tmp_path)
+    data = make_prices(start="2018-06-01", end="2019-09-01")
+    checkpoint = str(tmp_path / "checkpoint.pkl")
+    run(datetime(2019, 5, 1), data, checkpoint)
+
+    backtest = CustomBacktest(
+        initial_date=datetime(2019, 1, 1),
+        final_date=datetime(2019, 8, 1),
+        information_class=CustomFirstTwoMoments,
+        information_kwargs={"gamma": 2.0},
+        data=data,
+        checkpoint=checkpoint,
+        verbose=False,
+    )
+    assert backtest.resume_from_checkpoint() is None
+
+
+def test_fingerprint_depends_on_the_initial_cash(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    kwargs = dict(
+        initial_date=datetime(2019, 1, 1),
+        final_date=datetime(2019, 8, 1),
+        information_class=CustomFirstTwoMoments,
+        verbose=False,
+    )
+    default = CustomBacktest(**kwargs).fingerprint()
+    assert CustomBacktest(initial_cash=1_000_000, **kwargs).fingerprint() == default
+    assert CustomBacktest(initial_cash=100_000, **kwargs).fingerprint() != default
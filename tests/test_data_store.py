@@ -0,0 +1,115 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pandas.testing as pdt
+from pybacktestchain.data_module import DataModule, FirstTwoMoments
+
+from python_project_raphael_corchia.data_store import PriceStore
+from python_project_raphael_corchia.engine import (
+    CustomBacktest,
+    CustomFirstTwoMoments,
+)
+
+# Random walks with the time zone of the downloaded prices
+PERIOD = dict(start="2018-06-01", end="2019-09-01", tz="America/New_York")
+
+
+class FakeDownload:
+    # Serves a fixed table like get_stocks_data and records the calls
+    def __init__(self, data):
+        self.data = data
+        self.calls = []
+
+    def __call__(self, tickers, start, end):
+        self.calls.append((tuple(tickers), start, end))
+        dates = self.data["Date"].dt.tz_localize(None)
+        mask = self.data["ticker"].isin(tickers) & (dates >= start) & (dates < end)
+        return self.data[mask.to_numpy()]
+
+
+def test_update_only_downloads_missing_ranges(tmp_path, make_prices):
+    download = FakeDownload(make_prices(["A", "B", "C"], **PERIOD))
+    store = PriceStore(tmp_path, tickers=["A", "B"], fetch=download)
+    store.update("2019-01-01", "2019-03-01")
+    store.update("2019-01-01", "2019-03-01")
+    assert download.calls == [(("A", "B"), "2019-01-01", "2019-03-01")]
+
+    store.restrict(["A", "B", "C"]).update("2018-12-01", "2019-04-01")
+    assert download.calls[1:] == [
+        (("A", "B"), "2018-12-01", "2019-01-01"),
+        (("C",), "2018-12-01", "2019-04-01"),
+        (("A", "B"), "2019-03-01", "2019-04-01"),
+    ]
+    dates, prices, tickers = store.restrict(["A", "B", "C"]).window(
+        datetime(2018, 12, 1), datetime(2019, 4, 1)
+    )
+    assert list(tickers) == ["A", "B", "C"]
+    assert not np.isnan(prices).any()
+
+
+def test_offline_store_reads_existing_directory(tmp_path, make_prices):
+    download = FakeDownload(make_prices(["A", "B"], **PERIOD))
+    PriceStore(tmp_path, tickers=["A", "B"], fetch=download).update(
+        "2019-01-01", "2019-03-01"
+    )
+
+    def unreachable(*args):
+        raise AssertionError("offline store must not download")
+
+    store = PriceStore(tmp_path, tickers=["A", "B"], offline=True, fetch=unreachable)
+    store.update("2018-01-01", "2019-06-01")
+    dates, prices, _ = store.window(datetime(2019, 1, 1), datetime(2019, 2, 1))
+    assert len(dates) == len(pd.bdate_range("2019-01-01", "2019-01-31"))
+    # The window is a view on the memory map, not a copy
+    assert isinstance(prices.base, np.memmap) or isinstance(prices, np.memmap)
+
+
+def test_information_matches_first_two_moments(tmp_path, make_prices):
+    data = make_prices(["A", "B", "C"], **PERIOD)
+    # Missing prices inside the window for one ticker
+    data = data.drop(data[data["ticker"] == "B"].index[200:205])
+    store = PriceStore(tmp_path, tickers=["A", "B", "C"], fetch=FakeDownload(data))
+    store.update("2018-06-01", "2019-09-01")
+
+    kwargs = dict(
+        s=timedelta(days=120), time_column="Date", adj_close_column="Adj Close"
+    )
+    reference = FirstTwoMoments(data_module=DataModule(data.copy()), **kwargs)
+    fast = CustomFirstTwoMoments(
+        data_module=DataModule(None), price_store=store, **kwargs
+    )
+    for t in pd.date_range("2019-01-01", "2019-08-01", freq="MS"):
+        expected = reference.compute_information(t)
+        result = fast.compute_information(t)
+        assert list(result["companies"]) == list(expected["companies"])
+        np.testing.assert_allclose(
+            result["expected_return"], expected["expected_return"], rtol=1e-12
+        )
+        np.testing.assert_allclose(
+            result["covariance_matrix"], expected["covariance_matrix"], rtol=1e-12
+        )
+        assert fast.get_prices(t) == reference.get_prices(t)
+
+
+def test_backtest_on_price_store_matches_downloaded_data(workdir, make_prices):
+    data = make_prices(**PERIOD)
+    kwargs = dict(
+        initial_date=datetime(2019, 1, 1),
+        final_date=datetime(2019, 8, 1),
+        information_class=CustomFirstTwoMoments,
+        verbose=False,
+    )
+    reference = CustomBacktest(data=data, **kwargs)
+    reference.run_backtest()
+    stored = CustomBacktest(
+        price_store=PriceStore(workdir / "prices", fetch=FakeDownload(data)),
+        **kwargs,
+    )
+    stored.run_backtest()
+    pdt.assert_frame_equal(
+        stored.broker.get_transaction_log(),
+        reference.broker.get_transaction_log(),
+        check_exact=False,
+        rtol=1e-12,
+    )
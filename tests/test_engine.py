@@ -0,0 +1,63 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from python_project_raphael_corchia.engine import (
+    CustomBacktest,
+    CustomFirstTwoMoments,
+)
+from python_project_raphael_corchia.tracing import Tracer
+
+
+def moments(T=20, n=10, seed=0):
+    rng = np.random.default_rng(seed)
+    mu = rng.normal(1e-3, 1e-3, (T, n))
+    A = rng.normal(0, 0.02, (T, n, n))
+    return mu, A @ A.transpose(0, 2, 1) + 1e-4 * np.eye(n)
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_infeasible_bounds_fall_back_to_equal_weights(max_workers):
+    # Ten tickers capped at 5% cannot be fully invested
+    tracer = Tracer()
+    info = CustomFirstTwoMoments(
+        bounds=[(0.0, 0.05)], min_parallel_dates=4, tracer=tracer
+    )
+    mu, Sigma = moments()
+    dates = list(range(len(mu)))
+    portfolios = info.compute_portfolios(dates, mu, Sigma, max_workers=max_workers)
+    assert all(portfolios[t] == {k: 0.1 for k in range(10)} for t in dates)
+    assert tracer.counters["portfolio.equal_weight_fallbacks"] == len(dates)
+    assert tracer.counters["solver.batch_kkt"] == 0
+
+
+def test_batch_kkt_counts_closed_form_solves_only():
+    tracer = Tracer()
+    info = CustomFirstTwoMoments(bounds=[(0.0, 0.3)], tracer=tracer)
+    mu, Sigma = moments()
+    info.compute_portfolios(list(range(len(mu))), mu, Sigma, max_workers=1)
+    counters = tracer.counters
+    iterative = sum(n for k, n in counters.items() if k.startswith("solver.method"))
+    assert iterative > 0
+    assert counters["solver.batch_kkt"] + iterative == len(mu)
+
+
+def test_batch_backtest_with_infeasible_bounds(workdir, make_prices):
+    kwargs = dict(
+        initial_date=datetime(2019, 1, 1),
+        final_date=datetime(2019, 5, 1),
+        information_class=CustomFirstTwoMoments,
+        information_kwargs={"bounds": [(0.0, 0.05)]},
+        data=make_prices(start="2018-06-01", end="2019-05-01"),
+        store_results=False,
+        verbose=False,
+    )
+    serial = CustomBacktest(**kwargs)
+    serial.run_backtest()
+    batch = CustomBacktest(batch=True, max_workers=1, **kwargs)
+    batch.run_backtest()
+    assert len(batch.broker.transactions) > 0
+    assert batch.broker.get_cash_balance() == pytest.approx(
+        serial.broker.get_cash_balance()
+    )
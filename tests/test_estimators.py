@@ -0,0 +1,173 @@
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+from pybacktestchain.data_module import DataModule
+
+from python_project_raphael_corchia.engine import CustomFirstTwoMoments
+from python_project_raphael_corchia.estimators import (
+    EWMACovariance,
+    FactorCovariance,
+    LedoitWolfCovariance,
+    RollingCovariance,
+    SampleCovariance,
+    StatisticalFactorCovariance,
+    make_estimator,
+)
+
+
+def sliding_windows(n=5, length=300, window=60, step=3, seed=0):
+    # Dates and price rows of windows moving forward by `step` rows
+    rng = np.random.default_rng(seed)
+    prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, (length, n)), axis=0))
+    dates = np.arange(length)
+    for start in range(0, length - window, step):
+        yield dates[start : start + window], prices[start : start + window]
+
+
+def test_rolling_covariance_matches_sample():
+    rolling, sample = RollingCovariance(), SampleCovariance()
+    companies = list("ABCDE")
+    for dates, rows in sliding_windows():
+        np.testing.assert_allclose(
+            rolling.covariance(dates, rows, companies),
+            sample.covariance(dates, rows, companies),
+            rtol=1e-9,
+        )
+
+
+def test_ewma_covariance_matches_weighted_covariance():
+    ewma = EWMACovariance(halflife=20)
+    for dates, rows in sliding_windows(step=7):
+        weights = 0.5 ** (np.arange(len(rows) - 1, -1, -1) / 20)
+        np.testing.assert_allclose(
+            ewma.covariance(dates, rows, list("ABCDE")),
+            np.cov(rows, rowvar=False, aweights=weights),
+            rtol=1e-9,
+        )
+
+
+def test_rolling_state_is_rebuilt_when_companies_change():
+    rolling = RollingCovariance()
+    windows = list(sliding_windows())
+    rolling.covariance(*windows[0], list("ABCDE"))
+    dates, rows = windows[1]
+    np.testing.assert_allclose(
+        rolling.covariance(dates, rows[:, :4], list("ABCD")),
+        np.cov(rows[:, :4], rowvar=False),
+        rtol=1e-9,
+    )
+
+
+def test_ledoit_wolf_shrinks_towards_identity():
+    rng = np.random.default_rng(1)
+    # Few observations for many assets: the sample covariance is singular
+    rows = rng.normal(size=(20, 30))
+    dates = np.arange(20)
+    sample = np.cov(rows, rowvar=False)
+    shrunk = LedoitWolfCovariance().covariance(dates, rows, list(range(30)))
+    target = np.trace(sample) / 30 * np.eye(30)
+    # A convex combination of the sample covariance and the target
+    off_diagonal = ~np.eye(30, dtype=bool)
+    intensity = 1 - shrunk[off_diagonal] / sample[off_diagonal]
+    assert np.allclose(intensity, intensity[0])
+    assert 0 < intensity[0] <= 1
+    np.testing.assert_allclose(
+        shrunk, intensity[0] * target + (1 - intensity[0]) * sample, atol=1e-12
+    )
+    assert np.linalg.eigvalsh(shrunk).min() > 0
+
+
+def random_factor_model(n=40, k=3, seed=0):
+    rng = np.random.default_rng(seed)
+    F = np.cov(rng.normal(0, 1, (50, k)), rowvar=False)
+    return FactorCovariance(rng.normal(0, 1, (n, k)), F, rng.uniform(0.5, 2, n))
+
+
+def test_factor_covariance_matches_dense_matrix():
+    model = random_factor_model()
+    dense = model.dense()
+    x = np.random.default_rng(1).normal(0, 1, (40, 2))
+    np.testing.assert_allclose(model.dot(x[:, 0]), dense @ x[:, 0], rtol=1e-12)
+    np.testing.assert_allclose(model.dot(x), dense @ x, rtol=1e-12)
+    np.testing.assert_allclose(model.diagonal(), np.diag(dense), rtol=1e-12)
+    assert model.largest_eigenvalue() >= np.linalg.eigvalsh(dense).max() - 1e-9
+    free = np.arange(0, 40, 3)
+    np.testing.assert_allclose(
+        model.solve(x[free], free),
+        np.linalg.solve(dense[np.ix_(free, free)], x[free]),
+        rtol=1e-9,
+    )
+
+
+def test_statistical_factor_model_recovers_sample_covariance():
+    # With as many factors as tickers the model is the sample covariance
+    for dates, rows in sliding_windows(step=60):
+        model = StatisticalFactorCovariance(n_factors=5, min_specific=1e-12)
+        result = model.covariance(dates, rows, list("ABCDE"))
+        expected = SampleCovariance().covariance(dates, rows, list("ABCDE"))
+        np.testing.assert_allclose(result.dense(), expected, rtol=1e-8, atol=1e-10)
+
+
+def test_statistical_factor_model_keeps_specific_variance():
+    _, rows = next(sliding_windows(n=30))
+    model = StatisticalFactorCovariance(n_factors=2).covariance(None, rows, None)
+    assert model.loadings.shape == (30, 2)
+    assert (model.specific > 0).all()
+    # Total variance of each ticker is preserved
+    np.testing.assert_allclose(model.diagonal(), rows.var(axis=0, ddof=1))
+
+
+def test_unknown_estimator_name():
+    assert isinstance(make_estimator("ewma"), EWMACovariance)
+    with pytest.raises(ValueError):
+        make_estimator("garch")
+
+
+def test_information_set_with_rolling_estimator(make_prices):
+    data = make_prices(("A", "B", "C"), "2019-01-01", "2019-12-31", seed=2, drift=0)
+    kwargs = dict(
+        data_module=DataModule(data),
+        s=timedelta(days=90),
+        adj_close_column="Adj Close",
+    )
+    sample = CustomFirstTwoMoments(**kwargs)
+    rolling = CustomFirstTwoMoments(estimator="rolling", **kwargs)
+    for t in pd.date_range("2019-04-01", "2019-12-31", freq="W"):
+        expected = sample.compute_information(t)
+        result = rolling.compute_information(t)
+        assert list(result["companies"]) == list(expected["companies"])
+        np.testing.assert_allclose(
+            result["expected_return"], expected["expected_return"], rtol=1e-10
+        )
+        np.testing.assert_allclose(
+            result["covariance_matrix"], expected["covariance_matrix"], rtol=1e-9
+        )
+
+
+@pytest.mark.parametrize("batch", [False, True])
+def test_backtest_with_factor_model(tmp_path, monkeypatch, make_prices, batch):
+    from datetime import datetime
+
+    from python_project_raphael_corchia.engine import CustomBacktest
+
+    monkeypatch.chdir(tmp_path)
+    tickers = [f"T{i:02d}" for i in range(25)]
+    data = make_prices(tickers, "2018-06-01", "2019-07-01", seed=4, drift=0)
+    backtest = CustomBacktest(
+        initial_date=datetime(2019, 1, 1),
+        final_date=datetime(2019, 7, 1),
+        information_class=CustomFirstTwoMoments,
+        information_kwargs={"estimator": "factor", "bounds": [(0.0, 0.1)]},
+        universe=tickers,
+        data=data,
+        batch=batch,
+        store_results=False,
+        verbose=False,
+    )
+    backtest.run_backtest()
+    info = backtest.information.compute_information(datetime(2019, 3, 1))
+    assert isinstance(info["covariance_matrix"], FactorCovariance)
+    log = backtest.broker.get_transaction_log()
+    assert len(log) > 0 and set(log["Ticker"]) <= set(tickers)
@@ -0,0 +1,83 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from python_project_raphael_corchia.blockchain import ChainStore
+from python_project_raphael_corchia.engine import (
+    CustomBacktest,
+    CustomFirstTwoMoments,
+)
+from python_project_raphael_corchia.jobs import JobRegistry
+
+
+def wait(job, timeout=10):
+    start = time.time()
+    while not job.finished and time.time() - start < timeout:
+        time.sleep(0.01)
+    return job
+
+
+def test_progress_is_streamed_while_the_job_runs():
+    registry = JobRegistry(max_workers=2)
+    release = threading.Event()
+
+    def run(job):
+        for day in range(3):
+            job.report(day=day)
+        release.wait(5)
+        return "result"
+
+    job = registry.submit("key", run)
+    # Same configuration while running: the same job is returned
+    assert registry.submit("key", run) is job
+    while len(job.history) < 3:
+        job.poll()
+    assert job.progress == {"day": 2}
+    assert not job.finished
+    release.set()
+    assert wait(job).status == "done"
+    assert job.result == "result"
+    registry.shutdown()
+
+
+def test_failed_job_keeps_the_error():
+    registry = JobRegistry(max_workers=1)
+
+    def run(job):
+        raise ValueError("no prices")
+
+    job = wait(registry.submit("key", run))
+    assert job.status == "failed"
+    assert "no prices" in job.error
+    # A finished job is not reused
+    assert registry.submit("key", lambda job: None) is not job
+    registry.shutdown()
+
+
+def test_concurrent_backtests_keep_every_block(tmp_path, monkeypatch, make_prices):
+    monkeypatch.chdir(tmp_path)
+    data = make_prices(start="2019-01-01", end="2019-04-01", drift=0)
+
+    def run(name):
+        backtest = CustomBacktest(
+            initial_date=datetime(2019, 1, 1),
+            final_date=datetime(2019, 4, 1),
+            information_class=CustomFirstTwoMoments,
+            data=data,
+            backtest_name=name,
+            name_blockchain="concurrent",
+            verbose=False,
+        )
+        backtest.run_backtest()
+
+    names = [f"run{i}" for i in range(4)]
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        list(pool.map(run, names))
+    # One chain per run in the store of the chain name
+    store = ChainStore("blockchain/concurrent")
+    assert sorted(store.namespaces()) == names
+    for name in names:
+        chain = store.load(name)
+        assert [block.name_backtest for block in chain.chain[1:]] == [name]
+        assert chain.is_valid()
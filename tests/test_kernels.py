@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+
+from python_project_raphael_corchia import kernels, solver
+from python_project_raphael_corchia.solver import (
+    _projected_gradient,
+    mean_variance_gradient,
+    mean_variance_objective,
+    mean_variance_objective_and_gradient,
+    project_budget_box,
+)
+
+pytestmark = pytest.mark.skipif(kernels.njit is None, reason="numba not installed")
+
+
+def make_problem(n, T=250, seed=0):
+    rng = np.random.default_rng(seed)
+    prices = 100 * np.exp(np.cumsum(rng.normal(5e-4, 0.02, (T, n)), axis=0))
+    mu = (np.diff(prices, axis=0) / prices[:-1]).mean(axis=0)
+    return mu, np.cov(prices, rowvar=False)
+
+
+@pytest.mark.parametrize("enabled", [True, False])
+def test_objective_and_gradient_match_separate_functions(monkeypatch, enabled):
+    monkeypatch.setattr(kernels, "ENABLED", enabled)
+    mu, Sigma = make_problem(12)
+    x = np.random.default_rng(1).dirichlet(np.ones(12))
+    value, grad = mean_variance_objective_and_gradient(x, mu, Sigma, 2.5)
+    assert value == pytest.approx(mean_variance_objective(x, mu, Sigma, 2.5), 1e-12)
+    np.testing.assert_allclose(
+        grad, mean_variance_gradient(x, mu, Sigma, 2.5), rtol=1e-12
+    )
+
+
+@pytest.mark.parametrize(
+    "lower, upper",
+    [(0.0, 1.0), (-np.inf, np.inf), (-0.2, 0.3)],
+)
+def test_projection_matches_numpy(lower, upper):
+    rng = np.random.default_rng(2)
+    for _ in range(20):
+        y = rng.normal(0, 1, 30)
+        lo, hi = np.full(30, lower), np.full(30, upper)
+        np.testing.assert_allclose(
+            kernels.project_budget_box(y, lo, hi),
+            project_budget_box(y, lo, hi),
+            atol=1e-10,
+        )
+
+
+def test_projected_gradient_matches_numpy(monkeypatch):
+    mu, Sigma = make_problem(40)
+    lower, upper = np.zeros(40), np.full(40, 0.1)
+    results = {}
+    for enabled in (True, False):
+        monkeypatch.setattr(kernels, "ENABLED", enabled)
+        results[enabled] = _projected_gradient(
+            mu, Sigma, 1.0, lower, upper, None, 1e-10, 2000
+        )
+    (x_jit, ok_jit, it_jit), (x_np, ok_np, it_np) = results[True], results[False]
+    # Same iterates: the same number of steps lands on the same weights
+    assert (ok_jit, it_jit) == (ok_np, it_np)
+    np.testing.assert_allclose(x_jit, x_np, atol=1e-9)
+    assert x_jit.sum() == pytest.approx(1.0)
+    assert np.all((x_jit >= 0) & (x_jit <= 0.1 + 1e-12))
+
+
+def test_box_qp_falls_back_to_compiled_projected_gradient(monkeypatch):
+    # Active-set methods disabled, the result must still match the optimum
+    mu, Sigma = make_problem(10)
+    monkeypatch.setattr(solver, "_active_set", lambda *args: (None, 1))
+    monkeypatch.setattr(solver, "_primal_active_set", lambda *args: (None, 1))
+    res = solver.solve_box_qp(mu, Sigma, 1.0, np.zeros(10), np.full(10, 0.3))
+    monkeypatch.setattr(kernels, "ENABLED", False)
+    expected = solver.solve_box_qp(mu, Sigma, 1.0, np.zeros(10), np.full(10, 0.3))
+    assert res.method == "projected_gradient" and res.success
+    np.testing.assert_allclose(res.x, expected.x, atol=1e-8)
+
+
+def test_stop_loss_triggers_match_formula():
+    rng = np.random.default_rng(3)
+    entry = rng.uniform(50, 150, 500)
+    current = entry * rng.uniform(0.7, 1.2, 500)
+    current[::17] = np.nan
+    expected = (current - entry) / entry < -0.1
+    triggered = kernels.stop_loss_triggers(entry, current, 0.1)
+    np.testing.assert_array_equal(triggered, expected)
+    assert not triggered[::17].any()
@@ -0,0 +1,101 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from python_project_raphael_corchia.engine import (
+    CustomBacktest,
+    CustomFirstTwoMoments,
+)
+from python_project_raphael_corchia.metrics import (
+    drawdown,
+    forward_fill,
+    performance,
+    rolling_sharpe,
+)
+
+
+def test_positions_and_nav_of_a_small_log():
+    dates = pd.bdate_range("2020-01-06", periods=4).to_numpy()
+    prices = np.array(
+        [[10.0, np.nan], [11.0, 20.0], [np.nan, 22.0], [12.0, 21.0]],
+    )
+    log = pd.DataFrame(
+        {
+            "Date": [dates[0], dates[1], dates[2], dates[2]],
+            "Action": ["BUY", "BUY", "SELL", "SELL"],
+            "Ticker": ["A", "B", "A", "B"],
+            "Quantity": [10, 5, 4, 5],
+            "Price": [10.0, 20.0, 11.0, 22.0],
+        }
+    )
+    perf = performance(log, dates, prices, np.array(["A", "B"]), initial_cash=1000)
+    np.testing.assert_array_equal(perf.holdings, [[10, 0], [10, 5], [6, 0], [6, 0]])
+    np.testing.assert_allclose(perf.cash, [900, 800, 954, 954])
+    # The missing price of A on the third date is the previous one
+    np.testing.assert_allclose(perf.nav, [1000, 1010, 1020, 1026])
+    np.testing.assert_allclose(perf.traded, [100, 100, 154, 0])
+    np.testing.assert_allclose(perf.pnl[-1], [16, 10])
+    assert perf.pnl_by_ticker()["Ticker"].tolist() == ["A", "B"]
+    np.testing.assert_allclose(perf.pnl.sum(axis=1), perf.nav - 1000)
+
+
+def test_forward_fill():
+    prices = np.array([[np.nan, 1.0], [2.0, np.nan], [np.nan, np.nan], [3.0, 4.0]])
+    np.testing.assert_array_equal(
+        forward_fill(prices), [[np.nan, 1], [2, 1], [2, 1], [3, 4]]
+    )
+
+
+def test_rolling_sharpe_matches_pandas():
+    returns = np.random.default_rng(0).normal(5e-4, 0.01, 500)
+    rolling = pd.Series(returns).rolling(63)
+    expected = rolling.mean() / rolling.std() * np.sqrt(252)
+    np.testing.assert_allclose(rolling_sharpe(returns, 63), expected, rtol=1e-8)
+
+
+def test_drawdown():
+    np.testing.assert_allclose(
+        drawdown([100, 120, 90, 130, 117]), [0, 0, -0.25, 0, -0.1]
+    )
+
+
+@pytest.mark.parametrize("initial_cash", [1_000_000, 100_000])
+def test_backtest_performance_matches_the_broker(
+    tmp_path, monkeypatch, make_prices, initial_cash
+):
+    monkeypatch.chdir(tmp_path)
+    data = make_prices(start="2019-01-01", end="2019-12-31", drift=0)
+    # Saturday, the last valued date is the Friday before as for get_prices
+    final_date = datetime(2019, 11, 30)
+    backtest = CustomBacktest(
+        initial_date=datetime(2019, 1, 1),
+        final_date=final_date,
+        information_class=CustomFirstTwoMoments,
+        data=data,
+        initial_cash=initial_cash,
+        store_results=False,
+        verbose=False,
+    )
+    backtest.run_backtest()
+    perf = backtest.performance()
+    assert perf.initial_cash == initial_cash
+    broker = backtest.broker
+    assert perf.nav[-1] == pytest.approx(
+        broker.get_portfolio_value(backtest.information.get_prices(final_date))
+    )
+    assert perf.cash[-1] == pytest.approx(broker.get_cash_balance())
+
+    # Cash after the last transaction valued on each price date, as in the log
+    # (the stop loss also trades on week-ends, valued on the Friday)
+    log = broker.get_transaction_log()
+    rows = np.searchsorted(perf.dates, log["Date"].to_numpy(), side="right") - 1
+    last = np.r_[rows[1:] != rows[:-1], True]
+    np.testing.assert_allclose(perf.cash[rows[last]], log["Cash"][last])
+
+    summary = perf.summary()
+    assert summary["max_drawdown"] <= 0
+    assert summary["final_value"] == perf.nav[-1]
+    assert summary["total_return"] == pytest.approx(perf.nav[-1] / initial_cash - 1)
+    assert set(perf.daily().columns) >= {"NAV", "Drawdown", "Rolling_Sharpe"}
@@ -0,0 +1,65 @@
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from python_project_raphael_corchia.engine import (
+    CustomBacktest,
+    CustomFirstTwoMoments,
+)
+from python_project_raphael_corchia.profiling import (
+    PROFILE_ENV,
+    StageProfiler,
+    profiler_from_env,
+)
+
+
+def test_stages_are_accumulated(tmp_path):
+    profiler = StageProfiler(tmp_path)
+    for _ in range(3):
+        with profiler.stage("allocate"):
+            data = np.ones(1_000_000)
+    with profiler.stage("sum"):
+        data.sum()
+    report = profiler.report()
+    assert report["allocate"]["calls"] == 3
+    # At least the 8MB array allocated in the stage
+    assert report["allocate"]["peak_mb"] >= 7.5
+    assert report["sum"]["seconds"] > 0
+
+    path = profiler.write("run")
+    with open(path) as f:
+        assert json.load(f)["allocate"]["calls"] == 3
+    assert os.path.exists(tmp_path / "run.allocate.prof")
+
+
+def test_profiler_is_opt_in(monkeypatch):
+    monkeypatch.delenv(PROFILE_ENV, raising=False)
+    assert profiler_from_env() is None
+    monkeypatch.setenv(PROFILE_ENV, "profiles")
+    assert profiler_from_env().directory == "profiles"
+
+
+def test_backtest_writes_its_profile(tmp_path, monkeypatch, make_prices):
+    monkeypatch.chdir(tmp_path)
+    data = make_prices(start="2019-01-01", end="2019-04-01", drift=0)
+    backtest = CustomBacktest(
+        initial_date=datetime(2019, 1, 1),
+        final_date=datetime(2019, 4, 1),
+        information_class=CustomFirstTwoMoments,
+        data=data,
+        backtest_name="profiled",
+        store_results=False,
+        profiler=StageProfiler("profiles", memory=False),
+        verbose=False,
+    )
+    backtest.run_backtest()
+    with open(tmp_path / "profiles" / "profiled.json") as f:
+        report = json.load(f)
+    assert {"load_data", "information", "optimization", "execution"} <= set(report)
+    # The stop loss runs every day, the information of each date once per use
+    assert report["stop_loss"]["calls"] == len(
+        pd.date_range("2019-01-01", "2019-04-01")
+    )
@@ -1 +1,90 @@
-from python_project import python_project
+import json
+import subprocess
+import sys
+
+import pandas as pd
+import pytest
+
+from python_project_raphael_corchia import cli, python_project
+from python_project_raphael_corchia.blockchain import ChainStore
+from python_project_raphael_corchia.data_store import PriceStore
+from python_project_raphael_corchia.engine import CustomBacktest
+
+
+def test_engine_import_does_not_load_the_interface():
+    code = (
+        "import sys\n"
+        "from python_project_raphael_corchia.python_project import CustomBacktest\n"
+        "print(sorted(m for m in ('streamlit', 'plotly') if m in sys.modules))\n"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert out.stdout.strip() == "[]"
+
+
+def test_interface_names_are_still_exported():
+    from python_project_raphael_corchia import ui
+
+    assert python_project.main is ui.main
+    assert python_project.CustomBacktest is CustomBacktest
+
+
+def test_cli_run_writes_parquet_and_json(tmp_path, monkeypatch, make_prices):
+    monkeypatch.chdir(tmp_path)
+    data = make_prices(("AAPL", "MSFT", "NVDA"), "2019-01-01", "2019-05-01", drift=0)
+    # Pre-populated store, the run itself stays offline
+    store = PriceStore("prices", tickers=["AAPL", "MSFT", "NVDA"])
+    store.fetch = lambda tickers, start, end: data
+    store.update("2019-01-01", "2019-05-01")
+    config = {
+        "initial_date": "2019-01-01",
+        "final_date": "2019-05-01",
+        "universe": ["AAPL", "MSFT", "NVDA"],
+        "gamma": 2.0,
+        "bounds": [[0.0, 0.5]],
+        "estimator": "rolling",
+        "price_store": "prices",
+        "offline": True,
+        "store_results": False,
+        "verbose": False,
+    }
+    with open("config.json", "w") as f:
+        json.dump(config, f)
+
+    cli.main(["run", "--config", "config.json", "--output", "out", "--quiet"])
+    log = pd.read_parquet(tmp_path / "out" / "transactions.parquet")
+    with open(tmp_path / "out" / "summary.json") as f:
+        summary = json.load(f)
+    assert len(log) == summary["n_trades"] > 0
+    assert set(log["Ticker"]) <= {"AAPL", "MSFT", "NVDA"}
+    assert summary["config"] == config
+
+
+@pytest.mark.parametrize(
+    "names", [{"rebalance_flag": "EndOfWeek"}, {"rebalance_flag": None}]
+)
+def test_cli_rejects_unknown_class_names(tmp_path, monkeypatch, capsys, names):
+    monkeypatch.chdir(tmp_path)
+    config = {"initial_date": "2019-01-01", "final_date": "2019-05-01", **names}
+    with pytest.raises(ValueError, match="EndOfMonth"):
+        cli.backtest_from_config(config)
+    with open("config.json", "w") as f:
+        json.dump(config, f)
+    with pytest.raises(SystemExit) as exit_info:
+        cli.main(["run", "--config", "config.json", "--output", "out"])
+    assert exit_info.value.code == 2
+    error = capsys.readouterr().err
+    assert "Unknown rebalance_flag" in error and '"EndOfMonth"' in error
+    assert not (tmp_path / "out").exists()
+
+
+def test_cli_compact_keeps_runs(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    store = ChainStore("blockchain/backtest")
+    for name in ("a", "b", "c"):
+        store.append(name, name, f"log of {name}")
+    cli.main(["compact", "--keep", "a", "c"])
+    report = json.loads(capsys.readouterr().out)
+    assert report["blocks"] == 4
+    assert ChainStore("blockchain/backtest").namespaces() == ["a", "c"]
@@ -0,0 +1,48 @@
+import logging
+
+import numpy as np
+import pandas as pd
+import pytest
+from pybacktestchain.broker import StopLoss
+
+from python_project_raphael_corchia import kernels
+from python_project_raphael_corchia.risk import ArrayStopLoss
+from python_project_raphael_corchia.transactions import TypedBroker
+
+
+def run(risk_model, seed=0):
+    # Random walk of 15 tickers, rebalanced weekly and checked every day
+    rng = np.random.default_rng(seed)
+    broker = TypedBroker(1e6, verbose=False)
+    tickers = [f"T{i:02d}" for i in range(15)]
+    level = np.full(len(tickers), 100.0)
+    for day, t in enumerate(pd.bdate_range("2021-01-01", periods=120)):
+        level *= np.exp(rng.normal(0, 0.04, len(tickers)))
+        prices = dict(zip(tickers, level))
+        risk_model.trigger_stop_loss(t, {}, prices, broker)
+        if day % 5 == 0:
+            weights = rng.dirichlet(np.ones(len(tickers)))
+            broker.execute_portfolio(dict(zip(tickers, weights)), prices, t)
+    return broker
+
+
+@pytest.mark.parametrize("enabled", [True, False])
+def test_array_stop_loss_matches_upstream(monkeypatch, enabled):
+    monkeypatch.setattr(kernels, "ENABLED", enabled and kernels.njit is not None)
+    expected = run(StopLoss(threshold=0.1))
+    broker = run(ArrayStopLoss(threshold=0.1))
+    log, expected_log = broker.get_transaction_log(), expected.get_transaction_log()
+    assert (log["Action"] == "SELL").sum() > 0
+    pd.testing.assert_frame_equal(log, expected_log)
+    assert broker.cash == expected.cash
+
+
+def test_missing_price_is_skipped(caplog):
+    broker = TypedBroker(1e4, verbose=False)
+    t = pd.Timestamp("2021-01-04")
+    broker.buy("A", 10, 100.0, t)
+    broker.buy("B", 10, 100.0, t)
+    with caplog.at_level(logging.WARNING):
+        ArrayStopLoss(threshold=0.1).trigger_stop_loss(t, {}, {"B": 50.0}, broker)
+    assert "Price for A not available" in caplog.text
+    assert list(broker.positions) == ["A"]
@@ -0,0 +1,162 @@
+import numpy as np
+import pytest
+from scipy.optimize import minimize
+
+from python_project_raphael_corchia.estimators import StatisticalFactorCovariance
+from python_project_raphael_corchia.solver import (
+    expand_bounds,
+    mean_variance_gradient,
+    mean_variance_objective,
+    project_budget_box,
+    solve_box_qp,
+    solve_budget_kkt,
+    solve_budget_kkt_batch,
+)
+
+
+def make_problem(n, T, seed=0):
+    # Covariance of simulated prices, as computed by FirstTwoMoments
+    rng = np.random.default_rng(seed)
+    prices = 100 * np.exp(np.cumsum(rng.normal(5e-4, 0.02, (T, n)), axis=0))
+    mu = (np.diff(prices, axis=0) / prices[:-1]).mean(axis=0)
+    return mu, np.cov(prices, rowvar=False)
+
+
+def scipy_reference(mu, Sigma, gamma, bounds):
+    n = len(mu)
+    res = minimize(
+        mean_variance_objective,
+        np.ones(n) / n,
+        args=(mu, Sigma, gamma),
+        jac=mean_variance_gradient,
+        constraints=[{"type": "eq", "fun": lambda x: np.sum(x) - 1}],
+        bounds=bounds,
+        options={"ftol": 1e-15, "maxiter": 1000},
+    )
+    assert res.success
+    return res.x
+
+
+def test_gradient_matches_finite_differences():
+    mu, Sigma = make_problem(5, 100)
+    x = np.linspace(0.1, 0.3, 5)
+    eps = 1e-6
+    numerical = [
+        (
+            mean_variance_objective(x + eps * e, mu, Sigma, 2.0)
+            - mean_variance_objective(x - eps * e, mu, Sigma, 2.0)
+        )
+        / (2 * eps)
+        for e in np.eye(5)
+    ]
+    np.testing.assert_allclose(
+        mean_variance_gradient(x, mu, Sigma, 2.0), numerical, rtol=1e-5
+    )
+
+
+def test_budget_kkt_matches_linear_system():
+    mu, Sigma = make_problem(8, 200)
+    x, nu = solve_budget_kkt(mu, Sigma, 3.0)
+    kkt = np.block([[3.0 * Sigma, np.ones((8, 1))], [np.ones((1, 8)), 0.0]])
+    expected = np.linalg.solve(kkt, np.append(mu, 1.0))
+    np.testing.assert_allclose(x, expected[:8], atol=1e-10)
+    assert x.sum() == pytest.approx(1.0)
+
+
+def test_budget_kkt_batch_matches_single_solves():
+    problems = [make_problem(6, 120, seed=s) for s in range(4)]
+    # The last problem is singular and needs the ridge
+    problems.append(make_problem(6, 4, seed=9))
+    weights = solve_budget_kkt_batch(
+        np.stack([mu for mu, _ in problems]),
+        np.stack([Sigma for _, Sigma in problems]),
+        2.0,
+    )
+    for x, (mu, Sigma) in zip(weights, problems):
+        np.testing.assert_allclose(
+            x, solve_budget_kkt(mu, Sigma, 2.0)[0], rtol=1e-5, atol=1e-8
+        )
+
+
+def test_expand_bounds_broadcasts_single_pair():
+    lower, upper = expand_bounds([(0.0, None)], 3)
+    np.testing.assert_array_equal(lower, [0.0, 0.0, 0.0])
+    np.testing.assert_array_equal(upper, [np.inf, np.inf, np.inf])
+    with pytest.raises(ValueError):
+        expand_bounds([(0.0, 1.0)] * 2, 3)
+
+
+def test_projection_is_feasible():
+    y = np.array([0.9, 0.8, -0.4, 0.1])
+    x = project_budget_box(y, np.zeros(4), np.full(4, 0.6))
+    assert x.sum() == pytest.approx(1.0)
+    assert x.min() >= 0.0 and x.max() <= 0.6
+
+
+@pytest.mark.parametrize("n", [10, 40])
+@pytest.mark.parametrize("bounds", [[(0.0, 1.0)], [(0.0, 0.15)], [(-0.2, 0.5)]])
+def test_box_qp_matches_scipy(n, bounds):
+    mu, Sigma = make_problem(n, 250, seed=n)
+    lower, upper = expand_bounds(bounds, n)
+    res = solve_box_qp(mu, Sigma, 1.0, lower, upper)
+    assert res.success
+    np.testing.assert_allclose(
+        res.x, scipy_reference(mu, Sigma, 1.0, bounds), atol=1e-6
+    )
+
+
+def test_warm_start_reaches_same_solution():
+    mu, Sigma = make_problem(60, 250, seed=1)
+    lower, upper = expand_bounds([(0.0, 1.0)], 60)
+    cold = solve_box_qp(mu, Sigma, 1.0, lower, upper)
+    # Slightly different problem, as on the next rebalance date
+    mu_next = mu * 1.05
+    warm = solve_box_qp(mu_next, Sigma, 1.0, lower, upper, x0=cold.x)
+    reference = solve_box_qp(mu_next, Sigma, 1.0, lower, upper)
+    assert warm.success
+    np.testing.assert_allclose(warm.x, reference.x, atol=1e-8)
+
+
+def test_singular_covariance_is_solved():
+    # More assets than observations
+    mu, Sigma = make_problem(80, 40, seed=2)
+    lower, upper = expand_bounds([(0.0, 1.0)], 80)
+    res = solve_box_qp(mu, Sigma, 1.0, lower, upper)
+    assert res.success
+    assert res.x.sum() == pytest.approx(1.0)
+    reference = scipy_reference(mu, Sigma, 1.0, [(0.0, 1.0)])
+    assert (
+        mean_variance_objective(res.x, mu, Sigma, 1.0)
+        <= mean_variance_objective(reference, mu, Sigma, 1.0) + 1e-8
+    )
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_primal_active_set_keeps_the_budget(seed):
+    # Singular covariance of price levels, the bounds bind on many assets
+    mu, Sigma = make_problem(30, 12, seed=seed)
+    lower, upper = expand_bounds([(0.0, 0.1)], 30)
+    res = solve_box_qp(mu, Sigma, 1.0, lower, upper)
+    assert res.method == "primal_active_set"
+    assert abs(res.x.sum() - 1) <= 1e-13
+    assert np.all(res.x >= lower) and np.all(res.x <= upper)
+
+
+@pytest.mark.parametrize("bounds", [[(0.0, 1.0)], [(0.0, 0.05)]])
+def test_factor_covariance_matches_dense_solve(bounds):
+    rng = np.random.default_rng(3)
+    prices = 100 * np.exp(np.cumsum(rng.normal(5e-4, 0.02, (120, 200)), axis=0))
+    mu = (np.diff(prices, axis=0) / prices[:-1]).mean(axis=0)
+    model = StatisticalFactorCovariance(n_factors=5).covariance(None, prices, None)
+    lower, upper = expand_bounds(bounds, 200)
+    res = solve_box_qp(mu, model, 1.0, lower, upper)
+    expected = solve_box_qp(mu, model.dense(), 1.0, lower, upper)
+    assert res.success
+    np.testing.assert_allclose(res.x, expected.x, atol=1e-9)
+
+
+def test_non_finite_inputs_raise():
+    mu, Sigma = make_problem(4, 50)
+    mu[0] = np.nan
+    with pytest.raises(ValueError):
+        solve_box_qp(mu, Sigma, 1.0)
@@ -0,0 +1,78 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from python_project_raphael_corchia.sweep import (
+    SharedMarketData,
+    parameter_grid,
+    run_sweep,
+)
+
+
+def test_parameter_grid_is_cartesian_product():
+    periods = [
+        (datetime(2019, 1, 1), datetime(2020, 1, 1)),
+        (datetime(2020, 1, 1), datetime(2021, 1, 1)),
+    ]
+    grid = parameter_grid([0.5, 1.0, 2.0], [[(0.0, 1.0)], [(0.0, 0.2)]], periods)
+    assert len(grid) == 12
+    assert {(c.gamma, c.bounds[0][1]) for c in grid} == {
+        (g, b) for g in (0.5, 1.0, 2.0) for b in (1.0, 0.2)
+    }
+
+
+def test_shared_market_data_round_trip(tmp_path):
+    dates = pd.bdate_range("2020-01-01", periods=5, tz="America/New_York")
+    df = pd.concat(
+        [
+            pd.DataFrame({"Date": dates, "Adj Close": np.arange(5.0), "ticker": "A"}),
+            # B has no price on the first date
+            pd.DataFrame(
+                {"Date": dates[1:], "Adj Close": np.arange(4.0) + 10, "ticker": "B"}
+            ),
+        ]
+    )
+    market = SharedMarketData.from_frame(df, tmp_path)
+    assert list(market.tickers) == ["A", "B"] and len(market.dates) == 5
+    dates, prices, _ = market.store().window(pd.Timestamp.min, pd.Timestamp.max)
+    assert prices.shape == (5, 2)
+    assert np.isnan(prices[0, 1]) and prices[1:, 1].tolist() == [10, 11, 12, 13]
+    assert pd.DatetimeIndex(dates).tz is None
+    # The workers read windows of the shared file, not copies
+    _, prices, tickers = market.store().window("2020-01-02", "2020-01-08")
+    assert list(tickers) == ["A", "B"] and prices.shape == (4, 2)
+    assert isinstance(prices.base, np.memmap) or isinstance(prices, np.memmap)
+
+
+def test_run_sweep_trades_the_given_universe(workdir, make_prices):
+    universe = ["XOM", "CVX", "JPM"]
+    data = make_prices(universe + ["AAPL"], "2019-01-01", "2019-07-01")
+    configs = parameter_grid(
+        [1.0, 4.0],
+        [[(0.0, 1.0)]],
+        [(datetime(2019, 2, 1), datetime(2019, 7, 1))],
+        initial_cash=100_000,
+    )
+    result = run_sweep(configs, universe=universe, data=data, max_workers=2)
+    assert result["gamma"].tolist() == [1.0, 4.0]
+    assert (result["n_trades"] > 0).all()
+    assert (result["total_return"] != 0).all()
+    # The final value is of the order of the cash, not of the default 1M
+    assert (result["final_value"] < 200_000).all()
+
+
+def test_failed_config_does_not_stop_the_sweep(workdir, make_prices):
+    universe = ["XOM", "CVX", "JPM"]
+    data = make_prices(universe, "2019-01-01", "2019-07-01")
+    period = [(datetime(2019, 2, 1), datetime(2019, 7, 1))]
+    configs = parameter_grid([1.0], [[(0.0, 1.0)]], period, initial_cash=100_000)
+    # Without cash the total return is undefined
+    configs += parameter_grid([2.0], [[(0.0, 1.0)]], period, initial_cash=0)
+    configs += parameter_grid([4.0], [[(0.0, 1.0)]], period, initial_cash=100_000)
+    result = run_sweep(configs, universe=universe, data=data, max_workers=2)
+    assert result["gamma"].tolist() == [1.0, 2.0, 4.0]
+    assert result["error"].isna().tolist() == [True, False, True]
+    assert result["error"][1].startswith("ZeroDivisionError")
+    assert result["n_trades"][[0, 2]].gt(0).all()
+    assert np.isnan(result["final_value"][1])
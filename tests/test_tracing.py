@@ -0,0 +1,64 @@
+import json
+from datetime import datetime
+
+from python_project_raphael_corchia.cache import ResultCache
+from python_project_raphael_corchia.engine import (
+    CustomBacktest,
+    CustomFirstTwoMoments,
+)
+from python_project_raphael_corchia.tracing import NULL_TRACER, Tracer, stages
+
+
+def test_counters_histograms_and_spans():
+    tracer = Tracer()
+    tracer.count("failures")
+    tracer.count("failures", 2)
+    for value in range(1, 101):
+        tracer.observe("iterations", value)
+    for _ in range(3):
+        with tracer.span("stage"):
+            pass
+    snapshot = json.loads(tracer.to_json())
+    assert snapshot["counters"] == {"failures": 3}
+    iterations = snapshot["histograms"]["iterations"]
+    assert iterations["count"] == 100 and iterations["max"] == 100
+    assert iterations["p50"] == 50.5
+    assert tracer.stages()["stage"]["calls"] == 3
+
+
+def test_null_tracer_records_nothing():
+    NULL_TRACER.count("failures")
+    NULL_TRACER.observe("iterations", 3)
+    with NULL_TRACER.span("stage"):
+        pass
+    assert NULL_TRACER.snapshot() == {"counters": {}, "histograms": {}}
+
+
+def test_backtest_trace_is_cached(tmp_path, monkeypatch, make_prices):
+    monkeypatch.chdir(tmp_path)
+    data = make_prices(start="2019-01-01", end="2019-06-01", drift=0)
+    tracer = Tracer()
+    backtest = CustomBacktest(
+        initial_date=datetime(2019, 1, 1),
+        final_date=datetime(2019, 6, 1),
+        information_class=CustomFirstTwoMoments,
+        data=data,
+        store_results=False,
+        tracer=tracer,
+        verbose=False,
+    )
+    backtest.run_backtest()
+    snapshot = tracer.snapshot()
+    assert {"load_data", "information", "solver", "execution"} <= set(stages(snapshot))
+    # Every optimization is either solved or replaced by equal weights
+    solved = sum(
+        n
+        for name, n in snapshot["counters"].items()
+        if name.startswith("solver.method")
+    )
+    fallbacks = snapshot["counters"].get("portfolio.equal_weight_fallbacks", 0)
+    assert solved + fallbacks >= stages(snapshot)["optimization"]["calls"]
+    assert snapshot["histograms"]["solver.iterations"]["count"] == solved
+
+    ResultCache("cache").put("key", "traced", backtest.broker.transaction_log, snapshot)
+    assert ResultCache("cache").get("key").trace == json.loads(json.dumps(snapshot))
@@ -0,0 +1,77 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+from pybacktestchain.broker import Broker
+
+from python_project_raphael_corchia.transactions import (
+    TRANSACTION_DTYPES,
+    TransactionBuffer,
+    TypedBroker,
+    typed_log,
+)
+
+
+def trade(broker, n=300, seed=0):
+    # Same random sequence of portfolios on any broker
+    rng = np.random.default_rng(seed)
+    tickers = [f"T{i:02d}" for i in range(20)]
+    for day, t in enumerate(pd.bdate_range("2020-01-01", periods=n)):
+        prices = dict(zip(tickers, 100 * np.exp(rng.normal(0, 0.1, len(tickers)))))
+        weights = rng.dirichlet(np.ones(len(tickers)))
+        broker.execute_portfolio(dict(zip(tickers, weights)), prices, t)
+
+
+def test_typed_broker_matches_upstream_broker():
+    upstream, typed = Broker(cash=1e6, verbose=False), TypedBroker(1e6, verbose=False)
+    trade(upstream, n=60)
+    trade(typed, n=60)
+    expected, log = upstream.get_transaction_log(), typed.get_transaction_log()
+    assert {c: str(log[c].dtype) for c in log.columns} == TRANSACTION_DTYPES
+    assert len(typed.transactions) == len(expected)
+    pd.testing.assert_frame_equal(
+        log.astype(object), typed_log(expected).astype(object)
+    )
+    assert typed.get_cash_balance() == upstream.get_cash_balance()
+
+
+def test_typed_log_is_smaller():
+    upstream = Broker(cash=1e6, verbose=False)
+    trade(upstream, n=100)
+    log = upstream.get_transaction_log()
+    typed = typed_log(log)
+    assert typed_log(typed) is typed
+    assert typed.memory_usage(deep=True).sum() * 3 < log.memory_usage(deep=True).sum()
+
+
+def test_buffer_grows_and_extends():
+    buffer = TransactionBuffer(capacity=2)
+    for i in range(5):
+        buffer.append(datetime(2020, 1, 1 + i), "BUY", f"T{i % 2}", i, 10.0, 100.0)
+    first = buffer.to_frame()
+    assert buffer.to_frame() is first
+    assert first["Ticker"].tolist() == ["T0", "T1", "T0", "T1", "T0"]
+
+    # A restored log with other tickers keeps the existing codes
+    restored = TransactionBuffer()
+    restored.append(datetime(2019, 1, 1), "SELL", "T9", 1, 1.0, 1.0)
+    restored.extend(first)
+    log = restored.to_frame()
+    assert log["Ticker"].tolist() == ["T9", "T0", "T1", "T0", "T1", "T0"]
+    assert log["Action"].tolist() == ["SELL"] + ["BUY"] * 5
+    assert log["Quantity"].tolist() == [1, 0, 1, 2, 3, 4]
+
+
+def test_restored_log_is_assigned():
+    broker = TypedBroker(cash=1e6, verbose=False)
+    trade(broker, n=10)
+    log = broker.transaction_log
+    other = TypedBroker(cash=broker.cash, verbose=False)
+    other.transaction_log = log
+    pd.testing.assert_frame_equal(other.transaction_log, log)
+
+
+def test_unknown_action():
+    with pytest.raises(ValueError):
+        TransactionBuffer().append(datetime(2020, 1, 1), "SHORT", "T0", 1, 1.0, 1.0)
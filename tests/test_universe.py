@@ -0,0 +1,49 @@
+import io
+
+from python_project_raphael_corchia import cli
+from python_project_raphael_corchia.universe import (
+    DEFAULT_UNIVERSE,
+    parse_universe,
+    read_universe,
+    resolve_universe,
+)
+
+
+def test_parse_universe_splits_and_deduplicates():
+    assert parse_universe("aapl, MSFT;nvda\nAAPL  googl\n") == [
+        "AAPL",
+        "MSFT",
+        "NVDA",
+        "GOOGL",
+    ]
+
+
+def test_constituents_file_reads_ticker_column(tmp_path):
+    path = tmp_path / "index.csv"
+    path.write_text("Name,Symbol,Weight\nApple,AAPL,0.07\nMicrosoft,MSFT,0.06\n")
+    assert read_universe(path) == ["AAPL", "MSFT"]
+
+
+def test_upload_with_bom_and_plain_list():
+    assert read_universe(io.BytesIO(b"\xef\xbb\xbfticker\nAAPL\nMSFT\n")) == [
+        "AAPL",
+        "MSFT",
+    ]
+    assert read_universe(io.StringIO("AAPL MSFT\nNVDA")) == ["AAPL", "MSFT", "NVDA"]
+
+
+def test_configuration_universe(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    path = tmp_path / "universe.txt"
+    path.write_text("AAPL\nMSFT\n")
+    assert resolve_universe(None) == DEFAULT_UNIVERSE
+    assert resolve_universe(["AAPL", "msft"]) == ["AAPL", "MSFT"]
+    backtest = cli.backtest_from_config(
+        {
+            "initial_date": "2019-01-01",
+            "final_date": "2019-05-01",
+            "universe": str(path),
+            "verbose": False,
+        }
+    )
+    assert backtest.universe == ["AAPL", "MSFT"]
@@ -0,0 +1,115 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from python_project_raphael_corchia.engine import (
+    CustomBacktest,
+    CustomFirstTwoMoments,
+)
+from python_project_raphael_corchia.tracing import Tracer
+from python_project_raphael_corchia.walkforward import (
+    Fold,
+    WalkForward,
+    overlapping_groups,
+    rolling_folds,
+)
+
+TICKERS = ["A", "B", "C", "D", "E"]
+
+
+@pytest.fixture
+def data(workdir, make_prices):
+    return make_prices(TICKERS, "2019-01-01", "2020-01-01", seed=7, drift=2e-4)
+
+
+def walk(folds, data, **kwargs):
+    return WalkForward(
+        folds,
+        information_class=CustomFirstTwoMoments,
+        information_kwargs={"bounds": [(0.0, 0.4)]},
+        universe=TICKERS,
+        data=data,
+        **kwargs,
+    ).run()
+
+
+def test_rolling_folds_and_groups():
+    folds = rolling_folds(
+        datetime(2019, 1, 1), datetime(2020, 1, 1), timedelta(days=120), timedelta(60)
+    )
+    assert [f.initial_date for f in folds][:3] == [
+        datetime(2019, 1, 1),
+        datetime(2019, 3, 2),
+        datetime(2019, 5, 1),
+    ]
+    assert all(f.final_date <= datetime(2020, 1, 1) for f in folds)
+    assert len(overlapping_groups(folds)) == 1
+
+    apart = [
+        Fold(datetime(2019, 7, 1), datetime(2019, 9, 1)),
+        Fold(datetime(2019, 1, 1), datetime(2019, 3, 1)),
+        Fold(datetime(2019, 2, 1), datetime(2019, 4, 1)),
+    ]
+    assert overlapping_groups(apart) == [apart[1:], apart[:1]]
+    with pytest.raises(ValueError):
+        rolling_folds(
+            datetime(2019, 1, 1), datetime(2020, 1, 1), timedelta(30), 0 * timedelta(1)
+        )
+
+
+@pytest.mark.parametrize("batch", [False, True])
+def test_shared_walk_matches_folds_run_alone(data, batch):
+    folds = rolling_folds(
+        datetime(2019, 1, 1), datetime(2019, 12, 1), timedelta(days=150), timedelta(60)
+    )
+    tracer = Tracer()
+    shared = walk(folds, data, batch=batch, max_workers=1, tracer=tracer)
+    alone = pd.concat([walk([fold], data, max_workers=1) for fold in folds])
+    assert shared["fold"].tolist() == [fold.name for fold in folds]
+    assert shared["n_trades"].tolist() == alone["n_trades"].tolist()
+    for column in ("final_value", "sharpe_ratio", "max_drawdown"):
+        np.testing.assert_allclose(shared[column], alone[column], rtol=1e-8)
+    # The dates shared by two folds were only optimized once
+    if not batch:
+        assert tracer.counters["walkforward.cache_hits"] > 0
+
+
+@pytest.mark.parametrize("initial_cash", [1_000_000, 100_000])
+def test_first_fold_matches_custom_backtest(data, initial_cash):
+    fold = Fold(datetime(2019, 1, 1), datetime(2019, 7, 1))
+    later = Fold(datetime(2019, 4, 1), datetime(2019, 10, 1))
+    result = walk([fold, later], data, max_workers=1, initial_cash=initial_cash)
+
+    # Nothing before the data start, the lookback loads the same prices
+    backtest = CustomBacktest(
+        initial_date=fold.initial_date,
+        final_date=fold.final_date,
+        information_class=CustomFirstTwoMoments,
+        information_kwargs={"bounds": [(0.0, 0.4)]},
+        universe=TICKERS,
+        data=data,
+        initial_cash=initial_cash,
+        store_results=False,
+        verbose=False,
+    )
+    backtest.run_backtest()
+    summary = backtest.performance().summary()
+    prices = backtest.information.get_prices(fold.final_date)
+    assert result["final_value"][0] == pytest.approx(
+        backtest.broker.get_portfolio_value(prices)
+    )
+    assert result["total_return"][0] == pytest.approx(summary["total_return"])
+    assert result["n_trades"][0] == len(backtest.broker.transactions)
+    assert result["final_value"][0] == pytest.approx(summary["final_value"])
+
+
+def test_groups_without_overlap_run_in_processes(data):
+    folds = [
+        Fold(datetime(2019, 2, 1), datetime(2019, 5, 1)),
+        Fold(datetime(2019, 8, 1), datetime(2019, 11, 1)),
+    ]
+    parallel = walk(folds, data, max_workers=2)
+    serial = walk(folds, data, max_workers=1)
+    pd.testing.assert_frame_equal(parallel, serial)